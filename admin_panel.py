@@ -1,8 +1,11 @@
 import streamlit as st
+import metrics
 import pandas as pd
 from datetime import datetime, timedelta
+from backup import BACKUP_DIR
+from reports import REPORTS, FORMATS
 # Import mock data functions
-from mock_data import get_admin_info, get_system_stats, get_all_users, create_user, get_system_logs, get_system_reports, backup_system, restore_system
+from mock_data import get_admin_info, get_system_stats, get_all_users, create_user, set_user_status, get_system_logs, get_system_reports, request_report, backup_system, list_backups, verify_backup, restore_system, get_profile_image, update_password, get_teacher_classes, get_class_timetable, update_class_timetable
 
 def show_dashboard(user_id: int):
     # Get admin information from mock data
@@ -17,16 +20,29 @@ def show_dashboard(user_id: int):
     # Get system statistics from mock data
     stats = get_system_stats()
     
-    # System Metrics
-    col1, col2, col3, col4 = st.columns(4)
+    # System Metrics (deltas are today's changes; logins are compared with yesterday)
+    changes = stats['changes']
+    col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
-        st.metric("Total Students", str(stats['total_students']), "+50")
+        st.metric("Total Students", str(stats['total_students']), changes['total_students'] or None)
     with col2:
-        st.metric("Total Teachers", str(stats['total_teachers']), "+2")
+        st.metric("Total Teachers", str(stats['total_teachers']), changes['total_teachers'] or None)
     with col3:
-        st.metric("Departments", str(stats['total_departments']), "")
+        st.metric("Departments", str(stats['total_departments']), changes['total_departments'] or None)
     with col4:
-        st.metric("Active Users", str(stats['active_users']), "+25")
+        st.metric("Active Users", str(stats['active_users']), changes['active_users'] or None)
+    with col5:
+        st.metric("Logins Today", str(stats['logins_today']), changes['logins_today'] or None)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("Users by Role")
+        st.dataframe(pd.DataFrame(list(stats['by_role'].items()), columns=["Role", "Users"]),
+                     use_container_width=True, hide_index=True)
+    with col2:
+        st.write("Users by Department")
+        st.dataframe(pd.DataFrame(list(stats['by_department'].items()), columns=["Department", "Users"]),
+                     use_container_width=True, hide_index=True)
     
     # Quick Access
     st.subheader("Quick Actions")
@@ -69,7 +85,7 @@ def manage_users(user_id: int):
                         "user_type": user_type,
                         "department": department
                     }
-                    if create_user(user_data):
+                    if create_user(user_data, actor_id=user_id):
                         st.success("User created successfully!")
                     else:
                         st.error("Error creating user")
@@ -83,6 +99,22 @@ def manage_users(user_id: int):
         st.dataframe(users_df, use_container_width=True)
     else:
         st.info("No users found")
+    
+    # Account Status
+    if users:
+        with st.expander("Change Account Status"):
+            labels = [f"{u['id']} - {u['name']} ({u['status']})" for u in users]
+            choice = st.selectbox("User", labels)
+            selected = users[labels.index(choice)]
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Activate", disabled=selected['status'] == "Active"):
+                    set_user_status(selected['id'], True, actor_id=user_id)
+                    st.rerun()
+            with col2:
+                if st.button("Deactivate", disabled=selected['status'] != "Active" or selected['id'] == user_id):
+                    set_user_status(selected['id'], False, actor_id=user_id)
+                    st.rerun()
 
 def manage_departments(user_id: int):
     st.title("Department Management")
@@ -123,6 +155,30 @@ def system_settings(user_id: int):
         if st.button("Update Academic Calendar"):
             st.success("Academic calendar updated!")
     
+    # Class Timetables: saving recompiles the class grid every student and teacher view shares
+    with st.expander("Class Timetables"):
+        class_names = [c['name'] for c in get_teacher_classes(user_id)]
+        selected_class = st.selectbox("Class", class_names, key="timetable_class")
+        if selected_class:
+            # Teachers are picked from the accounts, so each period records who teaches it by user id
+            teachers = {f"{u['name']} (#{u['id']})": (u['id'], u['name'])
+                        for u in get_all_users() if u['role'] in ("Teacher", "HOD")}
+            labels = {teacher_id: label for label, (teacher_id, _) in teachers.items()}
+            rows = [{**row, "teacher": labels.get(row['teacher_id'], row['teacher'])}
+                    for row in get_class_timetable(selected_class).rows()]
+            edited = st.data_editor(
+                pd.DataFrame(rows, columns=["day", "time", "subject", "teacher", "room"]),
+                column_config={"teacher": st.column_config.SelectboxColumn("teacher", options=list(teachers))},
+                num_rows="dynamic", use_container_width=True, hide_index=True,
+                key=f"timetable_editor_{selected_class}"
+            )
+            if st.button("Save Timetable"):
+                edited = edited.dropna(subset=["day", "time", "subject"]).astype(object)
+                rows = edited.where(edited.notna(), None).to_dict("records")
+                for row in rows:
+                    row['teacher_id'], row['teacher'] = teachers.get(row['teacher'], (None, row['teacher']))
+                update_class_timetable(user_id, selected_class, rows)
+    
     # System Configuration
     with st.expander("System Configuration"):
         st.toggle("Enable Email Notifications")
@@ -138,64 +194,80 @@ def manage_logs(user_id: int):
     # Log Filters
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.date_input("From Date ", key="log_from")
+        start_date = st.date_input("From Date ", value=datetime.now().date() - timedelta(days=7), key="log_from")
     with col2:
-        st.date_input("To Date ", key="log_to")
+        end_date = st.date_input("To Date ", key="log_to")
     with col3:
-        st.selectbox("Log Type", ["All", "Error", "Warning", "Info"])
+        log_type = st.selectbox("Log Type", ["All", "Login", "Write", "Error"])
+    event_type = None if log_type == "All" else log_type.lower()
     
-    # Get system logs from mock data
-    logs = get_system_logs()
+    # Keyset pages: one cursor stack per filter combination
+    key = f"log_cursors_{start_date}_{end_date}_{log_type}"
+    cursors = st.session_state.setdefault(key, [None])
+    logs, next_cursor = get_system_logs(start_date, end_date, event_type, cursors[-1])
     
     if logs:
         logs_df = pd.DataFrame(logs)
         st.dataframe(logs_df, use_container_width=True)
     else:
         st.info("No logs found")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("← Newer", key=f"{key}_newer"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor and st.button("Older →", key=f"{key}_older"):
+            cursors.append(next_cursor)
+            st.rerun()
 
 def generate_reports(user_id: int):
     st.title("Report Generation")
     
-    # Get system reports from mock data
-    reports = get_system_reports()
-    
     # Report Configuration
+    report_type = st.selectbox("Report Type", list(REPORTS))
     with st.form("report_form"):
-        report_type = st.selectbox("Report Type", [
-            "User Activity Report",
-            "Academic Performance Report",
-            "Attendance Summary Report",
-            "Department Statistics Report"
-        ])
         col1, col2 = st.columns(2)
         with col1:
-            st.date_input("From Date  ")
+            start_date = st.date_input("From Date  ", value=datetime.now().date() - timedelta(days=365))
         with col2:
-            st.date_input("To Date  ")
-        st.multiselect("Include Sections", [
-            "Student Statistics",
-            "Teacher Statistics",
-            "Academic Metrics",
-            "System Usage"
-        ])
-        st.selectbox("Format", ["PDF", "Excel", "CSV"])
+            end_date = st.date_input("To Date  ")
+        sections = st.multiselect("Include Sections", REPORTS[report_type][1])
+        report_format = st.selectbox("Format", list(FORMATS))
         if st.form_submit_button("Generate Report"):
-            st.success("Report generated successfully!")
-            st.download_button("Download Report", "dummy_data", "report.pdf")
+            # Runs in the background; identical requests reuse the same job
+            job = request_report(report_type, str(start_date), str(end_date), sections, report_format,
+                                 actor_id=user_id)
+            if job.status == "ready":
+                st.success("Report generated successfully!")
+            else:
+                st.info("Report queued - it will appear below when ready")
     
     # Available Reports
     st.subheader("Available Reports")
-    if reports:
-        for report in reports:
-            with st.expander(f"{report['name']} - {report['generated']}"):
-                st.write(f"Status: {report['status']}")
-                if report['status'] == 'Ready':
-                    st.download_button(
-                        "Download Report",
-                        "dummy_data",
-                        f"{report['name']}.pdf",
-                        key=f"download_{report['name']}"
-                    )
+    reports = get_system_reports()
+    if not reports:
+        st.info("No reports generated yet")
+        return
+    for report in reports:
+        job = report['job']
+        with st.expander(f"{report['name']} - {report['generated']}"):
+            st.write(f"Status: {report['status']}")
+            if report['status'] == 'Ready':
+                st.download_button(
+                    "Download Report",
+                    job.data,
+                    job.file_name,
+                    mime=job.mime,
+                    key=f"download_{id(job)}"
+                )
+            elif report['status'] == 'Failed':
+                st.error(job.error)
+            else:
+                st.progress(report['progress'])
+    if any(r['status'] in ('Queued', 'Running') for r in reports):
+        st.button("Refresh")
 
 def manage_backup(user_id: int):
     st.title("Backup & Restore")
@@ -206,28 +278,85 @@ def manage_backup(user_id: int):
     with col1:
         backup_type = st.selectbox("Backup Type", ["Full Backup", "Incremental Backup"])
     with col2:
-        storage_location = st.selectbox("Storage Location", ["Local Storage", "Cloud Storage"])
+        target = st.text_input("Target Directory", value=BACKUP_DIR)
     if st.button("Start Backup"):
-        # Use mock function to backup system
-        if backup_system():
-            st.success("Backup created successfully!")
-        else:
-            st.error("Error creating backup")
+        # Incremental backups only write chunks that changed since earlier backups
+        manifest = backup_system("full" if backup_type == "Full Backup" else "incremental", target,
+                                  actor_id=user_id)
+        stats = manifest["stats"]
+        st.write(f"{stats['chunks'] - stats['reused']} of {stats['chunks']} chunks written "
+                 f"({stats['written_bytes'] / 1024:.1f} KB compressed)")
+    
+    backups = list_backups(target)
+    if not backups:
+        st.info("No backups in this directory yet")
+        return
+    st.dataframe(
+        pd.DataFrame(backups).drop(columns=["tables"]),
+        use_container_width=True, hide_index=True
+    )
     
     # Restore
     st.subheader("Restore System")
-    backup_file = st.file_uploader("Upload Backup File")
-    if st.button("Restore System"):
-        if backup_file:
-            st.warning("This will override current system data. Are you sure?")
-            if st.button("Confirm Restore"):
-                # Use mock function to restore system
-                if restore_system(backup_file):
-                    st.success("System restored successfully!")
-                else:
-                    st.error("Error restoring system")
-        else:
-            st.error("Please upload a backup file")
+    by_id = {b['id']: b for b in backups}
+    selected = by_id[st.selectbox("Backup", list(by_id))]
+    scope = st.radio("Restore", ["Everything", "One Table", "One Term"], horizontal=True)
+    table = term = None
+    if scope == "One Table":
+        table = st.selectbox("Table", list(selected["tables"]))
+    elif scope == "One Term":
+        terms = sorted({t for partitions in selected["tables"].values() for t in partitions if t != "undated"})
+        if not terms:
+            st.info("This backup has no dated records")
+            return
+        table = st.selectbox("Table", ["All dated tables", *[t for t, p in selected["tables"].items() if p]])
+        table = None if table == "All dated tables" else table
+        term = st.selectbox("Term", terms)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Verify Backup"):
+            damaged = verify_backup(selected["id"], target)
+            if damaged:
+                st.error(f"{len(damaged)} chunk(s) are missing or corrupt")
+            else:
+                st.success("All chunks verified")
+    with col2:
+        confirmed = st.checkbox("I understand this overrides current system data")
+        if st.button("Restore System", disabled=not confirmed):
+            restore_system(selected["id"], table, term, target, actor_id=user_id)
+
+def show_performance(user_id: int):
+    st.title("Performance")
+    
+    # Timings are shared by every session of this server process
+    enabled = st.toggle("Record timings", value=metrics.enabled(), key="metrics_enabled")
+    if enabled != metrics.enabled():
+        metrics.set_enabled(enabled)
+    if st.button("Reset Timings"):
+        metrics.reset()
+        st.success("Timings cleared")
+    
+    stats = pd.DataFrame(metrics.snapshot())
+    if stats.empty:
+        st.info("No timings recorded yet" if enabled else "Timing is off; turn on Record timings to collect data")
+        return
+    stats.insert(0, "kind", stats["name"].str.split(".").str[0])
+    stats["name"] = stats["name"].str.split(".", n=1).str[1]
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Calls", int(stats["calls"].sum()))
+    with col2:
+        st.metric("Errors", int(stats["errors"].sum()))
+    with col3:
+        st.metric("Total Time (s)", round(float(stats["total_s"].sum()), 2))
+    
+    for kind, title in (("page", "Pages"), ("data", "Data Access"), ("auth", "Login")):
+        section = stats[stats["kind"] == kind].drop(columns="kind")
+        if not section.empty:
+            st.subheader(title)
+            st.dataframe(section, use_container_width=True, hide_index=True)
 
 def show_profile(user_id: int):
     st.title("Admin Profile")
@@ -241,7 +370,7 @@ def show_profile(user_id: int):
     col1, col2 = st.columns([1, 2])
     with col1:
         st.image(
-            admin.get('profile_image_url', "https://via.placeholder.com/150"),
+            get_profile_image(user_id, admin, "profile"),
             caption=f"{admin['first_name']} {admin['last_name']}"
         )
     with col2:
@@ -259,8 +388,8 @@ def show_profile(user_id: int):
                 st.error("Please fill in all password fields")
             elif new_password != confirm_password:
                 st.error("New passwords do not match")
-            else:
-                st.success("Password updated successfully!")
+            elif not update_password(user_id, current_password, new_password):
+                st.error("Current password is incorrect")
 
 def show_panel(user_id: int, email: str):
     # Custom CSS
@@ -287,7 +416,7 @@ def show_panel(user_id: int, email: str):
     # Sidebar navigation
     st.sidebar.title("Admin Portal")
     st.sidebar.image(
-        admin.get('profile_image_url', "https://via.placeholder.com/150"),
+        get_profile_image(user_id, admin, "sidebar"),
         caption=f"{admin['first_name']} {admin['last_name']}"
     )
     menu = st.sidebar.radio("", [
@@ -297,24 +426,28 @@ def show_panel(user_id: int, email: str):
         "⚙️ Settings",
         "📝 Logs",
         "📊 Reports",
-        "�� Backup",
+        "💾 Backup",
+        "⏱️ Performance",
         "👤 Profile"
     ])
 
     # Route to appropriate function based on menu selection
-    if menu == "📊 Dashboard":
-        show_dashboard(user_id)
-    elif menu == "👥 User Management":
-        manage_users(user_id)
-    elif menu == "🏢 Departments":
-        manage_departments(user_id)
-    elif menu == "⚙️ Settings":
-        system_settings(user_id)
-    elif menu == "📝 Logs":
-        manage_logs(user_id)
-    elif menu == "📊 Reports":
-        generate_reports(user_id)
-    elif menu == "💾 Backup":
-        manage_backup(user_id)
-    elif menu == "👤 Profile":
-        show_profile(user_id)
\ No newline at end of file
+    with metrics.timer(f"page.Admin.{menu.split(' ', 1)[-1]}"):
+        if menu == "📊 Dashboard":
+            show_dashboard(user_id)
+        elif menu == "👥 User Management":
+            manage_users(user_id)
+        elif menu == "🏢 Departments":
+            manage_departments(user_id)
+        elif menu == "⚙️ Settings":
+            system_settings(user_id)
+        elif menu == "📝 Logs":
+            manage_logs(user_id)
+        elif menu == "📊 Reports":
+            generate_reports(user_id)
+        elif menu == "💾 Backup":
+            manage_backup(user_id)
+        elif menu == "⏱️ Performance":
+            show_performance(user_id)
+        elif menu == "👤 Profile":
+            show_profile(user_id)
@@ -0,0 +1,318 @@
+import threading
+from datetime import date as date_type
+
+import numpy as np
+
+# Bitmap-backed attendance, one store per class.
+# Each student owns one byte per calendar day; bit p is period p of that day
+# (8 periods). A second bitmap records which periods were actually marked, and
+# a (day, period) array holds the subject code taught in that slot. Summaries
+# are per-bit column sums followed by a bincount over subject or month codes,
+# so they never touch per-record dicts. Writes may replace the arrays (growing
+# them for new days or students), so reads take the same lock as writes.
+# A year of 5,000 students is 5,000 x 365 x 2 bytes, about 3.6 MB.
+
+PERIODS_PER_DAY = 8
+DAY_CHUNK = 64
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _day(value) -> np.datetime64:
+    if isinstance(value, (date_type, np.datetime64)):
+        return np.datetime64(value, "D")
+    return np.datetime64(str(value)[:10], "D")
+
+
+class ClassAttendance:
+    """Attendance bitmaps for one class: students x days x periods."""
+
+    def __init__(self, student_ids=(), start=None):
+        student_ids = list(student_ids)
+        self.student_index = {}
+        self.subjects = []
+        self.subject_index = {}
+        self.start = _day(start) if start is not None else None
+        self.present = np.zeros((len(student_ids), 0), dtype=np.uint8)
+        self.recorded = np.zeros((len(student_ids), 0), dtype=np.uint8)
+        self.slot_subject = np.full((0, PERIODS_PER_DAY), -1, dtype=np.int16)
+        self._lock = threading.Lock()
+        for student_id in student_ids:
+            self._student_row(student_id)
+
+    @property
+    def nbytes(self) -> int:
+        return self.present.nbytes + self.recorded.nbytes + self.slot_subject.nbytes
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self.start + np.arange(self.slot_subject.shape[0]) if self.start is not None else np.array([], "M8[D]")
+
+    def _student_row(self, student_id) -> int:
+        row = self.student_index.get(student_id)
+        if row is None:
+            row = self.student_index[student_id] = len(self.student_index)
+            if row >= self.present.shape[0]:
+                grow = max(8, self.present.shape[0])
+                pad = np.zeros((grow, self.present.shape[1]), dtype=np.uint8)
+                self.present = np.vstack([self.present, pad])
+                self.recorded = np.vstack([self.recorded, pad])
+        return row
+
+    def _subject_code(self, subject: str) -> int:
+        code = self.subject_index.get(subject)
+        if code is None:
+            code = self.subject_index[subject] = len(self.subjects)
+            self.subjects.append(subject)
+        return code
+
+    def _day_column(self, day: np.datetime64) -> int:
+        if self.start is None:
+            self.start = day
+        if day < self.start:
+            shift = int((self.start - day).astype(int)) + DAY_CHUNK
+            self._pad_days(before=shift)
+            self.start -= shift
+        column = int((day - self.start).astype(int))
+        if column >= self.slot_subject.shape[0]:
+            self._pad_days(after=column - self.slot_subject.shape[0] + DAY_CHUNK)
+        return column
+
+    def _pad_days(self, before: int = 0, after: int = 0):
+        width = ((0, 0), (before, after))
+        self.present = np.pad(self.present, width)
+        self.recorded = np.pad(self.recorded, width)
+        self.slot_subject = np.pad(self.slot_subject, ((before, after), (0, 0)), constant_values=-1)
+
+    def _period_for(self, column: int, code: int, period) -> int:
+        if period is not None:
+            return period
+        slots = self.slot_subject[column]
+        taken = np.flatnonzero(slots == code)
+        if taken.size:
+            return int(taken[0])
+        free = np.flatnonzero(slots < 0)
+        if not free.size:
+            raise ValueError(f"All {PERIODS_PER_DAY} periods are already used on day {self.start + column}")
+        return int(free[0])
+
+    def check(self, day, subject: str):
+        """Raise ValueError if subject cannot get a period on day, before anything is written."""
+        with self._lock:
+            day = _day(day)
+            if self.start is None or not self.start <= day < self.start + self.slot_subject.shape[0]:
+                return
+            self._period_for(int((day - self.start).astype(int)), self.subject_index.get(subject, -2), None)
+
+    def mark(self, day, subject: str, statuses: dict, period: int = None):
+        """Record {student_id: "Present"/"Absent"} for one subject period on a day."""
+        with self._lock:
+            column = self._day_column(_day(day))
+            code = self._subject_code(subject)
+            period = self._period_for(column, code, period)
+            self.slot_subject[column, period] = code
+            rows = np.fromiter((self._student_row(s) for s in statuses), dtype=np.intp, count=len(statuses))
+            present = np.fromiter((v == "Present" for v in statuses.values()), dtype=bool, count=len(statuses))
+            bit = np.uint8(1 << period)
+            self.recorded[rows, column] |= bit
+            self.present[rows[present], column] |= bit
+            self.present[rows[~present], column] &= ~bit
+
+    def statuses(self, day, subject: str) -> dict:
+        """{student_id: "Present"/"Absent"} already recorded for subject on day."""
+        with self._lock:
+            day, code = _day(day), self.subject_index.get(subject)
+            if code is None or self.start is None or not self.start <= day < self.start + self.slot_subject.shape[0]:
+                return {}
+            column = int((day - self.start).astype(int))
+            periods = np.flatnonzero(self.slot_subject[column] == code)
+            if not periods.size:
+                return {}
+            bit = np.uint8(1 << int(periods[0]))
+            return {
+                student_id: "Present" if self.present[row, column] & bit else "Absent"
+                for student_id, row in self.student_index.items() if self.recorded[row, column] & bit
+            }
+
+    def _rows(self, student_id=None):
+        if student_id is None:
+            return slice(0, len(self.student_index))
+        row = self.student_index.get(student_id)
+        return slice(row, row + 1) if row is not None else None
+
+    def _slot_counts(self, rows) -> tuple[np.ndarray, np.ndarray]:
+        """Attended and recorded counts per (day, period) slot, summed over the selected students."""
+        attended = self.present[rows] & self.recorded[rows]
+        recorded = self.recorded[rows]
+        shifts = np.arange(PERIODS_PER_DAY, dtype=np.uint8)
+        per_slot = [
+            np.stack([((bits >> p) & 1).sum(axis=0, dtype=np.int64) for p in shifts], axis=1).ravel()
+            for bits in (attended, recorded)
+        ]
+        return per_slot[0], per_slot[1]
+
+    def _by_code(self, rows, codes, labels) -> dict:
+        attended, recorded = self._slot_counts(rows)
+        size = len(labels)
+        valid = codes >= 0
+        present = np.bincount(codes[valid], weights=attended[valid], minlength=size)
+        total = np.bincount(codes[valid], weights=recorded[valid], minlength=size)
+        return {
+            labels[i]: {"present": int(present[i]), "total": int(total[i]),
+                        "percentage": round(100 * present[i] / total[i], 1)}
+            for i in range(size) if total[i]
+        }
+
+    def student_summary(self, student_id) -> dict:
+        """Per-subject attendance for one student."""
+        with self._lock:
+            rows = self._rows(student_id)
+            if rows is None:
+                return {}
+            return self._by_code(rows, self.slot_subject.ravel(), self.subjects)
+
+    def subject_summary(self) -> dict:
+        """Per-subject attendance across the whole class."""
+        with self._lock:
+            return self._by_code(self._rows(), self.slot_subject.ravel(), self.subjects)
+
+    def monthly_summary(self, student_id=None) -> dict:
+        """Attendance per calendar month ("YYYY-MM"), for the class or one student."""
+        with self._lock:
+            rows = self._rows(student_id)
+            if rows is None:
+                return {}
+            labels, month_codes = np.unique(self.dates.astype("M8[M]"), return_inverse=True)
+            codes = np.repeat(month_codes, PERIODS_PER_DAY)
+            return self._by_code(rows, codes, [str(m) for m in labels])
+
+    def daily(self, student_id=None, start=None, end=None) -> tuple[np.ndarray, np.ndarray]:
+        """Marked days in [start, end] and the attendance percentage on each, for the class or one student."""
+        with self._lock:
+            rows = self._rows(student_id)
+            if rows is None:
+                return np.array([], "M8[D]"), np.array([])
+            attended = _POPCOUNT[self.present[rows] & self.recorded[rows]].sum(axis=0, dtype=np.int64)
+            total = _POPCOUNT[self.recorded[rows]].sum(axis=0, dtype=np.int64)
+            dates = self.dates
+        keep = total > 0
+        if start is not None:
+            keep &= dates >= _day(start)
+        if end is not None:
+            keep &= dates <= _day(end)
+        return dates[keep], np.round(100 * attended[keep] / total[keep], 1)
+
+    def student_percentages(self) -> dict:
+        """Overall attendance percentage per student id (popcount over each row)."""
+        with self._lock:
+            student_index = dict(self.student_index)
+            count = len(student_index)
+            attended = _POPCOUNT[self.present[:count] & self.recorded[:count]].sum(axis=1, dtype=np.int64)
+            total = _POPCOUNT[self.recorded[:count]].sum(axis=1, dtype=np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            percentages = np.where(total > 0, np.round(100 * attended / total, 1), 0.0)
+        return {student_id: float(percentages[row]) for student_id, row in student_index.items()}
+
+    def class_percentage(self) -> float:
+        with self._lock:
+            count = len(self.student_index)
+            total = int(_POPCOUNT[self.recorded[:count]].sum(dtype=np.int64))
+            attended = int(_POPCOUNT[self.present[:count] & self.recorded[:count]].sum(dtype=np.int64))
+        return round(100 * attended / total, 1) if total else 0.0
+
+    def load_arrays(self, present: np.ndarray, recorded: np.ndarray, slot_subject: np.ndarray, subjects):
+        """Replace the bitmaps wholesale, e.g. with generated or saved data aligned to self.start."""
+        with self._lock:
+            self.present = np.ascontiguousarray(present, dtype=np.uint8)
+            self.recorded = np.ascontiguousarray(recorded, dtype=np.uint8)
+            self.slot_subject = np.ascontiguousarray(slot_subject, dtype=np.int16)
+            self.subjects = list(subjects)
+            self.subject_index = {subject: code for code, subject in enumerate(self.subjects)}
+
+    def records(self, class_name: str = None):
+        """Expand the bitmaps back into {"student_id", "date", "subject", "status"} rows."""
+        with self._lock:
+            count = len(self.student_index)
+            days = self.slot_subject.shape[0]
+            shape = (count, days, PERIODS_PER_DAY)
+            present = np.unpackbits(self.present[:count], axis=-1, bitorder="little").reshape(shape)
+            recorded = np.unpackbits(self.recorded[:count], axis=-1, bitorder="little").reshape(shape)
+            rows, columns, periods = np.nonzero(recorded)
+            student_ids = np.array(list(self.student_index), dtype=object)[rows].tolist()
+            dates = self.dates.astype(str)[columns].tolist()
+            subjects = np.array(self.subjects, dtype=object)[self.slot_subject[columns, periods]].tolist()
+        statuses = np.where(present[rows, columns, periods], "Present", "Absent").tolist()
+        for student_id, day, subject, status in zip(student_ids, dates, subjects, statuses):
+            record = {"student_id": student_id, "date": day, "subject": subject, "status": status}
+            if class_name is not None:
+                record["class"] = class_name
+            yield record
+
+    def save(self, path: str):
+        with self._lock:
+            np.savez_compressed(
+                path,
+                student_ids=np.array(list(self.student_index)),
+                start=np.array([self.start if self.start is not None else np.datetime64("NaT")], dtype="M8[D]"),
+                present=self.present[:len(self.student_index)],
+                recorded=self.recorded[:len(self.student_index)],
+                slot_subject=self.slot_subject,
+                subjects=np.array(self.subjects),
+            )
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            store = cls(data["student_ids"].tolist(), start=data["start"][0])
+            store.load_arrays(data["present"], data["recorded"], data["slot_subject"], data["subjects"].tolist())
+        return store
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from rows of {"student_id", "date", "subject", "status"}."""
+        store = cls()
+        grouped = {}
+        for record in records:
+            key = (record["date"], record["subject"])
+            grouped.setdefault(key, {})[record["student_id"]] = record["status"]
+        for (day, subject), statuses in sorted(grouped.items()):
+            store.mark(day, subject, statuses)
+        return store
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_class_store(class_name: str, loader) -> ClassAttendance:
+    """Return the class bitmap, building it once from loader(class_name) records."""
+    store = _stores.get(class_name)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(class_name)
+            if store is None:
+                store = _stores[class_name] = ClassAttendance.from_records(loader(class_name))
+    return store
+
+
+def install(class_name: str, store: ClassAttendance):
+    """Register a prebuilt class bitmap (e.g. from the synthetic data generator)."""
+    with _stores_lock:
+        _stores[class_name] = store
+
+
+def check(class_name: str, day, subject: str, loader):
+    """Raise ValueError if a write of subject on day would not fit the class bitmap."""
+    get_class_store(class_name, loader).check(day, subject)
+
+
+def record(class_name: str, day, subject: str, statuses: dict):
+    """Apply a write to an already loaded class bitmap; unloaded classes pick it up on load."""
+    store = _stores.get(class_name)
+    if store is not None:
+        store.mark(day, subject, statuses)
+
+
+def reset():
+    with _stores_lock:
+        _stores.clear()
@@ -0,0 +1,292 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import groupby
+
+from storage import DATA_DIR
+
+# Chunked, content-addressed, compressed backups of the data store and blob store.
+# Table rows are streamed as JSON lines and cut into chunks where a row's CRC
+# hits a boundary (content-defined), so inserting rows only changes the chunks
+# around them. A chunk is stored once under BACKUP_DIR/chunks/ab/<sha256> as
+# zlib data; compression runs on a small pool (zlib releases the GIL) with a
+# bounded number of chunks in flight, so nothing is held in memory whole.
+# An incremental backup writes only chunks not already in the target and
+# reuses blob chunk lists from the previous backup; a full backup rewrites
+# every chunk. Each backup is a manifest listing, per table, the chunks of
+# each term (tables with a date column) so one table or one term can be
+# restored by reading only its chunks, each verified against its hash.
+
+BACKUP_DIR = os.environ.get("SMS_BACKUP_DIR", os.path.join(DATA_DIR, "backups"))
+BACKUP_WORKERS = int(os.environ.get("SMS_BACKUP_WORKERS", 4))
+COMPRESSION_LEVEL = 6
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 1024 * 1024
+BOUNDARY_DIVISOR = 64
+BLOB_CHUNK = 4 * 1024 * 1024
+DATE_COLUMNS = {"attendance": "date", "marks": "date", "submissions": "submitted_date", "announcements": "date"}
+ALL_ROWS = "all"
+UNDATED = "undated"
+# Terms start in these months: T1 Jan-Apr, T2 May-Aug, T3 Sep-Dec.
+TERM_MONTHS = (1, 5, 9)
+
+
+class BackupError(Exception):
+    """A backup is missing, or one of its chunks is missing or corrupt."""
+
+
+def term_of(date: str) -> str:
+    """Academic term label of an ISO date, e.g. "2024-T2"."""
+    if not date:
+        return UNDATED
+    month = int(date[5:7])
+    return f"{date[:4]}-T{sum(month >= start for start in TERM_MONTHS)}"
+
+
+def term_range(term: str):
+    """[start, end) dates of a term label, or None for undated rows."""
+    if term == UNDATED:
+        return None
+    year, number = int(term[:4]), int(term.split("-T")[1])
+    start = f"{year}-{TERM_MONTHS[number - 1]:02d}-01"
+    end = f"{year}-{TERM_MONTHS[number]:02d}-01" if number < len(TERM_MONTHS) else f"{year + 1}-01-01"
+    return start, end
+
+
+def row_chunks(rows):
+    """JSON-lines chunks with content-defined boundaries between rows."""
+    buffer, size = [], 0
+    for row in rows:
+        line = json.dumps(row, separators=(",", ":"), default=str).encode() + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= MAX_CHUNK or (size >= MIN_CHUNK and zlib.crc32(line) % BOUNDARY_DIVISOR == 0):
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+class ChunkStore:
+    """Compressed chunks addressed by the SHA-256 of their uncompressed bytes."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def write(self, digest: str, data: bytes) -> int:
+        """Compress and store one chunk; returns the stored size."""
+        compressed = zlib.compress(data, COMPRESSION_LEVEL)
+        final = self.path(digest)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(final))
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(compressed)
+        os.replace(tmp_path, final)
+        return len(compressed)
+
+    def read(self, digest: str) -> bytes:
+        """A chunk's bytes, checked against its digest."""
+        try:
+            with open(self.path(digest), "rb") as f:
+                data = zlib.decompress(f.read())
+        except (OSError, zlib.error) as e:
+            raise BackupError(f"Chunk {digest[:12]} is unreadable: {e}") from e
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise BackupError(f"Chunk {digest[:12]} is corrupt")
+        return data
+
+
+class _ChunkReader:
+    """File-like view over an iterator of chunks, for BlobStore.put()."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def read(self, size: int = -1) -> bytes:
+        return next(self._chunks, b"")
+
+
+class BackupEngine:
+    """Writes and restores backups in a target directory."""
+
+    def __init__(self, target: str = BACKUP_DIR, workers: int = BACKUP_WORKERS):
+        self.target = target
+        self.workers = workers
+        self.chunks = ChunkStore(os.path.join(target, "chunks"))
+        self.manifest_dir = os.path.join(target, "manifests")
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _store(self, pieces, pool, stats: dict, rewrite: bool) -> list:
+        """Hash each piece, compress and write new ones in parallel; returns their digests in order."""
+        digests, in_flight = [], deque()
+        for piece in pieces:
+            digest = hashlib.sha256(piece).hexdigest()
+            digests.append(digest)
+            stats["chunks"] += 1
+            stats["bytes"] += len(piece)
+            if not rewrite and self.chunks.has(digest):
+                stats["reused"] += 1
+                continue
+            in_flight.append(pool.submit(self.chunks.write, digest, piece))
+            while len(in_flight) > self.workers * 2:
+                stats["written_bytes"] += in_flight.popleft().result()
+        while in_flight:
+            stats["written_bytes"] += in_flight.popleft().result()
+        return digests
+
+    def backup(self, backend, blobs=None, kind: str = "incremental") -> dict:
+        """Snapshot every table of backend (and every blob of blobs); returns the manifest."""
+        rewrite = kind == "full"
+        previous = self.latest()
+        stats = {"chunks": 0, "reused": 0, "bytes": 0, "written_bytes": 0}
+        manifest = {
+            "id": f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{kind}",
+            "kind": kind, "created": datetime.now().isoformat(timespec="seconds"),
+            "backend": backend.name, "tables": {}, "blobs": {},
+        }
+        with self._lock, ThreadPoolExecutor(self.workers, thread_name_prefix="backup") as pool:
+            for table in backend.backup_tables():
+                date_column = DATE_COLUMNS.get(table)
+                columns, rows = backend.dump_table(table, order_by=date_column)
+                entry = {"columns": columns, "date_column": None, "rows": 0, "partitions": {}}
+                if date_column in columns:
+                    entry["date_column"] = date_column
+                    position = columns.index(date_column)
+                    groups = groupby(rows, key=lambda row: term_of(row[position]))
+                else:
+                    groups = [(ALL_ROWS, rows)]
+                for partition, partition_rows in groups:
+                    counted = _Counted(partition_rows)
+                    entry["partitions"][partition] = self._store(row_chunks(counted), pool, stats, rewrite)
+                    entry["rows"] += counted.count
+                manifest["tables"][table] = entry
+            if blobs is not None:
+                known = previous["blobs"] if previous and not rewrite else {}
+                for digest in blobs.digests():
+                    chunk_list = known.get(digest)
+                    if chunk_list is not None and all(map(self.chunks.has, chunk_list)):
+                        manifest["blobs"][digest] = chunk_list
+                        stats["chunks"] += len(chunk_list)
+                        stats["reused"] += len(chunk_list)
+                        continue
+                    manifest["blobs"][digest] = self._store(
+                        (bytes(c) for c in blobs.iter_chunks(digest, BLOB_CHUNK)), pool, stats, rewrite)
+        manifest["stats"] = stats
+        fd, tmp_path = tempfile.mkstemp(dir=self.manifest_dir)
+        with os.fdopen(fd, "w") as tmp:
+            json.dump(manifest, tmp)
+        os.replace(tmp_path, os.path.join(self.manifest_dir, manifest["id"] + ".json"))
+        return manifest
+
+    def list_backups(self) -> list:
+        """Backup ids, newest first."""
+        return sorted((name[:-5] for name in os.listdir(self.manifest_dir) if name.endswith(".json")),
+                      reverse=True)
+
+    def manifest(self, backup_id: str) -> dict:
+        try:
+            with open(os.path.join(self.manifest_dir, backup_id + ".json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise BackupError(f"Backup {backup_id} not found") from None
+
+    def latest(self):
+        backups = self.list_backups()
+        return self.manifest(backups[0]) if backups else None
+
+    def verify(self, backup_id: str) -> list:
+        """Digests of missing or corrupt chunks in a backup (empty when intact)."""
+        manifest = self.manifest(backup_id)
+        digests = {d for entry in manifest["tables"].values() for chunk_list in entry["partitions"].values()
+                   for d in chunk_list}
+        digests.update(d for chunk_list in manifest["blobs"].values() for d in chunk_list)
+        bad = []
+        for digest in sorted(digests):
+            try:
+                self.chunks.read(digest)
+            except BackupError:
+                bad.append(digest)
+        return bad
+
+    def _rows(self, chunk_list):
+        for digest in chunk_list:
+            for line in io.BytesIO(self.chunks.read(digest)):
+                yield json.loads(line)
+
+    def restore(self, backup_id: str, backend, blobs=None, table: str = None, term: str = None) -> int:
+        """Restore a whole backup, one table, or one term (of one or every dated table); returns rows restored.
+
+        Only the selected chunks are read. Every selected table is replaced in one transaction, so a
+        corrupt chunk or a restore the store rejects (BackupError) leaves the data as it was.
+        """
+        manifest = self.manifest(backup_id)
+        if manifest["backend"] != backend.name:
+            raise BackupError(f"Backup {backup_id} is of a {manifest['backend']} store, not {backend.name}")
+        tables = manifest["tables"]
+        if table is not None:
+            if table not in tables:
+                raise BackupError(f"Table {table} is not in backup {backup_id}")
+            tables = {table: tables[table]}
+        selected = []
+        for name, entry in tables.items():
+            if term is None:
+                chunk_list = [d for chunks in entry["partitions"].values() for d in chunks]
+                selected.append((name, entry["columns"], self._rows(chunk_list), None, None))
+            elif entry["date_column"] and term in entry["partitions"]:
+                selected.append((name, entry["columns"], self._rows(entry["partitions"][term]),
+                                 entry["date_column"], term_range(term)))
+        try:
+            restored = backend.restore_tables(selected)
+        except sqlite3.Error as e:
+            raise BackupError(f"The store rejected backup {backup_id}: {e}") from e
+        if blobs is not None and table is None and term is None:
+            for digest, chunk_list in manifest["blobs"].items():
+                if not blobs.exists(digest):
+                    blobs.put(_ChunkReader(map(self.chunks.read, chunk_list)))
+        return restored
+
+
+class _Counted:
+    """Iterator wrapper counting the rows that pass through."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self._rows)
+        self.count += 1
+        return row
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(target: str = None) -> BackupEngine:
+    """The engine for a target directory (BACKUP_DIR by default)."""
+    target = target or BACKUP_DIR
+    with _engines_lock:
+        engine = _engines.get(target)
+        if engine is None:
+            engine = _engines[target] = BackupEngine(target)
+    return engine
@@ -0,0 +1,99 @@
+import argparse
+import statistics
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import credentials
+import storage
+
+# Login throughput benchmark: CONCURRENT_USERS threads log in at once, each
+# a few times, while a probe thread stands in for another session's script
+# rerun (a short pure-Python loop every few ms). Reported per auth pool size:
+# logins per second, login latency percentiles and the worst probe stall.
+# "inline" hashes on the calling thread, as verify_login did before the pool.
+# Accounts live in an in-memory backend, hashed with the requested rounds.
+
+ACCOUNTS = ["student@test.com", "teacher@test.com", "hod@test.com", "admin@test.com"]
+PASSWORD = "test123"
+
+CONCURRENT_USERS = 50
+LOGINS_PER_USER = 4
+
+
+def _probe(stop: threading.Event, stalls: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        sum(i * i for i in range(2000))
+        stalls.append(time.perf_counter() - started)
+        time.sleep(0.005)
+
+
+def bench(workers, users: int = CONCURRENT_USERS, logins: int = LOGINS_PER_USER, rounds: int = None) -> dict:
+    """Run the login burst against a fresh store; workers=None verifies inline."""
+    accounts = {user_id: {"id": user_id, "role": email.split("@")[0], "email": email, "is_active": True}
+                for user_id, email in enumerate(ACCOUNTS, start=1)}
+    store = credentials.CredentialStore(storage.MemoryBackend(SimpleNamespace(MOCK_USERS=accounts)),
+                                        rounds=rounds or credentials.HASH_ROUNDS, workers=workers or 1)
+    for user in accounts.values():
+        user["password_hash"] = store.hash(PASSWORD)
+    check = store.verify if workers else store._check
+    latencies, stalls, failures = [], [], []
+    start_gate = threading.Barrier(users + 1)
+
+    def user(index):
+        email = ACCOUNTS[index % len(ACCOUNTS)]
+        start_gate.wait()
+        for _ in range(logins):
+            started = time.perf_counter()
+            if check(email, PASSWORD) is None:
+                failures.append(email)
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    stop = threading.Event()
+    probe = threading.Thread(target=_probe, args=(stop, stalls))
+    for thread in threads:
+        thread.start()
+    probe.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    probe.join()
+    store.close()
+
+    latencies.sort()
+    return {
+        "workers": workers or "inline",
+        "logins_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(1000 * statistics.median(latencies), 1),
+        "p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1),
+        "probe_max_ms": round(1000 * max(stalls, default=0), 1),
+        "failures": len(failures),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent login verification.")
+    parser.add_argument("--users", type=int, default=CONCURRENT_USERS)
+    parser.add_argument("--logins", type=int, default=LOGINS_PER_USER)
+    parser.add_argument("--rounds", type=int, default=credentials.HASH_ROUNDS)
+    parser.add_argument("--workers", nargs="+", type=int, default=[0, 1, 2, 4, 8], help="0 = inline")
+    args = parser.parse_args()
+
+    failed = False
+    for workers in args.workers:
+        result = bench(workers or None, args.users, args.logins, args.rounds)
+        print(f"workers {str(result['workers']):>6}  {result['logins_per_s']:8.1f} logins/s  "
+              f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+              f"probe max {result['probe_max_ms']:7.1f} ms")
+        failed = failed or result["failures"] > 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
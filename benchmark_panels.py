@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from streamlit.testing.v1 import AppTest
+
+import attendance_store
+import cache
+import data_generator
+import storage
+
+# Headless render benchmark for every role's show_panel menu entries.
+# Each dataset is generated once into DATA_DIR/bench, then every sidebar page
+# is run through streamlit's AppTest after a warm-up pass, once cold (read cache
+# cleared) and once warm.
+# Script-run time and peak traced memory are compared with a stored baseline.
+
+DATASETS = {
+    "small": {"classes_per_department": 1, "students_per_class": 20},
+    "medium": {"classes_per_department": 25, "students_per_class": 40},
+    "large": {"classes_per_department": 100, "students_per_class": 40},
+}
+
+PANELS = {
+    "student": "student_panel",
+    "teacher": "teacher_panel",
+    "hod": "hod_panel",
+    "admin": "admin_panel",
+}
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+TOLERANCE = 0.5
+MIN_SLACK_S = 0.01
+
+
+def _panel_script(module_name, user_id, email):
+    import importlib
+
+    importlib.import_module(module_name).show_panel(user_id=user_id, email=email)
+
+
+def prepare_dataset(name: str, directory: str = None) -> data_generator.SyntheticSchool:
+    """Generate (or reuse) the dataset and make it the active storage backend."""
+    directory = directory or os.path.join(storage.DATA_DIR, "bench")
+    school = data_generator.SyntheticSchool(**DATASETS[name])
+    path = os.path.join(directory, f"{name}.db")
+    fresh = not os.path.exists(path)
+    backend = storage.SQLiteBackend(path)
+    storage.set_backend(backend)
+    if fresh:
+        data_generator.load_into_backend(school, backend, attendance_rows=name == "small")
+    elif name != "small":
+        for class_index, cls in enumerate(school.class_list):
+            attendance_store.install(cls["name"], school.attendance_bitmap(class_index))
+    return school
+
+
+def role_users(school: data_generator.SyntheticSchool) -> dict:
+    """One representative user id per role."""
+    users = {person["role"]: person["user_id"] for person in reversed(school.staff)}
+    users["student"] = school.first_student_user
+    return users
+
+
+def _timed_run(at: AppTest) -> tuple[float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024
+
+
+def bench_role(role: str, user_id: int, timeout: float = 120) -> dict:
+    """Render every sidebar page of a role's panel; returns {page: measurements}."""
+    at = AppTest.from_function(
+        _panel_script, args=(PANELS[role], user_id, f"{role}{user_id}@school.test"), default_timeout=timeout
+    )
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"{role} panel failed to load: {at.exception[0].message}")
+    pages = at.sidebar.radio[0].options
+    for page in pages:
+        # Warm-up pass so one-off imports (altair, pyarrow) are not charged to a page.
+        at.sidebar.radio[0].set_value(page).run()
+    results = {}
+    for page in pages:
+        at.sidebar.radio[0].set_value(page)
+        cache.clear()
+        cold_s, peak_kb = _timed_run(at)
+        warm_s, _ = _timed_run(at)
+        results[page] = {
+            "cold_s": round(cold_s, 4),
+            "warm_s": round(warm_s, 4),
+            "peak_kb": round(peak_kb, 1),
+            "error": at.exception[0].message if at.exception else None,
+        }
+    return results
+
+
+def run(datasets=("small", "medium", "large"), directory: str = None) -> dict:
+    results = {}
+    for name in datasets:
+        school = prepare_dataset(name, directory)
+        for role, user_id in role_users(school).items():
+            for page, measured in bench_role(role, user_id).items():
+                results[f"{name}/{role}/{page}"] = measured
+    return results
+
+
+def regressions(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> list:
+    """Pages slower or hungrier than the baseline allows, plus pages that raised or have no baseline."""
+    failures = []
+    for key, measured in results.items():
+        if measured["error"]:
+            failures.append(f"{key}: raised {measured['error']}")
+        expected = baseline.get(key)
+        if not expected:
+            failures.append(f"{key}: no baseline entry (rerun with --update-baseline)")
+            continue
+        for metric, slack in (("cold_s", MIN_SLACK_S), ("warm_s", MIN_SLACK_S), ("peak_kb", 256)):
+            limit = expected[metric] * (1 + tolerance) + slack
+            if measured[metric] > limit:
+                failures.append(f"{key}: {metric} {measured[metric]} > {limit:.4f} (baseline {expected[metric]})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark panel renders against stored baselines.")
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed relative slowdown")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.datasets)
+    for key, measured in results.items():
+        print(f"{key:60s} cold {measured['cold_s'] * 1000:8.1f} ms  warm {measured['warm_s'] * 1000:8.1f} ms  "
+              f"peak {measured['peak_kb']:10.1f} KB")
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+    if args.update_baseline:
+        # Replace the measured datasets outright, so renamed or removed pages don't linger
+        baseline = {key: value for key, value in baseline.items() if key.split("/")[0] not in args.datasets}
+        baseline.update(results)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True, ensure_ascii=False)
+        print(f"Baseline updated: {BASELINE_PATH}")
+        return 0
+    failures = regressions(results, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
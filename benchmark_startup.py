@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmark_panels import PANELS
+
+# Cold-start benchmark: every sample runs in a fresh interpreter, so each import
+# is paid again. "login" renders main.py's login page with AppTest; each role
+# then imports its panel module the way main.py does after that role logs in,
+# and "session" logs a student in and renders their dashboard end to end.
+# Streamlit's own import is done before the clock starts, since every page pays
+# it. Reported per step: median milliseconds and which heavy modules were loaded.
+
+RUNS = 5
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ("pandas", "numpy", "mock_data", "passlib", "jose")
+# Engines the data layer imports on first use; a student's dashboard needs none of them
+DEFERRED_MODULES = ("attendance_store", "backup", "class_stats", "performance_cube", "reports", "search_index",
+                    "submission_queue")
+STUDENT_LOGIN = ("student@test.com", "test123")
+
+_LOGIN_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file("main.py", default_timeout=60).run()
+print(json.dumps({"ms": 1000 * (time.perf_counter() - start),
+                  "loaded": [m for m in %r if m in sys.modules],
+                  "error": at.exception[0].message if at.exception else None}))
+"""
+_SESSION_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file("main.py", default_timeout=60).run()
+at.radio(key="role_selector").set_value("Student")
+at.text_input[0].input(sys.argv[1])
+at.text_input[1].input(sys.argv[2])
+at.button[0].click()
+at.run()
+error = at.exception[0].message if at.exception else None
+print(json.dumps({"ms": 1000 * (time.perf_counter() - start),
+                  "loaded": [m for m in %r if m in sys.modules],
+                  "error": error or (None if at.session_state.logged_in else "login failed")}))
+"""
+_PANEL_SCRIPT = """
+import importlib, json, sys, time
+import streamlit
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({"ms": 1000 * (time.perf_counter() - start),
+                  "loaded": [m for m in %r if m in sys.modules], "error": None}))
+"""
+
+
+def _sample(script: str, *args, modules: tuple = HEAVY_MODULES) -> dict:
+    # A scratch data directory, so the logins a sample records stay out of ./data
+    with tempfile.TemporaryDirectory() as data_dir:
+        completed = subprocess.run([sys.executable, "-c", script % (modules,), *args], cwd=APP_DIR,
+                                   capture_output=True, text=True, timeout=300,
+                                   env={**os.environ, "SMS_DATA_DIR": data_dir})
+    if completed.returncode:
+        return {"ms": None, "loaded": [], "error": completed.stderr.strip().splitlines()[-1]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _measure(script: str, *args, runs: int = RUNS, modules: tuple = HEAVY_MODULES) -> dict:
+    samples = [_sample(script, *args, modules=modules) for _ in range(runs)]
+    errors = [s["error"] for s in samples if s["error"]]
+    timings = [s["ms"] for s in samples if s["ms"] is not None]
+    return {
+        "ms": round(statistics.median(timings), 1) if timings else None,
+        "loaded": samples[-1]["loaded"],
+        "error": errors[0] if errors else None,
+    }
+
+
+def measure_login(runs: int = RUNS) -> dict:
+    """Cold render of the login page."""
+    return _measure(_LOGIN_SCRIPT, runs=runs)
+
+
+def measure_panel(role: str, runs: int = RUNS) -> dict:
+    """Cold import of one role's panel module."""
+    return _measure(_PANEL_SCRIPT, PANELS[role], runs=runs)
+
+
+def measure_session(runs: int = RUNS) -> dict:
+    """Cold student login through to the rendered dashboard."""
+    return _measure(_SESSION_SCRIPT, *STUDENT_LOGIN, runs=runs, modules=HEAVY_MODULES + DEFERRED_MODULES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start of the login page and each role panel.")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    args = parser.parse_args()
+
+    results = {"login": measure_login(args.runs)}
+    results.update({role: measure_panel(role, args.runs) for role in PANELS})
+    results["session"] = measure_session(args.runs)
+    for step, result in results.items():
+        timing = f"{result['ms']:8.1f} ms" if result["ms"] is not None else "  failed"
+        print(f"{step:>8}  {timing}  loaded: {', '.join(result['loaded']) or '-'}"
+              + (f"  error: {result['error']}" if result["error"] else ""))
+    login, session = results["login"], results["session"]
+    if login["error"] or "pandas" in login["loaded"] or any(r["error"] for r in results.values()):
+        return 1
+    return 1 if set(DEFERRED_MODULES) & set(session["loaded"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
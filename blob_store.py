@@ -0,0 +1,130 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from storage import DATA_DIR
+
+# Content-addressed file storage for study materials.
+# A file is stored once under the SHA-256 of its bytes (BLOB_DIR/ab/abcdef...),
+# so the same handout uploaded to several classes takes the space of one.
+# Uploads are hashed and written in CHUNK_SIZE pieces to a temporary file that is
+# renamed into place, never holding the whole file in memory. Reads go through
+# memory-mapped files; read() additionally keeps one process-wide bytes copy of
+# recently served blobs (up to CACHE_BYTES), shared by every session, because
+# Streamlit's download button needs a bytes object.
+
+BLOB_DIR = os.environ.get("SMS_BLOB_DIR", os.path.join(DATA_DIR, "blobs"))
+CHUNK_SIZE = 1024 * 1024
+CACHE_BYTES = int(os.environ.get("SMS_BLOB_CACHE_MB", 256)) * 1024 * 1024
+
+
+class BlobStore:
+    """Deduplicating file store keyed by SHA-256 hex digest."""
+
+    def __init__(self, root: str = BLOB_DIR, cache_bytes: int = CACHE_BYTES):
+        self.root = root
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()  # digest -> bytes
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, stream, chunk_size: int = CHUNK_SIZE) -> tuple[str, int]:
+        """Store a binary stream (anything with read()); returns (digest, size)."""
+        if hasattr(stream, "seek"):
+            stream.seek(0)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while chunk := stream.read(chunk_size):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            hexdigest = digest.hexdigest()
+            final = self.path(hexdigest)
+            if os.path.exists(final):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(final), exist_ok=True)
+                os.replace(tmp_path, final)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return hexdigest, size
+
+    def digests(self):
+        """Digests of every stored blob."""
+        for prefix in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, prefix)
+            if prefix != "tmp" and os.path.isdir(directory):
+                yield from sorted(os.listdir(directory))
+
+    def open(self, digest: str):
+        """A read-only memory map of the blob (b"" for empty blobs); the caller closes it."""
+        with open(self.path(digest), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def iter_chunks(self, digest: str, chunk_size: int = CHUNK_SIZE):
+        """Stream a blob without materialising it."""
+        mapped = self.open(digest)
+        try:
+            for start in range(0, len(mapped), chunk_size):
+                yield mapped[start:start + chunk_size]
+        finally:
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+    def read(self, digest: str) -> bytes:
+        """The blob's bytes, shared process-wide for recently served blobs."""
+        with self._lock:
+            data = self._cache.get(digest)
+            if data is not None:
+                self._cache.move_to_end(digest)
+                return data
+        mapped = self.open(digest)
+        data = bytes(mapped)
+        if isinstance(mapped, mmap.mmap):
+            mapped.close()
+        if len(data) <= self.cache_bytes:
+            with self._lock:
+                if digest not in self._cache:
+                    self._cache[digest] = data
+                    self._cached_bytes += len(data)
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= len(evicted)
+        return data
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> BlobStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BlobStore()
+    return _store
+
+
+def set_store(store: BlobStore) -> BlobStore:
+    global _store
+    with _store_lock:
+        _store = store
+    return store
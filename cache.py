@@ -0,0 +1,122 @@
+import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Process-wide read cache shared by every Streamlit session.
+# Entries expire after a TTL, the least recently used entry is evicted once the
+# cache is full, and writers invalidate only the namespace/key prefix they touch.
+# Every caller gets its own deep copy of a cached value, so a session that edits
+# a result changes neither the cache nor the backend's rows it was read from.
+# A read that overlapped an invalidation of its namespace is returned but not
+# stored, so a slow reader cannot put back data a writer has just replaced.
+# st.cache_data is not used because it can only be cleared per function, not per key.
+
+DEFAULT_TTL = float(os.environ.get("SMS_CACHE_TTL", 300))
+MAX_ENTRIES = int(os.environ.get("SMS_CACHE_SIZE", 10000))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU cache with per-entry expiry and prefix invalidation within a namespace."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (namespace, args) -> (expires_at, value)
+        self._namespaces = {}  # namespace -> keys, so invalidation never scans other namespaces
+        self._versions = {}  # namespace -> number of invalidations so far
+        self._clears = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                    self._namespaces[key[0]].discard(key)
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def version(self, namespace: str) -> tuple:
+        with self._lock:
+            return self._clears, self._versions.get(namespace, 0)
+
+    def set(self, key, value, ttl: float, version: tuple = None):
+        """Store a value; with version, only if the namespace was not invalidated since it was read."""
+        with self._lock:
+            if version is not None and (self._clears, self._versions.get(key[0], 0)) != version:
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            self._namespaces.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._namespaces[evicted[0]].discard(evicted)
+
+    def invalidate(self, namespace: str, *args) -> int:
+        """Drop entries in a namespace whose arguments start with args."""
+        prefix = tuple(args)
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            keys = self._namespaces.get(namespace, set())
+            stale = [key for key in keys if key[1][:len(prefix)] == prefix]
+            for key in stale:
+                del self._entries[key]
+                keys.discard(key)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._namespaces.clear()
+            self._clears += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_cache = TTLCache()
+
+
+def cached(namespace: str, ttl: float = DEFAULT_TTL, copy_result: bool = True):
+    """Cache a getter's result under (namespace, arguments).
+
+    Callers get a deep copy of the cached value; copy_result=False shares it, for
+    values nobody mutates (rendered figures).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (namespace, args + tuple(sorted(kwargs.items())))
+            value = _cache.get(key)
+            if value is _MISSING:
+                version = _cache.version(namespace)
+                value = func(*args, **kwargs)
+                _cache.set(key, value, ttl, version)
+            return copy.deepcopy(value) if copy_result else value
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def invalidate(namespace: str, *args) -> int:
+    """Invalidate cached reads for a namespace, optionally narrowed to leading arguments."""
+    return _cache.invalidate(namespace, *args)
+
+
+def clear():
+    _cache.clear()
+
+
+def stats() -> dict:
+    return _cache.stats()
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+# Plotly figures with their series downsampled on the server.
+# A trace longer than the chart's pixel budget is cut into equal x ranges and
+# each range keeps only its first, lowest, highest and last point, so spikes
+# and dips survive while a trace never carries more than about CHART_WIDTH
+# points to the browser. Callers cache the finished figures per (entity, range)
+# in mock_data, so a rerun re-sends a small figure without recomputing it.
+
+CHART_WIDTH = int(os.environ.get("SMS_CHART_WIDTH", 800))
+CHART_HEIGHT = 320
+POINTS_PER_BUCKET = 4
+
+
+def downsample(x, y, width: int = CHART_WIDTH) -> tuple[np.ndarray, np.ndarray]:
+    """At most about width points of a series sorted by x, keeping each bucket's extremes."""
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    if len(x) <= width:
+        return x, y
+    if x.dtype.kind == "M":
+        positions = x.astype("M8[s]").astype(np.int64)
+    elif x.dtype.kind in "iuf":
+        positions = x.astype(float)
+    else:  # categories: bucket by position
+        positions = np.arange(len(x))
+    buckets = max(width // POINTS_PER_BUCKET, 1)
+    edges = np.linspace(positions[0], positions[-1], buckets + 1)
+    bucket = np.clip(np.searchsorted(edges, positions, side="right") - 1, 0, buckets - 1)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(x)]
+    keep = []
+    for start, end in zip(starts, ends):
+        segment = y[start:end]
+        keep += [start, start + int(np.argmin(segment)), start + int(np.argmax(segment)), end - 1]
+    keep = np.unique(keep)
+    return x[keep], y[keep]
+
+
+def _layout(figure: go.Figure, title: str = None, y_title: str = None) -> go.Figure:
+    figure.update_layout(
+        title=title, height=CHART_HEIGHT, yaxis_title=y_title, hovermode="x unified",
+        margin=dict(l=10, r=10, t=40 if title else 10, b=10), legend=dict(orientation="h", y=-0.2),
+    )
+    return figure
+
+
+def line_figure(series: dict, title: str = None, y_title: str = None, markers=(), width: int = CHART_WIDTH):
+    """One trace per name -> (x, y), each downsampled to width; names in markers are drawn as points."""
+    figure = go.Figure()
+    for name, (x, y) in series.items():
+        x, y = downsample(x, y, width)
+        figure.add_trace(go.Scatter(x=x, y=y, name=name, mode="markers" if name in markers else "lines"))
+    return _layout(figure, title, y_title)
+
+
+def bar_figure(labels, values, title: str = None, y_title: str = None):
+    return _layout(go.Figure(go.Bar(x=list(labels), y=list(values))), title, y_title)
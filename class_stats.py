@@ -0,0 +1,152 @@
+import math
+import threading
+
+import numpy as np
+
+# Running marks statistics, one aggregate per (class, subject, exam).
+# Each aggregate keeps count, sum, sum of squares and min/max, plus a fixed-width
+# histogram of marks as its quantile sketch. Histograms of different aggregates
+# merge by adding bins, and reading a quantile walks a histogram whose size is
+# set by the mark range, so every read is independent of the cohort size.
+# enter_marks replaces marks, so the aggregate also remembers each student's
+# current mark to retract it first.
+
+BIN_WIDTH = 0.5
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class MarkStats:
+    """Mergeable running statistics over one set of marks."""
+
+    def __init__(self, marks: dict = None):
+        self.marks = {}
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.histogram = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+        if marks:
+            self.update(marks)
+
+    def _bin(self, value: float) -> int:
+        index = int(max(value, 0) // BIN_WIDTH)
+        if index >= self.histogram.size:
+            self.histogram = np.pad(self.histogram, (0, index + 1 - self.histogram.size))
+        return index
+
+    def _add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.total_squares += value * value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        index = self._bin(value)
+        self.histogram[index] += 1
+
+    def _remove(self, value: float):
+        self.count -= 1
+        self.total -= value
+        self.total_squares -= value * value
+        self.histogram[int(max(value, 0) // BIN_WIDTH)] -= 1
+        if self.count == 0:
+            self.min, self.max = math.inf, -math.inf
+        elif value <= self.min or value >= self.max:
+            # A retracted extreme moves to the outermost occupied bins (exact for marks on the bin
+            # grid), so the cost is set by the mark range, not the cohort size.
+            occupied = np.flatnonzero(self.histogram)
+            if value <= self.min:
+                self.min = max(self.min, occupied[0] * BIN_WIDTH)
+            if value >= self.max:
+                self.max = min(self.max, occupied[-1] * BIN_WIDTH)
+
+    def update(self, marks: dict):
+        """Apply {student_id: marks}, replacing any mark a student already has."""
+        with self._lock:
+            for student_id, value in marks.items():
+                value = float(value)
+                previous = self.marks.pop(student_id, None)
+                if previous is not None:
+                    self._remove(previous)
+                self.marks[student_id] = value
+                self._add(value)
+
+    def merge(self, other: "MarkStats") -> "MarkStats":
+        """Combine two aggregates over different students (e.g. classes of a department) without revisiting marks."""
+        overlap = self.marks.keys() & other.marks.keys()
+        if overlap:
+            raise ValueError(f"Cannot merge marks of the same students twice: {sorted(overlap)[:5]}")
+        merged = MarkStats()
+        merged.marks = {**self.marks, **other.marks}
+        merged.count = self.count + other.count
+        merged.total = self.total + other.total
+        merged.total_squares = self.total_squares + other.total_squares
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        size = max(self.histogram.size, other.histogram.size)
+        merged.histogram = (np.pad(self.histogram, (0, size - self.histogram.size))
+                            + np.pad(other.histogram, (0, size - other.histogram.size)))
+        return merged
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        if not self.count:
+            return 0.0
+        return math.sqrt(max(self.total_squares / self.count - self.mean ** 2, 0.0))
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (0..1), interpolated within a histogram bin and clamped to min/max."""
+        if not self.count:
+            return 0.0
+        cumulative = np.cumsum(self.histogram)
+        target = q * self.count
+        index = int(np.searchsorted(cumulative, target, side="left"))
+        below = cumulative[index - 1] if index else 0
+        inside = self.histogram[index]
+        value = (index + (target - below) / inside) * BIN_WIDTH if inside else index * BIN_WIDTH
+        return float(min(max(value, self.min), self.max))
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        summary = {
+            "count": self.count, "mean": round(self.mean, 2), "std": round(self.std, 2),
+            "min": self.min, "max": self.max,
+        }
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}"] = round(self.quantile(percentile / 100), 2)
+        summary["median"] = summary["p50"]
+        return summary
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_stats(class_name: str, subject: str, exam_type: str, loader) -> MarkStats:
+    """Return the aggregate, building it once from loader(class_name, subject, exam_type) -> {student_id: marks}."""
+    key = (class_name, subject, exam_type)
+    stats = _stats.get(key)
+    if stats is None:
+        with _stats_lock:
+            stats = _stats.get(key)
+            if stats is None:
+                stats = _stats[key] = MarkStats(loader(class_name, subject, exam_type))
+    return stats
+
+
+def record(class_name: str, subject: str, exam_type: str, marks: dict):
+    """Apply a write to an already built aggregate; unbuilt ones pick it up on load."""
+    stats = _stats.get((class_name, subject, exam_type))
+    if stats is not None:
+        stats.update(marks)
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
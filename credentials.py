@@ -0,0 +1,94 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+
+# Password checks against the storage backend's users table.
+# Passwords are stored as salted PBKDF2-SHA256 hashes (rounds tunable with
+# SMS_HASH_ROUNDS) in users.password_hash, looked up by the indexed email, so
+# accounts created at runtime can log in and changed passwords survive restarts
+# and are shared by every replica. An account without a hash (one that predates
+# the column) never matches until its password is reset. Verification is
+# deliberately slow, so it runs on a small bounded worker pool: hashlib releases
+# the GIL while hashing, and capping the pool keeps a burst of logins from
+# starving other sessions' reruns.
+
+HASH_ROUNDS = int(os.environ.get("SMS_HASH_ROUNDS", 29000))
+AUTH_WORKERS = int(os.environ.get("SMS_AUTH_WORKERS", 4))
+VERIFY_TIMEOUT = 30
+
+
+class CredentialStore:
+    """Salted password hashing and off-thread verification of the backend's accounts."""
+
+    def __init__(self, backend=None, rounds: int = HASH_ROUNDS, workers: int = AUTH_WORKERS):
+        from passlib.context import CryptContext  # loaded with the first store, not at app start
+
+        self.context = CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__rounds=rounds)
+        self._backend = backend
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth")
+
+    @property
+    def backend(self):
+        """The backend given to the store, else the process-wide one."""
+        return self._backend if self._backend is not None else storage.get_backend()
+
+    def hash(self, password: str) -> str:
+        """A new salted hash of password, computed on the worker pool."""
+        return self._pool.submit(self.context.hash, password).result(timeout=VERIFY_TIMEOUT)
+
+    def lookup(self, email: str):
+        """The account record (id, role, is_active, password_hash) for an email, or None."""
+        return self.backend.get_credentials(email.strip().lower())
+
+    @staticmethod
+    def needs_reset(user) -> bool:
+        """True for accounts with no stored hash (migrated from before hashes); they cannot log in until reset."""
+        return not user["password_hash"]
+
+    def _check(self, email: str, password: str):
+        user = self.lookup(email)
+        if user is None or self.needs_reset(user):
+            # Burn the same work as a real check so unknown emails and reset accounts are not faster to reject.
+            self.context.dummy_verify()
+            return None
+        return user if self.context.verify(password, user["password_hash"]) else None
+
+    def verify(self, email: str, password: str):
+        """Return the account if the password matches, else None; hashing runs on the worker pool."""
+        return self._pool.submit(self._check, email, password).result(timeout=VERIFY_TIMEOUT)
+
+    def set_password(self, user_id: int, old_password: str, new_password: str) -> bool:
+        """Replace a user's password after checking the current one."""
+        current = self.backend.get_password_hash(user_id)
+        if not current or not self._pool.submit(self.context.verify, old_password, current).result(
+                timeout=VERIFY_TIMEOUT):
+            return False
+        return self.backend.set_password_hash(user_id, self.hash(new_password))
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> CredentialStore:
+    """The process-wide credential store, created on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CredentialStore()
+    return _store
+
+
+def set_store(store: CredentialStore) -> CredentialStore:
+    global _store
+    with _store_lock:
+        previous, _store = _store, store
+    if previous is not None and previous is not store:
+        previous.close()
+    return store
@@ -0,0 +1,340 @@
+import argparse
+import csv
+import json
+import os
+import random
+import string
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import attendance_store
+from storage import DEMO_PASSWORD_HASH
+
+# Deterministic synthetic schools for load tests and benchmarks.
+# Records use the same shapes as the MOCK_* data ("class" key included), are
+# produced lazily table by table, and can be streamed into the SQLite backend
+# or written to JSONL/CSV files. Attendance and marks are drawn with numpy per
+# class, so a 100k-student school is generated in seconds.
+
+FIRST_NAMES = [
+    "John", "Jane", "Aarav", "Priya", "Liam", "Emma", "Noah", "Olivia", "Mateo", "Sofia",
+    "Yusuf", "Amara", "Chen", "Mei", "Lucas", "Isla", "Omar", "Zara", "Ethan", "Ava",
+]
+LAST_NAMES = [
+    "Doe", "Smith", "Johnson", "Brown", "Wilson", "Davis", "Taylor", "Anderson", "Patel", "Khan",
+    "Garcia", "Nguyen", "Okafor", "Kim", "Rossi", "Muller", "Silva", "Cohen", "Sato", "Ivanova",
+]
+DEPARTMENTS = ["Physics", "Chemistry", "Mathematics", "Biology", "Computer Science", "English", "History"]
+SUBJECTS = ["Physics", "Mathematics", "Chemistry", "Biology", "English", "History"]
+EXAM_TYPES = ["Unit Test 1", "Mid Term", "Unit Test 2", "Final Term"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+PERIOD_TIMES = ["08:00-09:00", "09:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00", "13:00-14:00"]
+
+# Insert order respects the users foreign keys.
+TABLES = [
+    "users", "departments", "classes", "students", "teachers", "hods", "admins",
+    "timetable", "assignments", "marks", "attendance",
+]
+
+
+class SyntheticSchool:
+    """Seeded generator for schools x departments x classes x students."""
+
+    def __init__(self, schools: int = 1, departments: int = 5, classes_per_department: int = 4,
+                 students_per_class: int = 40, teachers_per_department: int = 4,
+                 start_date: str = "2024-01-01", days: int = 365, seed: int = 0):
+        self.schools = schools
+        self.departments = DEPARTMENTS[:departments]
+        self.classes_per_department = classes_per_department
+        self.students_per_class = students_per_class
+        self.teachers_per_department = teachers_per_department
+        self.start_date = date.fromisoformat(start_date)
+        self.days = days
+        self.seed = seed
+        self._build_structure()
+
+    @property
+    def student_count(self) -> int:
+        return len(self.class_list) * self.students_per_class
+
+    def _name(self, rng: random.Random) -> tuple[str, str]:
+        return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+    def _build_structure(self):
+        """Lay out the small dimension tables; per-student tables are streamed later."""
+        rng = random.Random(self.seed)
+        self.department_list, self.class_list, self.staff = [], [], []
+        next_user = 1
+        for school in range(1, self.schools + 1):
+            prefix = f"S{school} " if self.schools > 1 else ""
+            self.staff.append({"user_id": next_user, "role": "admin", "school": school, "name": self._name(rng)})
+            next_user += 1
+            for dept in self.departments:
+                dept_name = f"{prefix}{dept}"
+                hod_name = self._name(rng)
+                self.staff.append({"user_id": next_user, "role": "hod", "department": dept_name, "name": hod_name})
+                next_user += 1
+                teachers = []
+                for _ in range(self.teachers_per_department):
+                    teacher = {"user_id": next_user, "role": "teacher", "department": dept_name,
+                               "name": self._name(rng)}
+                    self.staff.append(teacher)
+                    teachers.append(teacher)
+                    next_user += 1
+                self.department_list.append({
+                    "id": len(self.department_list) + 1,
+                    "name": dept_name,
+                    "hod": " ".join(hod_name),
+                    "teachers": self.teachers_per_department,
+                    "students": self.classes_per_department * self.students_per_class,
+                })
+                for section in range(self.classes_per_department):
+                    grade = 9 + section % 4
+                    label = string.ascii_uppercase[section // 4 % 26] + (str(section // 104) if section >= 104 else "")
+                    class_name = f"{prefix}{dept[:3].upper()}-{grade}{label}"
+                    self.class_list.append({
+                        "id": len(self.class_list) + 1,
+                        "name": class_name,
+                        "strength": self.students_per_class,
+                        "class_teacher": " ".join(teachers[section % len(teachers)]["name"]),
+                        "department": dept_name,
+                        "teachers": teachers,
+                    })
+        self.first_student_user = next_user
+
+    def _student_ids(self, class_index: int) -> range:
+        start = class_index * self.students_per_class
+        return range(start + 1, start + self.students_per_class + 1)
+
+    def _class_rng(self, class_index: int, stream: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, class_index, stream])
+
+    def _slot_subjects(self, class_index: int) -> np.ndarray:
+        """Subject index per (weekday, period) for a class's weekly timetable."""
+        rng = self._class_rng(class_index, 0)
+        return rng.integers(0, len(SUBJECTS), size=(len(WEEKDAYS), len(PERIOD_TIMES)))
+
+    def users(self):
+        for person in self.staff:
+            yield {"id": person["user_id"], "role": person["role"],
+                   "email": f"{person['role']}{person['user_id']}@school.test", "is_active": True,
+                   "password_hash": DEMO_PASSWORD_HASH}
+        for class_index in range(len(self.class_list)):
+            for student_id in self._student_ids(class_index):
+                user_id = self.first_student_user + student_id - 1
+                yield {"id": user_id, "role": "student", "email": f"student{user_id}@school.test", "is_active": True,
+                       "password_hash": DEMO_PASSWORD_HASH}
+
+    def departments_(self):
+        for dept in self.department_list:
+            yield dict(dept)
+
+    def classes(self):
+        for cls in self.class_list:
+            yield {k: cls[k] for k in ("id", "name", "strength", "class_teacher")}
+
+    def students(self):
+        rng = random.Random(self.seed + 1)
+        for class_index, cls in enumerate(self.class_list):
+            for roll, student_id in enumerate(self._student_ids(class_index), start=1):
+                first_name, last_name = self._name(rng)
+                user_id = self.first_student_user + student_id - 1
+                yield {
+                    "id": student_id,
+                    "user_id": user_id,
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "class": cls["name"],
+                    "roll_number": f"R{cls['id']:04d}{roll:03d}",
+                    "date_of_birth": f"{2006 + rng.randrange(4)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+                    "gender": rng.choice(["Male", "Female"]),
+                    "contact_number": f"+1{rng.randrange(10**9, 10**10)}",
+                    "address": f"{rng.randrange(1, 999)} Main St, City",
+                    "admission_date": f"{2018 + rng.randrange(5)}-06-01",
+                    "profile_image_url": "https://via.placeholder.com/150",
+                    "department": cls["department"],
+                }
+
+    def _staff_profiles(self, role: str):
+        for person in self.staff:
+            if person["role"] != role:
+                continue
+            first_name, last_name = person["name"]
+            profile = {"id": person["user_id"], "user_id": person["user_id"], "first_name": first_name,
+                       "last_name": last_name, "contact_number": f"+1{5550000000 + person['user_id']}",
+                       "profile_image_url": "https://via.placeholder.com/150"}
+            if role == "admin":
+                profile["designation"] = "System Administrator"
+            else:
+                profile.update({
+                    "department": person["department"],
+                    "designation": "Head of Department" if role == "hod" else "Teacher",
+                    "qualification": "M.Sc.",
+                    "joining_date": "2015-08-01",
+                    "employee_id": f"{role[0].upper()}{person['user_id']:05d}",
+                })
+            yield profile
+
+    def teachers(self):
+        return self._staff_profiles("teacher")
+
+    def hods(self):
+        return self._staff_profiles("hod")
+
+    def admins(self):
+        return self._staff_profiles("admin")
+
+    def timetable(self):
+        for class_index, cls in enumerate(self.class_list):
+            slots = self._slot_subjects(class_index)
+            for day_index, day in enumerate(WEEKDAYS):
+                for period, time_slot in enumerate(PERIOD_TIMES):
+                    subject = SUBJECTS[slots[day_index, period]]
+                    teacher = cls["teachers"][(day_index + period) % len(cls["teachers"])]
+                    yield {"class": cls["name"], "day": day, "time": time_slot, "subject": subject,
+                           "teacher": " ".join(teacher["name"]), "room": f"{100 + cls['id'] % 400}",
+                           "teacher_id": teacher["user_id"]}
+
+    def assignments(self):
+        assignment_id = 0
+        for class_index, cls in enumerate(self.class_list):
+            for month in range(0, 12, 2):
+                due = self.start_date + timedelta(days=30 * month + 14)
+                for subject in SUBJECTS[:3]:
+                    assignment_id += 1
+                    teacher = cls["teachers"][assignment_id % len(cls["teachers"])]
+                    yield {"id": assignment_id, "title": f"{subject} Assignment {month // 2 + 1}",
+                           "description": f"Practice set for {subject} unit {month // 2 + 1}",
+                           "subject": subject, "class": cls["name"], "due_date": due.isoformat(),
+                           "max_marks": 50, "teacher": " ".join(teacher["name"]), "created_by": teacher["user_id"]}
+
+    def marks(self):
+        exam_dates = [(self.start_date + timedelta(days=self.days * (i + 1) // (len(EXAM_TYPES) + 1))).isoformat()
+                      for i in range(len(EXAM_TYPES))]
+        for class_index, cls in enumerate(self.class_list):
+            rng = self._class_rng(class_index, 1)
+            ability = rng.normal(70, 12, size=self.students_per_class)
+            scores = np.clip(ability[:, None, None] + rng.normal(0, 8, size=(self.students_per_class,
+                             len(SUBJECTS), len(EXAM_TYPES))), 0, 100).round().astype(int)
+            teacher_id = cls["teachers"][0]["user_id"]
+            for row, student_id in enumerate(self._student_ids(class_index)):
+                for s, subject in enumerate(SUBJECTS):
+                    for e, exam in enumerate(EXAM_TYPES):
+                        yield {"student_id": student_id, "class": cls["name"], "subject": subject, "exam_type": exam,
+                               "marks": int(scores[row, s, e]), "max_marks": 100, "date": exam_dates[e],
+                               "entered_by": teacher_id}
+
+    def attendance_bitmap(self, class_index: int) -> attendance_store.ClassAttendance:
+        """A year of attendance for one class, drawn directly as bitmaps."""
+        rng = self._class_rng(class_index, 2)
+        students = self.students_per_class
+        periods = len(PERIOD_TIMES)
+        calendar = np.datetime64(self.start_date) + np.arange(self.days)
+        weekday = (calendar.astype("M8[D]").astype(np.int64) - 4) % 7  # 1970-01-01 was a Thursday
+        school_day = weekday < 5
+        rate = rng.beta(18, 2, size=students)
+        # packbits pads the period axis to 8 bits, giving one byte per student per day.
+        present = np.packbits(rng.random((students, self.days, periods), dtype=np.float32) < rate[:, None, None],
+                              axis=-1, bitorder="little")[..., 0]
+        recorded = np.broadcast_to(np.where(school_day, np.uint8((1 << periods) - 1), np.uint8(0)),
+                                   (students, self.days))
+        slot_subject = np.full((self.days, attendance_store.PERIODS_PER_DAY), -1, dtype=np.int16)
+        slot_subject[school_day, :periods] = self._slot_subjects(class_index)[weekday[school_day]]
+        store = attendance_store.ClassAttendance(self._student_ids(class_index), start=calendar[0])
+        store.load_arrays(present & recorded, recorded, slot_subject, SUBJECTS)
+        return store
+
+    def attendance(self):
+        """Attendance in MOCK_ATTENDANCE row form, expanded from the class bitmaps."""
+        for class_index, cls in enumerate(self.class_list):
+            yield from self.attendance_bitmap(class_index).records(class_name=cls["name"])
+
+    def tables(self, attendance: bool = True):
+        """Yield (table, rows) in insert order; rows are produced lazily."""
+        producers = {"departments": self.departments_}
+        for table in TABLES:
+            if table == "attendance" and not attendance:
+                continue
+            yield table, producers.get(table, getattr(self, table))()
+
+
+def load_into_backend(school: SyntheticSchool, backend, attendance_rows: bool = True) -> dict:
+    """Stream every table into a SQLite backend inside one transaction.
+
+    With attendance_rows=False the attendance table is skipped and the class
+    bitmaps are installed into attendance_store instead, which is how
+    100k-student datasets stay in the seconds range.
+    """
+    counts = {}
+    with backend.bulk_load() as conn:
+        for table, rows in school.tables(attendance=attendance_rows):
+            counts[table] = backend.bulk_insert(table, rows, conn, rename={"class": "class_name"})
+    if not attendance_rows:
+        for class_index, cls in enumerate(school.class_list):
+            attendance_store.install(cls["name"], school.attendance_bitmap(class_index))
+    return counts
+
+
+def write_files(school: SyntheticSchool, directory: str, fmt: str = "jsonl", attendance_rows: bool = False) -> dict:
+    """Write one file per table; attendance is saved as per-class .npz bitmaps."""
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    for table, rows in school.tables(attendance=attendance_rows):
+        path = os.path.join(directory, f"{table}.{fmt}")
+        count = 0
+        with open(path, "w", newline="") as f:
+            if fmt == "jsonl":
+                for count, row in enumerate(rows, start=1):
+                    f.write(json.dumps(row))
+                    f.write("\n")
+            elif fmt == "csv":
+                writer = None
+                for count, row in enumerate(rows, start=1):
+                    if writer is None:
+                        writer = csv.DictWriter(f, fieldnames=list(row))
+                        writer.writeheader()
+                    writer.writerow(row)
+            else:
+                raise ValueError(f"Unknown format: {fmt}")
+        counts[table] = count
+    bitmap_dir = os.path.join(directory, "attendance_bitmaps")
+    os.makedirs(bitmap_dir, exist_ok=True)
+    for class_index, cls in enumerate(school.class_list):
+        school.attendance_bitmap(class_index).save(os.path.join(bitmap_dir, f"{cls['id']:05d}.npz"))
+    counts["attendance_bitmaps"] = len(school.class_list)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic school dataset.")
+    parser.add_argument("--students", type=int, default=5000, help="approximate total number of students")
+    parser.add_argument("--schools", type=int, default=1)
+    parser.add_argument("--departments", type=int, default=5)
+    parser.add_argument("--students-per-class", type=int, default=40)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sqlite", help="SQLite database to load")
+    parser.add_argument("--out", help="directory for file output")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--attendance-rows", action="store_true", help="also write attendance as rows")
+    args = parser.parse_args()
+
+    classes = max(1, round(args.students / (args.students_per_class * args.schools * args.departments)))
+    school = SyntheticSchool(schools=args.schools, departments=args.departments, classes_per_department=classes,
+                             students_per_class=args.students_per_class, days=args.days, seed=args.seed)
+    started = time.perf_counter()
+    if args.sqlite:
+        from storage import SQLiteBackend
+
+        counts = load_into_backend(school, SQLiteBackend(args.sqlite), attendance_rows=args.attendance_rows)
+    elif args.out:
+        counts = write_files(school, args.out, args.format, attendance_rows=args.attendance_rows)
+    else:
+        parser.error("pass --sqlite or --out")
+    print(f"{school.student_count} students in {time.perf_counter() - started:.2f}s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
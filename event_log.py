@@ -0,0 +1,253 @@
+import bisect
+import functools
+import inspect
+import json
+import os
+import threading
+from array import array
+from datetime import date, datetime, timedelta
+
+from storage import DATA_DIR
+
+# Append-only event log (logins, writes, errors) in daily segment files.
+# LOG_DIR/YYYY-MM-DD.jsonl holds one JSON event per line. Two sidecar indexes
+# are appended alongside: YYYY-MM-DD.ts records the timestamp and byte offset
+# of every TS_EVERY-th event (sparse), and YYYY-MM-DD.<type>.idx the offsets of
+# every event of that type (8-byte unsigned ints). A query only opens the
+# segments of days in its range, uses the sparse index to skip to the part of a
+# day inside the range, and with a type filter seeks straight to that type's
+# events. Results are newest first and paged with a (day, offset) cursor.
+
+LOG_DIR = os.environ.get("SMS_LOG_DIR", os.path.join(DATA_DIR, "logs"))
+TS_EVERY = 256
+EVENT_TYPES = ("login", "write", "error")
+PAGE_SIZE = 50
+
+
+class _Segment:
+    """Indexes of one day's segment, loaded from the sidecars and extended on append."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stamps, self.offsets = [], []  # sparse: timestamp and offset of every TS_EVERY-th event
+        self.types = {}  # type -> array of offsets
+        self.count = 0
+        self.size = 0
+        base = path[:-len(".jsonl")]
+        if os.path.exists(base + ".ts"):
+            with open(base + ".ts") as f:
+                for line in f:
+                    stamp, offset = line.split()
+                    self.stamps.append(stamp.replace("T", " "))
+                    self.offsets.append(int(offset))
+        for event_type in EVENT_TYPES:
+            offsets = array("Q")
+            if os.path.exists(f"{base}.{event_type}.idx"):
+                with open(f"{base}.{event_type}.idx", "rb") as f:
+                    offsets.frombytes(f.read())
+            self.types[event_type] = offsets
+            self.count += len(offsets)
+        if os.path.exists(path):
+            self.size = os.path.getsize(path)
+
+    def block_bounds(self, start: str, end: str) -> tuple:
+        """Byte range [lo, hi) that holds every event timestamped within [start, end]."""
+        first = bisect.bisect_left(self.stamps, start) - 1
+        lo = self.offsets[first] if first >= 0 else 0
+        last = bisect.bisect_right(self.stamps, end)
+        hi = self.offsets[last] if last < len(self.offsets) else self.size
+        return lo, hi
+
+
+class EventLog:
+    """Daily-segmented event log with sparse time and per-type indexes."""
+
+    def __init__(self, root: str = LOG_DIR):
+        self.root = root
+        self._segments = {}  # day -> _Segment
+        self._lock = threading.Lock()
+        self._files = {}  # suffix -> open append handle for the current day
+        self._files_day = None
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, day: str, suffix: str = ".jsonl") -> str:
+        return os.path.join(self.root, day + suffix)
+
+    def _segment(self, day: str) -> _Segment:
+        segment = self._segments.get(day)
+        if segment is None:
+            segment = self._segments[day] = _Segment(self._path(day))
+        return segment
+
+    def _write(self, day: str, suffix: str, data: bytes):
+        if self._files_day != day:
+            self._close_files()
+            self._files_day = day
+        f = self._files.get(suffix)
+        if f is None:
+            f = self._files[suffix] = open(self._path(day, suffix), "ab")
+        f.write(data)
+        f.flush()
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        self._files_day = None
+
+    def append(self, event_type: str, action: str, user_id: int = None, status: str = "Success",
+               level: str = "Info", detail: str = None, now: datetime = None) -> dict:
+        """Record one event; event_type is one of EVENT_TYPES."""
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {event_type}")
+        now = now or datetime.now()
+        stamp = now.isoformat(sep=" ", timespec="microseconds")
+        event = {"timestamp": stamp, "type": event_type, "level": level, "user_id": user_id,
+                 "action": action, "status": status, "detail": detail}
+        line = (json.dumps(event, default=str) + "\n").encode()
+        day = stamp[:10]
+        with self._lock:
+            segment = self._segment(day)
+            offset = segment.size
+            self._write(day, ".jsonl", line)
+            segment.size += len(line)
+            if segment.count % TS_EVERY == 0:
+                self._write(day, ".ts", f"{stamp.replace(' ', 'T')} {offset}\n".encode())
+                segment.stamps.append(stamp)
+                segment.offsets.append(offset)
+            self._write(day, f".{event_type}.idx", array("Q", [offset]).tobytes())
+            segment.types[event_type].append(offset)
+            segment.count += 1
+        return event
+
+    def days(self) -> list:
+        return sorted(name[:-len(".jsonl")] for name in os.listdir(self.root) if name.endswith(".jsonl"))
+
+    def query(self, start: datetime = None, end: datetime = None, event_type: str = None,
+              cursor: tuple = None, limit: int = PAGE_SIZE) -> tuple:
+        """Events in [start, end] (optionally of one type), newest first; returns (events, next_cursor).
+
+        Pass the returned cursor back for the next page; it is None after the last page.
+        """
+        start_stamp = start.isoformat(sep=" ", timespec="microseconds") if start else ""
+        end_stamp = end.isoformat(sep=" ", timespec="microseconds") if end else "9999"
+        start_day, end_day = start_stamp[:10], end_stamp[:10]
+        if cursor is not None:
+            end_day = min(end_day, cursor[0])
+        events = []
+        for day in reversed(self.days()):
+            if day > end_day:
+                continue
+            if day < start_day:
+                break
+            with self._lock:
+                segment = self._segment(day)
+                lo, hi = segment.block_bounds(start_stamp, end_stamp)
+                if cursor is not None and day == cursor[0]:
+                    hi = min(hi, cursor[1])
+                offsets = None
+                if event_type is not None:
+                    typed = segment.types.get(event_type, ())
+                    offsets = typed[bisect.bisect_left(typed, lo):bisect.bisect_left(typed, hi)]
+            for offset, event in self._read_backwards(day, lo, hi, offsets):
+                if not start_stamp <= event["timestamp"] <= end_stamp:
+                    continue
+                events.append(event)
+                if len(events) == limit:
+                    return events, (day, offset)
+        return events, None
+
+    def _read_backwards(self, day: str, lo: int, hi: int, offsets=None, block: int = 64 * 1024):
+        """(offset, event) pairs in [lo, hi) from the end: whole blocks, or just the given offsets."""
+        with open(self._path(day), "rb") as f:
+            if offsets is not None:
+                for offset in reversed(offsets):
+                    f.seek(offset)
+                    yield offset, json.loads(f.readline())
+                return
+            position = hi
+            while position > lo:
+                start = max(lo, position - block)
+                f.seek(start)
+                data = f.read(position - start)
+                if start > lo:
+                    # Drop the partial first line; it is read with the next block.
+                    cut = data.index(b"\n") + 1 if b"\n" in data else len(data)
+                    start, data = start + cut, data[cut:]
+                    if not data:
+                        block *= 2
+                        continue
+                lines = data.split(b"\n")[:-1]
+                offset = position
+                for line in reversed(lines):
+                    offset -= len(line) + 1
+                    yield offset, json.loads(line)
+                position = start
+
+    def close(self):
+        with self._lock:
+            self._close_files()
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log() -> EventLog:
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = EventLog()
+    return _log
+
+
+def set_log(log: EventLog) -> EventLog:
+    global _log
+    with _log_lock:
+        previous, _log = _log, log
+    if previous is not None and previous is not log:
+        previous.close()
+    return log
+
+
+def record(event_type: str, action: str, user_id: int = None, status: str = "Success", level: str = "Info",
+           detail: str = None):
+    """Append to the process-wide log; logging failures never break the caller."""
+    try:
+        get_log().append(event_type, action, user_id, status, level, detail)
+    except OSError:
+        pass
+
+
+def logged(action: str, actor: str = "user_id"):
+    """Log a writer's calls: a "write" event with Success/Failed, or an "error" event if it raises.
+
+    The acting user is the writer's `actor` argument. Writers whose arguments don't
+    name the actor (actor=None) are given it by the caller as an `actor_id=` keyword,
+    which is consumed here and never reaches the writer.
+    """
+    def decorator(func):
+        position = list(inspect.signature(func).parameters).index(actor) if actor else None
+
+        @functools.wraps(func)
+        def wrapper(*args, actor_id: int = None, **kwargs):
+            user_id = actor_id
+            if user_id is None and actor:
+                user_id = args[position] if len(args) > position else kwargs.get(actor)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                record("error", action, user_id, "Failed", "Error", f"{type(e).__name__}: {e}")
+                raise
+            ok = result is not None and result is not False
+            record("write", action, user_id, "Success" if ok else "Failed", "Info" if ok else "Warning")
+            return result
+        return wrapper
+    return decorator
+
+
+def day_range(start: date, end: date) -> tuple:
+    """Datetimes spanning whole days from start to end."""
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end + timedelta(days=1),
+                                                                          datetime.min.time()) - timedelta(microseconds=1)
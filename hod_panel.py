@@ -1,8 +1,10 @@
 import streamlit as st
+import charts
+import metrics
 import pandas as pd
 from datetime import datetime, timedelta
 # Import mock data functions
-from mock_data import get_hod_info, get_department_info, get_department_teachers, get_department_students, get_department_performance, approve_leave, generate_department_report
+from mock_data import get_hod_info, get_department_info, get_department_teachers, get_department_students, get_department_performance, get_performance_rollup, get_class_trend_chart, approve_leave, generate_department_report, get_profile_image
 
 def show_dashboard(user_id: int):
     # Get HOD information from mock data
@@ -15,22 +17,23 @@ def show_dashboard(user_id: int):
     st.write(f"Head of Department - {hod['department']}")
     
     # Department Overview
+    by_class = get_performance_rollup(user_id, ("class",))
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total Teachers", "12", "+1")
+        st.metric("Total Teachers", str(len(get_department_teachers(user_id))))
     with col2:
-        st.metric("Total Classes", "8", "")
+        st.metric("Total Classes", str(len(by_class)))
     with col3:
-        st.metric("Total Students", "320", "+15")
+        st.metric("Total Students", str(len(get_department_students(user_id))))
     
     # Department Performance
     st.subheader("Department Performance")
-    performance_data = {
-        "Class": ["XI-A", "XI-B", "XII-A", "XII-B"],
-        "Average Score": [85, 82, 88, 86],
-        "Attendance %": [92, 90, 94, 91]
-    }
-    st.dataframe(pd.DataFrame(performance_data), use_container_width=True)
+    if by_class:
+        performance_df = pd.DataFrame(by_class)[["class", "average", "attendance"]]
+        performance_df.columns = ["Class", "Average Score", "Attendance %"]
+        st.dataframe(performance_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("No marks or attendance recorded for the department yet")
 
 def manage_teachers(user_id: int):
     st.title("Teacher Management")
@@ -96,16 +99,48 @@ def view_performance(user_id: int):
     # Get department performance from mock data
     performance = get_department_performance(user_id)
     
-    # Class-wise Performance
+    # Slice the department rollup by any dimension
     st.subheader("Class Performance Analysis")
-    performance_data = {
-        "Class": ["XI-A", "XI-B", "XII-A", "XII-B"],
-        "Physics": [85, 82, 88, 86],
-        "Attendance": [92, 90, 94, 91],
-        "Assignments": [88, 85, 90, 87]
-    }
-    df = pd.DataFrame(performance_data)
-    st.line_chart(df.set_index("Class"))
+    dimensions = {"Class": "class", "Subject": "subject", "Exam": "exam", "Month": "month"}
+    col1, col2 = st.columns(2)
+    with col1:
+        rows_by = st.selectbox("Group By", list(dimensions))
+    with col2:
+        columns_by = st.selectbox("Compare By", ["None"] + [d for d in dimensions if d != rows_by])
+    by = (dimensions[rows_by],) + ((dimensions[columns_by],) if columns_by != "None" else ())
+    rollup = get_performance_rollup(user_id, by)
+    if rollup:
+        df = pd.DataFrame(rollup)
+        if columns_by == "None":
+            df = df.rename(columns={"average": "Average %", "attendance": "Attendance %"})
+            labels = df[by[0]].astype(str)
+            st.plotly_chart(charts.line_figure({
+                "Average %": (labels, df["Average %"].astype(float)),
+                "Attendance %": (labels, df["Attendance %"].astype(float)),
+            }, y_title="%"), use_container_width=True)
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        else:
+            pivot = df.pivot_table(index=by[0], columns=by[1], values="average")
+            labels = pivot.index.astype(str)
+            st.plotly_chart(charts.line_figure({str(column): (labels, pivot[column]) for column in pivot.columns},
+                                               y_title="Average %"), use_container_width=True)
+            st.dataframe(pivot, use_container_width=True)
+        
+        # Daily trend of one class (downsampled and cached on the server)
+        classes = [row["class"] for row in get_performance_rollup(user_id, ("class",))]
+        if classes:
+            st.subheader("Class Trend")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                trend_class = st.selectbox("Class", classes)
+            with col2:
+                start_date = st.date_input("From", value=datetime.now().date() - timedelta(days=365), key="trend_from")
+            with col3:
+                end_date = st.date_input("To", key="trend_to")
+            st.plotly_chart(get_class_trend_chart(trend_class, str(start_date), str(end_date)),
+                            use_container_width=True)
+    else:
+        st.info("No marks or attendance recorded for the department yet")
     
     # Department Statistics
     if performance:
@@ -114,9 +149,9 @@ def view_performance(user_id: int):
         with col1:
             st.metric("Average Percentage", f"{performance['average_percentage']}%")
         with col2:
-            st.metric("Top Performer", performance['top_performer'])
+            st.metric("Top Class", performance['top_class'])
         with col3:
-            st.metric("Improvement Needed", ", ".join(performance['improvement_needed']))
+            st.metric("Improvement Needed", ", ".join(performance['improvement_needed']) or "None")
     
     # Teacher Performance
     st.subheader("Teacher Performance")
@@ -151,24 +186,35 @@ def manage_reports(user_id: int):
     st.title("Department Reports")
     
     report_types = [
-        "Monthly Performance Report",
-        "Teacher Attendance Report",
-        "Student Progress Report",
-        "Lab Usage Report"
+        "Academic Performance Report",
+        "Attendance Summary Report",
+        "Department Statistics Report"
     ]
     
     for report in report_types:
         with st.expander(report):
             col1, col2 = st.columns(2)
             with col1:
-                st.date_input("From Date", key=f"from_{report}")
+                start_date = st.date_input("From Date", value=datetime.now().date() - timedelta(days=365),
+                                           key=f"from_{report}")
             with col2:
-                st.date_input("To Date", key=f"to_{report}")
+                end_date = st.date_input("To Date", key=f"to_{report}")
             if st.button("Generate Report", key=f"gen_{report}"):
-                # Use mock function to generate report
-                if generate_department_report(user_id):
-                    st.success("Report generated successfully!")
-                    st.download_button("Download Report", "dummy_data", f"{report}.pdf", key=f"download_{report}")
+                # Computed in the background; the job is kept so reruns can poll it
+                st.session_state[f"job_{report}"] = generate_department_report(
+                    user_id, report, str(start_date), str(end_date))
+            job = st.session_state.get(f"job_{report}")
+            if job is None:
+                continue
+            if job.status == "ready":
+                st.success("Report generated successfully!")
+                st.download_button("Download Report", job.data, job.file_name, mime=job.mime,
+                                   key=f"download_{report}")
+            elif job.status == "failed":
+                st.error(f"Report failed: {job.error}")
+            else:
+                st.progress(job.progress)
+                st.button("Refresh", key=f"refresh_{report}")
 
 def manage_meetings(user_id: int):
     st.title("Department Meetings")
@@ -210,7 +256,7 @@ def show_profile(user_id: int):
     col1, col2 = st.columns([1, 2])
     with col1:
         st.image(
-            hod.get('profile_image_url', "https://via.placeholder.com/150"),
+            get_profile_image(user_id, hod, "profile"),
             caption=f"{hod['first_name']} {hod['last_name']}"
         )
     with col2:
@@ -258,7 +304,7 @@ def show_panel(user_id: int, email: str):
     # Sidebar navigation
     st.sidebar.title("HOD Portal")
     st.sidebar.image(
-        hod.get('profile_image_url', "https://via.placeholder.com/150"),
+        get_profile_image(user_id, hod, "sidebar"),
         caption=f"{hod['first_name']} {hod['last_name']}"
     )
     menu = st.sidebar.radio("", [
@@ -273,19 +319,20 @@ def show_panel(user_id: int, email: str):
     ])
 
     # Route to appropriate function based on menu selection
-    if menu == "📊 Dashboard":
-        show_dashboard(user_id)
-    elif menu == "👩‍🏫 Teachers":
-        manage_teachers(user_id)
-    elif menu == "📚 Curriculum":
-        manage_curriculum(user_id)
-    elif menu == "📈 Performance":
-        view_performance(user_id)
-    elif menu == "🔧 Resources":
-        manage_resources(user_id)
-    elif menu == "📑 Reports":
-        manage_reports(user_id)
-    elif menu == "📅 Meetings":
-        manage_meetings(user_id)
-    elif menu == "👤 Profile":
-        show_profile(user_id)
\ No newline at end of file
+    with metrics.timer(f"page.HOD.{menu.split(' ', 1)[-1]}"):
+        if menu == "📊 Dashboard":
+            show_dashboard(user_id)
+        elif menu == "👩‍🏫 Teachers":
+            manage_teachers(user_id)
+        elif menu == "📚 Curriculum":
+            manage_curriculum(user_id)
+        elif menu == "📈 Performance":
+            view_performance(user_id)
+        elif menu == "🔧 Resources":
+            manage_resources(user_id)
+        elif menu == "📑 Reports":
+            manage_reports(user_id)
+        elif menu == "📅 Meetings":
+            manage_meetings(user_id)
+        elif menu == "👤 Profile":
+            show_profile(user_id)
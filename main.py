@@ -1,12 +1,25 @@
+import importlib
 import streamlit as st
-import hashlib
 from datetime import datetime, timedelta
 
-# Mock data modules will be created to replace database connections
-import student_panel
-import teacher_panel
-import hod_panel
-import admin_panel
+import credentials
+import event_log
+import metrics
+import rate_limit
+import session_tokens
+
+# Role panels (and through them pandas and the data layer) are imported on first use,
+# so the login page renders without them and a session only loads its own role.
+PANELS = {
+    "Student": "student_panel",
+    "Teacher": "teacher_panel",
+    "HOD": "hod_panel",
+    "Admin": "admin_panel",
+}
+
+def load_panel(role: str):
+    """Import a role's panel module (cached by Python after the first session that needs it)."""
+    return importlib.import_module(PANELS[role])
 
 # Page configuration
 st.set_page_config(
@@ -46,54 +59,66 @@ if 'logged_in' not in st.session_state:
     st.session_state.user_id = None
     st.session_state.user_email = None
     st.session_state.login_time = None
-    st.session_state.login_attempts = 0
-    st.session_state.last_attempt_time = None
-
-def hash_password(password: str) -> str:
-    """Hash password using SHA-256."""
-    return hashlib.sha256(password.encode()).hexdigest()
 
+@metrics.timed("auth.verify_login")
 def verify_login(email: str, password: str) -> tuple[bool, str, int]:
     """Verify user credentials and return login status, role and user_id."""
     try:
-        # Mock user data
-        mock_users = {
-            "student@test.com": {"id": 1, "role": "student", "password_hash": hash_password("test123"), "is_active": True},
-            "teacher@test.com": {"id": 2, "role": "teacher", "password_hash": hash_password("test123"), "is_active": True},
-            "hod@test.com": {"id": 3, "role": "hod", "password_hash": hash_password("test123"), "is_active": True},
-            "admin@test.com": {"id": 4, "role": "admin", "password_hash": hash_password("test123"), "is_active": True},
-            "inactive@test.com": {"id": 5, "role": "student", "password_hash": hash_password("test123"), "is_active": False}
-        }
+        store = credentials.get_store()
         
-        # Check if email exists in mock data
-        if email not in mock_users:
+        # Check if email exists
+        user = store.lookup(email)
+        if user is None:
+            # Still hash, so unknown emails take as long as wrong passwords
+            store.verify(email, password)
             return False, None, None
         
-        user = mock_users[email]
-        
         # Check if account is active
         if not user['is_active']:
             st.error("Account is inactive. Please contact administrator.")
             return False, None, None
         
-        # Verify password
-        if user['password_hash'] == hash_password(password):
+        # Accounts migrated without a hash still pay for a check, then are told to reset
+        if store.needs_reset(user):
+            store.verify(email, password)
+            st.error("Your password must be reset. Please contact administrator.")
+            return False, None, None
+        
+        # Verify password (salted hash, checked on the auth worker pool)
+        if store.verify(email, password):
             # In a real app, we would update last login time and log the attempt
             return True, user['role'], user['id']
         
         return False, None, None
         
     except Exception as e:
+        event_log.record("error", "Login", status="Failed", level="Error", detail=f"{type(e).__name__}: {e}")
         st.error(f"Login error: {str(e)}")
         return False, None, None
 
 # Logout Function
 def logout():
+    if st.session_state.user_id is not None:
+        event_log.record("login", "Logout", st.session_state.user_id)
     st.session_state.logged_in = False
     st.session_state.current_role = None
     st.session_state.user_id = None
     st.session_state.user_email = None
     st.session_state.login_time = None
+    if session_tokens.enabled():
+        st.query_params.pop(session_tokens.QUERY_PARAM, None)
+
+# Token mode: the signed token in the URL carries the login, so any replica can serve this rerun
+if session_tokens.enabled():
+    claims = session_tokens.get_signer().verify(st.query_params.get(session_tokens.QUERY_PARAM))
+    if claims:
+        st.session_state.logged_in = True
+        st.session_state.current_role = claims['role']
+        st.session_state.user_id = int(claims['sub'])
+        st.session_state.user_email = claims['email']
+        st.session_state.login_time = datetime.fromtimestamp(claims['iat'])
+    elif st.session_state.logged_in:
+        logout()
 
 # Main App Logic
 if not st.session_state.logged_in:
@@ -119,19 +144,13 @@ if not st.session_state.logged_in:
         
         if st.button("Login", use_container_width=True):
             if email and password:
-                # Check for too many failed attempts
-                if st.session_state.login_attempts >= 5:
-                    if st.session_state.last_attempt_time:
-                        time_diff = datetime.now() - st.session_state.last_attempt_time
-                        if time_diff < timedelta(minutes=15):
-                            st.error(
-                                "Too many failed attempts. "
-                                f"Please try again in {15 - int(time_diff.total_seconds() / 60)} minutes"
-                            )
-                            st.stop()
-                        else:
-                            # Reset attempts after timeout
-                            st.session_state.login_attempts = 0
+                # Shared across sessions: spend an attempt before any password hashing
+                address = rate_limit.client_address()
+                wait_s = rate_limit.check_login(email, address)
+                if wait_s:
+                    event_log.record("login", "Login", status="Blocked", level="Warning", detail=email)
+                    st.error(f"Too many failed attempts. Please try again in {max(1, round(wait_s / 60))} minutes")
+                    st.stop()
                 
                 is_valid, user_role, user_id = verify_login(email, password)
                 
@@ -142,16 +161,21 @@ if not st.session_state.logged_in:
                     st.session_state.user_id = user_id
                     st.session_state.user_email = email
                     st.session_state.login_time = datetime.now()
-                    st.session_state.login_attempts = 0
-                    st.session_state.last_attempt_time = None
+                    rate_limit.login_succeeded(email, address)
+                    event_log.record("login", "Login", user_id, detail=role)
+                    from mock_data import record_login  # the data layer loads with the first login
+                    record_login(user_id)
+                    if session_tokens.enabled():
+                        st.query_params[session_tokens.QUERY_PARAM] = session_tokens.get_signer().issue(
+                            user_id, role, email
+                        )
                     st.rerun()
                 else:
                     # Failed login
-                    st.session_state.login_attempts += 1
-                    st.session_state.last_attempt_time = datetime.now()
+                    event_log.record("login", "Login", user_id, "Failed", "Warning", email)
                     st.error(
                         "Invalid credentials or unauthorized role access. "
-                        f"Attempts remaining: {5 - st.session_state.login_attempts}"
+                        f"Attempts remaining: {rate_limit.attempts_remaining(email)}"
                     )
             else:
                 st.error("Please enter both email and password")
@@ -180,23 +204,14 @@ else:
             st.rerun()
     
     # Route to appropriate panel based on role with user context
-    if st.session_state.current_role == "Student":
-        student_panel.show_panel(
-            user_id=st.session_state.user_id,
-            email=st.session_state.user_email
-        )
-    elif st.session_state.current_role == "Teacher":
-        teacher_panel.show_panel(
-            user_id=st.session_state.user_id,
-            email=st.session_state.user_email
-        )
-    elif st.session_state.current_role == "HOD":
-        hod_panel.show_panel(
-            user_id=st.session_state.user_id,
-            email=st.session_state.user_email
-        )
-    elif st.session_state.current_role == "Admin":
-        admin_panel.show_panel(
-            user_id=st.session_state.user_id,
-            email=st.session_state.user_email
-        )
\ No newline at end of file
+    # Unhandled panel errors are logged before Streamlit shows them
+    try:
+        if st.session_state.current_role in PANELS:
+            load_panel(st.session_state.current_role).show_panel(
+                user_id=st.session_state.user_id,
+                email=st.session_state.user_email
+            )
+    except Exception as e:
+        event_log.record("error", st.session_state.current_role or "App", st.session_state.user_id, "Failed",
+                         "Error", f"{type(e).__name__}: {e}")
+        raise
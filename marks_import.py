@@ -0,0 +1,123 @@
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+# Streaming marks import for manage_marks.
+# Uploaded scanner exports are read in fixed-size chunks (pandas' chunked CSV
+# reader, openpyxl's read-only row iterator for Excel) and each chunk is checked
+# against the class roster with column-wise operations, so no per-row Python
+# code runs between the upload and the single batched enter_marks call.
+
+CHUNK_ROWS = 5000
+ROLL_COLUMNS = ("roll_number", "roll_no", "roll")
+MARKS_COLUMNS = ("marks", "marks_obtained", "score")
+
+
+def _normalise(column) -> str:
+    return str(column).strip().lower().replace(" ", "_").replace(".", "")
+
+
+def _pick(columns, candidates, label: str) -> str:
+    by_name = {_normalise(c): c for c in columns}
+    for candidate in candidates:
+        if candidate in by_name:
+            return by_name[candidate]
+    raise ValueError(f"No {label} column found; expected one of: {', '.join(candidates)}")
+
+
+def _excel_chunks(file, chunk_rows: int):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ValueError("Excel import needs the openpyxl package; upload a CSV file instead") from e
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        start = 0
+        while True:
+            batch = list(itertools.islice(rows, chunk_rows))
+            if not batch:
+                break
+            yield pd.DataFrame(batch, columns=header, index=pd.RangeIndex(start, start + len(batch)))
+            start += len(batch)
+    finally:
+        workbook.close()
+
+
+def read_chunks(file, filename: str, chunk_rows: int = CHUNK_ROWS):
+    """Yield the uploaded CSV/XLSX file as DataFrames of at most chunk_rows rows."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        yield from pd.read_csv(file, chunksize=chunk_rows, dtype=str, skipinitialspace=True)
+    elif extension in (".xlsx", ".xlsm"):
+        yield from _excel_chunks(file, chunk_rows)
+    else:
+        raise ValueError(f"Unsupported file type '{extension}'; upload a CSV or XLSX file")
+
+
+def validate_marks(chunks, students: list, max_marks: float = 100) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Split imported rows into valid marks and errors.
+
+    Valid rows have student_id, roll_number, name and marks columns; errors carry the
+    file row number and the reason. When a roll number repeats, the last row wins.
+    """
+    roster = pd.Series([s['id'] for s in students], index=[str(s['roll_number']) for s in students])
+    names = {s['id']: f"{s['first_name']} {s['last_name']}" for s in students}
+    valid, errors = [], []
+    for chunk in chunks:
+        roll_column = _pick(chunk.columns, ROLL_COLUMNS, "roll number")
+        marks_column = _pick(chunk.columns, MARKS_COLUMNS, "marks")
+        rolls = chunk[roll_column].astype("string").str.strip()
+        marks = pd.to_numeric(chunk[marks_column], errors="coerce")
+        student_ids = rolls.map(roster)
+        reason = np.select(
+            [rolls.isna().to_numpy(), student_ids.isna().to_numpy(), marks.isna().to_numpy(),
+             ((marks < 0) | (marks > max_marks)).to_numpy()],
+            ["Missing roll number", "Roll number not in this class", "Marks are not a number",
+             f"Marks outside 0-{max_marks:g}"],
+            default="",
+        )
+        ok = reason == ""
+        # +2: file rows are 1-based and the header takes the first row
+        errors.append(pd.DataFrame({
+            "row": chunk.index[~ok] + 2, "roll_number": rolls[~ok].to_numpy(),
+            "marks": chunk[marks_column][~ok].to_numpy(), "error": reason[~ok],
+        }))
+        valid.append(pd.DataFrame({
+            "row": chunk.index[ok] + 2, "student_id": student_ids[ok].astype(int).to_numpy(),
+            "roll_number": rolls[ok].to_numpy(), "marks": marks[ok].to_numpy(),
+        }))
+
+    valid = pd.concat(valid, ignore_index=True) if valid else pd.DataFrame(
+        columns=["row", "student_id", "roll_number", "marks"])
+    errors = pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(
+        columns=["row", "roll_number", "marks", "error"])
+    duplicate = valid.duplicated("student_id", keep="last")
+    if duplicate.any():
+        repeated = valid[duplicate].assign(error="Duplicate roll number; a later row is used")
+        errors = pd.concat([errors, repeated[errors.columns]], ignore_index=True).sort_values("row")
+        valid = valid[~duplicate]
+    valid = valid.assign(name=valid["student_id"].map(names))
+    return valid.reset_index(drop=True), errors.reset_index(drop=True)
+
+
+def diff_preview(valid: pd.DataFrame, current: dict) -> pd.DataFrame:
+    """Compare imported marks with the marks already stored ({student id: marks})."""
+    existing = valid["student_id"].map(current).astype(float)
+    change = np.select(
+        [existing.isna().to_numpy(), (existing == valid["marks"]).to_numpy()], ["New", "Unchanged"], default="Updated"
+    )
+    return pd.DataFrame({
+        "Roll No": valid["roll_number"], "Name": valid["name"], "Current": existing,
+        "New": valid["marks"], "Change": change,
+    })
+
+
+def to_marks_data(valid: pd.DataFrame) -> dict:
+    """{student id: marks} for enter_marks."""
+    return dict(zip(valid["student_id"].tolist(), valid["marks"].tolist()))
@@ -0,0 +1,179 @@
+import functools
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-call latency, count and payload-size metrics, aggregated process-wide.
+# Each instrumented name keeps a log-scaled latency histogram (BUCKETS_PER_OCTAVE
+# buckets per doubling, about 19% resolution from 1 microsecond up) so p50/p95/p99 cost
+# no per-call storage. When disabled (the default unless SMS_METRICS=1; the admin
+# Performance page can switch it at runtime) an instrumented call costs one
+# global flag check.
+
+BUCKETS_PER_OCTAVE = 4
+BUCKETS = 40 * BUCKETS_PER_OCTAVE  # up to about 2**40 microseconds
+_enabled = os.environ.get("SMS_METRICS", "0") == "1"
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(value: bool):
+    global _enabled
+    _enabled = bool(value)
+
+
+def payload_size(value) -> int:
+    """Approximate size in bytes of a result: the object plus its direct elements."""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):  # DataFrame
+        try:
+            return int(memory_usage(index=True).sum())
+        except TypeError:
+            pass
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+class Stats:
+    """Count, total/max latency, latency histogram and payload totals for one name."""
+
+    __slots__ = ("count", "errors", "total", "maximum", "histogram", "payload", "max_payload")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.histogram = [0] * BUCKETS
+        self.payload = 0
+        self.max_payload = 0
+
+    def add(self, seconds: float, payload: int = 0, error: bool = False):
+        self.count += 1
+        self.errors += error
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        micros = seconds * 1e6
+        bucket = int(math.log2(micros) * BUCKETS_PER_OCTAVE) if micros > 1 else 0
+        self.histogram[min(bucket, BUCKETS - 1)] += 1
+        self.payload += payload
+        self.max_payload = max(self.max_payload, payload)
+
+    def quantile(self, q: float) -> float:
+        """Latency in seconds at quantile q (upper edge of the bucket it falls in, capped at the max)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bucket, n in enumerate(self.histogram):
+            seen += n
+            if seen >= rank and n:
+                return min(2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE) / 1e6, self.maximum)
+        return self.maximum
+
+
+_stats = {}
+_lock = threading.Lock()
+_local = threading.local()  # .pages: payload totals of the timer() blocks open on this thread
+
+
+def observe(name: str, seconds: float, payload: int = 0, error: bool = False):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = Stats()
+        stats.add(seconds, payload, error)
+
+
+def timed(name: str = None, measure_payload: bool = True):
+    """Record latency (and result size) of every call while metrics are enabled."""
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                observe(label, time.perf_counter() - start, error=True)
+                raise
+            elapsed = time.perf_counter() - start
+            size = payload_size(result) if measure_payload else 0
+            for page in getattr(_local, "pages", ()):
+                page[0] += size
+            observe(label, elapsed, size)
+            return result
+        wrapper.uninstrumented = func
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def timer(name: str):
+    """Time a block, e.g. one page of a panel; reruns and stops raised inside still count.
+
+    The block's payload is the total size of results returned by timed() calls made inside it.
+    """
+    if not _enabled:
+        yield
+        return
+    pages = getattr(_local, "pages", None)
+    if pages is None:
+        pages = _local.pages = []
+    payload = [0]
+    pages.append(payload)
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        pages.remove(payload)
+        observe(name, time.perf_counter() - start, payload[0], error)
+
+
+def instrument(namespace: dict, prefix: str):
+    """Wrap every public function defined in a module namespace with timed(prefix.name)."""
+    module = namespace["__name__"]
+    for attr, value in list(namespace.items()):
+        if (not attr.startswith("_") and callable(value) and not isinstance(value, type)
+                and getattr(value, "__module__", None) == module):
+            namespace[attr] = timed(f"{prefix}.{attr}")(value)
+
+
+def snapshot() -> list:
+    """One row per instrumented name with calls, latency percentiles (ms) and payload sizes."""
+    with _lock:
+        items = list(_stats.items())
+        rows = []
+        for name, s in items:
+            rows.append({
+                "name": name, "calls": s.count, "errors": s.errors,
+                "p50_ms": round(s.quantile(0.50) * 1000, 3), "p95_ms": round(s.quantile(0.95) * 1000, 3),
+                "p99_ms": round(s.quantile(0.99) * 1000, 3), "max_ms": round(s.maximum * 1000, 3),
+                "total_s": round(s.total, 3), "avg_payload_kb": round(s.payload / s.count / 1024, 2),
+                "max_payload_kb": round(s.max_payload / 1024, 2),
+            })
+    return sorted(rows, key=lambda r: r["total_s"], reverse=True)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
@@ -1,17 +1,50 @@
+import importlib
 import streamlit as st
-import pandas as pd
 from datetime import datetime, timedelta
-import random
+from storage import DEMO_PASSWORD_HASH, get_backend, reset_derived
+from cache import cached, invalidate
+from event_log import logged
+import blob_store
+import credentials
+import event_log
+import metrics
+
+class _LazyModule:
+    """A module imported on its first attribute access, so loading the data layer stays cheap."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+# Engines that pull in numpy, pandas, plotly or Pillow (or only serve some roles) load when first used
+attendance_store = _LazyModule("attendance_store")
+backup = _LazyModule("backup")
+charts = _LazyModule("charts")
+class_stats = _LazyModule("class_stats")
+performance_cube = _LazyModule("performance_cube")
+profile_images = _LazyModule("profile_images")
+reports = _LazyModule("reports")
+search_index = _LazyModule("search_index")
+submission_queue = _LazyModule("submission_queue")
+timetable_grid = _LazyModule("timetable_grid")
 
 # Mock data for the school management system
 # This replaces all database dependencies
 
 # Mock user data
 MOCK_USERS = {
-    1: {"id": 1, "role": "student", "email": "student@test.com", "is_active": True},
-    2: {"id": 2, "role": "teacher", "email": "teacher@test.com", "is_active": True},
-    3: {"id": 3, "role": "hod", "email": "hod@test.com", "is_active": True},
-    4: {"id": 4, "role": "admin", "email": "admin@test.com", "is_active": True},
+    1: {"id": 1, "role": "student", "email": "student@test.com", "is_active": True,
+        "password_hash": DEMO_PASSWORD_HASH},
+    2: {"id": 2, "role": "teacher", "email": "teacher@test.com", "is_active": True,
+        "password_hash": DEMO_PASSWORD_HASH},
+    3: {"id": 3, "role": "hod", "email": "hod@test.com", "is_active": True,
+        "password_hash": DEMO_PASSWORD_HASH},
+    4: {"id": 4, "role": "admin", "email": "admin@test.com", "is_active": True,
+        "password_hash": DEMO_PASSWORD_HASH},
+    5: {"id": 5, "role": "student", "email": "inactive@test.com", "is_active": False,
+        "password_hash": DEMO_PASSWORD_HASH},
 }
 
 # Mock student data
@@ -83,16 +116,16 @@ MOCK_ADMINS = {
 # Mock timetable data
 MOCK_TIMETABLE = {
     1: [
-        {"day": "Monday", "time": "08:00-09:00", "subject": "Physics", "teacher": "Dr. Smith", "room": "101"},
-        {"day": "Monday", "time": "09:00-10:00", "subject": "Mathematics", "teacher": "Mr. Brown", "room": "102"},
-        {"day": "Monday", "time": "10:00-11:00", "subject": "Chemistry", "teacher": "Dr. Wilson", "room": "103"},
-        {"day": "Monday", "time": "11:00-12:00", "subject": "English", "teacher": "Ms. Davis", "room": "104"},
-        {"day": "Monday", "time": "12:00-13:00", "subject": "History", "teacher": "Mr. Taylor", "room": "105"},
-        {"day": "Tuesday", "time": "08:00-09:00", "subject": "Biology", "teacher": "Dr. Anderson", "room": "106"},
-        {"day": "Tuesday", "time": "09:00-10:00", "subject": "Physics", "teacher": "Dr. Smith", "room": "101"},
-        {"day": "Tuesday", "time": "10:00-11:00", "subject": "Mathematics", "teacher": "Mr. Brown", "room": "102"},
-        {"day": "Tuesday", "time": "11:00-12:00", "subject": "Chemistry", "teacher": "Dr. Wilson", "room": "103"},
-        {"day": "Tuesday", "time": "12:00-13:00", "subject": "English", "teacher": "Ms. Davis", "room": "104"},
+        {"day": "Monday", "time": "08:00-09:00", "subject": "Physics", "teacher": "Dr. Smith", "room": "101", "teacher_id": 2},
+        {"day": "Monday", "time": "09:00-10:00", "subject": "Mathematics", "teacher": "Mr. Brown", "room": "102", "teacher_id": None},
+        {"day": "Monday", "time": "10:00-11:00", "subject": "Chemistry", "teacher": "Dr. Wilson", "room": "103", "teacher_id": None},
+        {"day": "Monday", "time": "11:00-12:00", "subject": "English", "teacher": "Ms. Davis", "room": "104", "teacher_id": None},
+        {"day": "Monday", "time": "12:00-13:00", "subject": "History", "teacher": "Mr. Taylor", "room": "105", "teacher_id": None},
+        {"day": "Tuesday", "time": "08:00-09:00", "subject": "Biology", "teacher": "Dr. Anderson", "room": "106", "teacher_id": None},
+        {"day": "Tuesday", "time": "09:00-10:00", "subject": "Physics", "teacher": "Dr. Smith", "room": "101", "teacher_id": 2},
+        {"day": "Tuesday", "time": "10:00-11:00", "subject": "Mathematics", "teacher": "Mr. Brown", "room": "102", "teacher_id": None},
+        {"day": "Tuesday", "time": "11:00-12:00", "subject": "Chemistry", "teacher": "Dr. Wilson", "room": "103", "teacher_id": None},
+        {"day": "Tuesday", "time": "12:00-13:00", "subject": "English", "teacher": "Ms. Davis", "room": "104", "teacher_id": None},
     ]
 }
 
@@ -254,92 +287,369 @@ MOCK_CLASSES = [
     {"id": 5, "name": "12A", "strength": 25, "class_teacher": "Prof. Johnson"}
 ]
 
+ANNOUNCEMENT_PAGE_SIZE = 10
+
+# Accessors below delegate to the configured storage backend (see storage.py);
+# SMS_BACKEND=memory serves the MOCK_* data above, SMS_BACKEND=sqlite the embedded store.
+
+# Getters are cached across sessions (see cache.py); every writer invalidates
+# only the namespaces and users its change affects.
+
+def _class_user_ids(user_id: int, class_name: str, student_ids=None) -> list:
+    """User ids of students in a class, optionally limited to the given student ids."""
+    return [
+        s['user_id'] for s in get_teacher_students(user_id, class_name)
+        if student_ids is None or s['id'] in student_ids
+    ]
+
 # Mock functions for student panel
+@cached("student_info", ttl=600)
 def get_student_info(user_id: int):
     """Get student information."""
-    return MOCK_STUDENTS.get(user_id)
+    return get_backend().get_student_info(user_id)
 
+@cached("timetable", ttl=3600)
 def get_timetable(user_id: int):
     """Get student timetable."""
-    return MOCK_TIMETABLE.get(user_id, [])
+    return get_backend().get_timetable(user_id)
+
+def get_class_timetable(class_name: str):
+    """Get the compiled weekly grid for a class, shared by every student of it."""
+    return timetable_grid.get_grid(class_name, get_backend().get_class_timetable)
+
+def get_teacher_schedule(user_id: int, now: datetime = None):
+    """Get a teacher's periods today from their own grid, in time order, flagging the current and next one."""
+    grid = timetable_grid.get_teacher_grid(user_id, get_backend().get_teacher_timetable)
+    now = now or datetime.now()
+    current, upcoming = grid.now_and_next(now)
+    return [
+        {"time": entry['time'], "class": entry['class'], "subject": entry['subject'], "room": entry['room'],
+         "status": "Now" if entry is current else "Next" if entry is upcoming else ""}
+        for entry in grid.today(now)
+    ]
+
+@logged("Update Timetable")
+def update_class_timetable(user_id: int, class_name: str, rows: list):
+    """Replace a class's weekly timetable; the shared class grid is recompiled on next use."""
+    try:
+        timetable_grid.ClassTimetable(rows)  # reject rows that would not compile before writing them
+    except (KeyError, ValueError, AttributeError) as e:
+        st.error(f"Invalid timetable: {e}")
+        return False
+    if not get_backend().set_class_timetable(class_name, rows):
+        return False
+    timetable_grid.invalidate(class_name)
+    for student in get_teacher_students(user_id, class_name):
+        invalidate("timetable", student['user_id'])
+    st.success("Timetable updated successfully!")
+    return True
 
+@cached("attendance")
 def get_attendance(user_id: int):
     """Get student attendance."""
-    return MOCK_ATTENDANCE.get(user_id, [])
+    return get_backend().get_attendance(user_id)
+
+def get_attendance_summary(user_id: int):
+    """Get per-subject and per-month attendance for a student from the class bitmap."""
+    student = get_student_info(user_id)
+    if not student:
+        return {}
+    store = attendance_store.get_class_store(student['class'], get_backend().get_class_attendance)
+    subjects = store.student_summary(student['id'])
+    present = sum(s['present'] for s in subjects.values())
+    total = sum(s['total'] for s in subjects.values())
+    return {
+        "overall_percentage": round(100 * present / total, 1) if total else 0.0,
+        "subjects": subjects,
+        "months": store.monthly_summary(student['id']),
+    }
+
+def get_class_attendance_summary(class_name: str):
+    """Get class-wide attendance percentages by subject, month and student."""
+    store = attendance_store.get_class_store(class_name, get_backend().get_class_attendance)
+    return {
+        "overall_percentage": store.class_percentage(),
+        "subjects": store.subject_summary(),
+        "months": store.monthly_summary(),
+        "students": store.student_percentages(),
+    }
 
+@cached("assignments")
 def get_assignments(user_id: int):
     """Get student assignments."""
-    return MOCK_ASSIGNMENTS.get(user_id, [])
-
-def submit_assignment(user_id: int, assignment_id: int, submission_text: str, file_path: str = None):
-    """Submit assignment (mock function)."""
-    # In a real app, this would save to database
+    return get_backend().get_assignments(user_id)
+
+@logged("Submit Assignment")
+def submit_assignment(user_id: int, assignment_id: int, submission_text: str, file=None):
+    """Submit assignment; the file is stored now and checked/extracted on the background queue."""
+    file_name = file_digest = None
+    if file is not None:
+        file_digest, _ = blob_store.get_store().put(file)
+        file_name = getattr(file, 'name', None)
+    status = "queued" if file_digest else "done"
+    if not get_backend().submit_assignment(user_id, assignment_id, submission_text, file_name, file_digest, status):
+        return False
+    _submission_processed(user_id, assignment_id)
+    if file_digest:
+        backend = get_backend()
+        submission_queue.get_queue().enqueue(
+            user_id, assignment_id, lambda: _read_blob(file_digest), file_name,
+            lambda *args: backend.update_submission_processing(*args, file_digest), _submission_processed,
+            checksum=file_digest,
+        )
     st.success("Assignment submitted successfully!")
     return True
 
+def _read_blob(blob_digest: str) -> bytes:
+    # Read straight from disk: submissions are read once, so they stay out of the shared download cache.
+    with open(blob_store.get_store().path(blob_digest), 'rb') as f:
+        return f.read()
+
+def _submission_processed(user_id: int, assignment_id: int):
+    invalidate("assignments", user_id)
+    invalidate("teacher_assignments")
+    invalidate("submission_statuses", assignment_id)
+
+@cached("submission_statuses", ttl=30)
+def get_submission_statuses(assignment_id: int):
+    """Get each submission's processing status for an assignment."""
+    return get_backend().get_submission_statuses(assignment_id)
+
+@cached("performance")
 def get_performance(user_id: int):
     """Get student performance."""
-    return MOCK_PERFORMANCE.get(user_id, {})
-
+    return get_backend().get_performance(user_id)
+
+@cached("student_trend_chart", ttl=600, copy_result=False)
+def get_student_trend_chart(user_id: int, start: str, end: str):
+    """Get a student's daily attendance and test scores between start and end as a downsampled figure."""
+    student = get_student_info(user_id)
+    if not student:
+        return None
+    store = attendance_store.get_class_store(student['class'], get_backend().get_class_attendance)
+    series = {"Attendance %": store.daily(student['id'], start, end)}
+    tests = [t for t in get_backend().get_test_history(user_id) if start <= t['date'] <= end]
+    if tests:
+        series["Test %"] = ([t['date'] for t in tests], [t['percentage'] for t in tests])
+    return charts.line_figure(series, y_title="%", markers=("Test %",))
+
+@cached("announcements", ttl=120)
 def get_announcements(user_id: int):
     """Get announcements."""
-    return MOCK_ANNOUNCEMENTS
-
+    return get_backend().get_announcements(user_id)
+
+def _audience(user_id: int) -> tuple:
+    """(department, class) whose announcements a user sees besides school-wide ones."""
+    profile = get_student_info(user_id) or get_teacher_info(user_id) or get_hod_info(user_id) or {}
+    return profile.get('department'), profile.get('class')
+
+@cached("announcements", ttl=120)
+def get_announcement_feed(user_id: int, archived: bool = False, cursor: tuple = None,
+                          limit: int = ANNOUNCEMENT_PAGE_SIZE, priority: str = None):
+    """Get one page of a user's announcements, newest first; returns (items, next page cursor or None)."""
+    department, class_name = _audience(user_id)
+    rows = get_backend().get_announcement_page(user_id, department, class_name, archived, cursor, limit + 1,
+                                               priority)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]['date'], rows[-1]['id'])
+
+def search_content(user_id: int, query: str, limit: int = 20, kinds=None):
+    """Search announcements, study materials and assignments visible to a user, best match first."""
+    index = search_index.get_index(get_backend().get_search_documents)
+    department, class_name = _audience(user_id)
+    is_student = get_student_info(user_id) is not None
+    
+    def allowed(doc):
+        if kinds and doc['kind'] not in kinds:
+            return False
+        # Staff see everything; students see school-wide items plus their class and department
+        return not is_student or (doc['class'] in (None, class_name) and doc['department'] in (None, department))
+    
+    return index.search(query, limit, allowed)
+
+@cached("study_materials", ttl=600)
 def get_study_materials(user_id: int):
     """Get study materials."""
-    return MOCK_STUDY_MATERIALS
+    return get_backend().get_study_materials(user_id)
 
+@logged("Update Password")
 def update_password(user_id: int, old_password: str, new_password: str):
-    """Update password (mock function)."""
+    """Update password after checking the current one."""
+    if not credentials.get_store().set_password(user_id, old_password, new_password):
+        return False
     st.success("Password updated successfully!")
     return True
 
+PROFILE_NAMESPACES = ("student_info", "teacher_info", "hod_info", "admin_info")
+
+@logged("Update Profile")
+def update_profile(user_id: int, fields: dict):
+    """Update a user's own profile columns (any role)."""
+    if not get_backend().update_profile(user_id, fields):
+        return False
+    for namespace in PROFILE_NAMESPACES:
+        invalidate(namespace, user_id)
+    return True
+
+@logged("Update Profile Picture")
+def update_profile_image(user_id: int, file):
+    """Replace a profile picture; thumbnails render on the image workers and the profile points at them once saved."""
+    job = profile_images.get_store().submit(
+        user_id, file.getvalue(), lambda reference: update_profile(user_id, {"profile_image_url": reference}))
+    try:
+        reference = job.result(timeout=profile_images.UPLOAD_TIMEOUT)
+    except TimeoutError:
+        # Still rendering: the profile switches over when it finishes, and a late failure is still logged
+        def log_failure(done):
+            error = done.exception()
+            if error is not None:
+                event_log.record("error", "Update Profile Picture", user_id, "Failed", "Error",
+                                 f"{type(error).__name__}: {error}")
+
+        job.add_done_callback(log_failure)
+        st.warning("Profile picture is still processing; it will appear once ready.")
+        return None
+    except (ValueError, OSError) as e:
+        st.error(f"Profile picture not saved: {e}")
+        return False
+    st.success("Profile picture updated!")
+    return reference
+
+def get_profile_image(user_id: int, profile: dict, size: str = "sidebar") -> bytes:
+    """Get a profile's thumbnail from the local cache (an initials tile when no picture was uploaded)."""
+    name = f"{profile.get('first_name') or ''} {profile.get('last_name') or ''}"
+    return profile_images.get_store().thumbnail(user_id, profile.get('profile_image_url'), size, name)
+
 # Mock functions for teacher panel
+@cached("teacher_info", ttl=600)
 def get_teacher_info(user_id: int):
     """Get teacher information."""
-    return MOCK_TEACHERS.get(user_id)
+    return get_backend().get_teacher_info(user_id)
 
+@cached("teacher_classes", ttl=3600)
 def get_teacher_classes(user_id: int):
     """Get classes taught by teacher."""
-    return MOCK_CLASSES
+    return get_backend().get_teacher_classes(user_id)
+
+@cached("teacher_students", ttl=600)
+def get_teacher_students(user_id: int, class_name: str = None):
+    """Get students in teacher's classes, optionally limited to one class."""
+    return get_backend().get_teacher_students(user_id, class_name)
 
-def get_teacher_students(user_id: int):
-    """Get students in teacher's classes."""
-    return [MOCK_STUDENTS[1]]  # Return sample student
+@cached("class_marks")
+def get_class_marks(class_name: str, subject: str, exam_type: str):
+    """Get {student id: marks} already entered for a class, subject and exam."""
+    return get_backend().get_class_marks(class_name, subject, exam_type)
 
+def get_class_stats(class_name: str, subject: str, exam_type: str):
+    """Get running marks statistics (count, mean, std, min/max, percentiles) for a class exam."""
+    return class_stats.get_stats(class_name, subject, exam_type, get_backend().get_class_marks).summary()
+
+@logged("Create Assignment")
 def create_assignment(user_id: int, title: str, description: str, due_date: str, subject: str, class_name: str):
-    """Create assignment (mock function)."""
+    """Create assignment."""
+    if not get_backend().create_assignment(user_id, title, description, due_date, subject, class_name):
+        return False
+    for student_user_id in _class_user_ids(user_id, class_name):
+        invalidate("assignments", student_user_id)
+    invalidate("teacher_assignments", user_id)
+    search_index.refresh(get_backend().get_search_documents)
     st.success("Assignment created successfully!")
     return True
 
+def get_class_day_attendance(user_id: int, class_name: str, date: str):
+    """Get {student id: status} a teacher already saved for a class on a date (empty when not marked)."""
+    subject = (get_teacher_info(user_id) or {}).get('department', 'General')
+    return attendance_store.get_class_store(class_name, get_backend().get_class_attendance).statuses(date, subject)
+
+@logged("Mark Attendance")
 def mark_attendance(user_id: int, class_name: str, date: str, attendance_data: dict):
-    """Mark attendance (mock function)."""
+    """Mark attendance for a whole class on a date in one batched backend write."""
+    subject = (get_teacher_info(user_id) or {}).get('department', 'General')
+    backend = get_backend()
+    try:
+        attendance_store.check(class_name, date, subject, backend.get_class_attendance)
+    except ValueError as e:
+        st.error(f"Attendance not saved: {e}")
+        return False
+    with performance_cube.tracking("attendance",
+                                   lambda: backend.get_rollup_rows("attendance", class_name, subject, str(date))):
+        if not backend.mark_attendance(user_id, class_name, date, attendance_data, subject):
+            return False
+    attendance_store.record(class_name, date, subject, attendance_data)
+    invalidate("class_trend_chart", class_name)
+    for student_user_id in _class_user_ids(user_id, class_name, attendance_data):
+        invalidate("attendance", student_user_id)
+        invalidate("student_trend_chart", student_user_id)
     st.success("Attendance marked successfully!")
     return True
 
-def enter_marks(user_id: int, class_name: str, subject: str, exam_type: str, marks_data: dict):
-    """Enter marks (mock function)."""
+@logged("Enter Marks")
+def enter_marks(user_id: int, class_name: str, subject: str, exam_type: str, marks_data: dict,
+                max_marks: int = 100):
+    """Enter marks for a class, subject and exam in one batched backend write."""
+    backend = get_backend()
+    with performance_cube.tracking("marks", lambda: backend.get_rollup_rows("marks", class_name, subject, exam_type)):
+        if not backend.enter_marks(user_id, class_name, subject, exam_type, marks_data, max_marks):
+            return False
+    class_stats.record(class_name, subject, exam_type, marks_data)
+    invalidate("class_marks", class_name, subject, exam_type)
+    invalidate("class_trend_chart", class_name)
+    for student_user_id in _class_user_ids(user_id, class_name, marks_data):
+        invalidate("performance", student_user_id)
+        invalidate("student_trend_chart", student_user_id)
     st.success("Marks entered successfully!")
     return True
 
+@cached("teacher_assignments")
 def get_teacher_assignments(user_id: int):
     """Get assignments created by teacher."""
-    return MOCK_ASSIGNMENTS.get(1, [])  # Return sample assignments
+    return get_backend().get_teacher_assignments(user_id)
 
+@cached("teacher_announcements", ttl=120)
 def get_teacher_announcements(user_id: int):
     """Get announcements for teacher."""
-    return MOCK_ANNOUNCEMENTS
-
-def create_announcement(user_id: int, title: str, content: str, priority: str):
-    """Create announcement (mock function)."""
+    return get_backend().get_teacher_announcements(user_id)
+
+@logged("Create Announcement")
+def create_announcement(user_id: int, title: str, content: str, priority: str, class_name: str = None):
+    """Create announcement for the whole school, or for one class."""
+    audience, audience_key = ("class", class_name) if class_name else ("school", None)
+    if not get_backend().create_announcement(user_id, title, content, priority, audience, audience_key):
+        return False
+    invalidate("announcements")
+    invalidate("teacher_announcements")
+    search_index.refresh(get_backend().get_search_documents)
     st.success("Announcement created successfully!")
     return True
 
-def upload_study_material(user_id: int, title: str, subject: str, class_name: str, description: str, file):
-    """Upload study material (mock function)."""
+@logged("Upload Study Material")
+def upload_study_material(user_id: int, title: str, subject: str, class_name: str, description: str, file,
+                          material_type: str = "PDF", link: str = None):
+    """Upload study material; the file is streamed into the content-addressed blob store."""
+    blob_digest = file_size = file_name = None
+    if file is not None:
+        blob_digest, file_size = blob_store.get_store().put(file)
+        file_name = getattr(file, 'name', None)
+    if not get_backend().upload_study_material(user_id, title, subject, class_name, description, material_type,
+                                               blob_digest, file_name, file_size, link):
+        return False
+    invalidate("study_materials")
+    search_index.refresh(get_backend().get_search_documents)
     st.success("Study material uploaded successfully!")
     return True
 
+@cached("study_materials", ttl=600)
+def get_class_materials(class_name: str):
+    """Get a class's study materials, newest first (files are fetched with get_material_file)."""
+    return get_backend().get_class_materials(class_name)
+
+def get_material_file(blob_digest: str) -> bytes:
+    """Get an uploaded material's bytes (one shared copy per process for popular files)."""
+    return blob_store.get_store().read(blob_digest)
+
 def get_teacher_feedback(user_id: int):
     """Get feedback for teacher."""
     return [
@@ -348,91 +658,181 @@ def get_teacher_feedback(user_id: int):
     ]
 
 # Mock functions for HOD panel
+@cached("hod_info", ttl=600)
 def get_hod_info(user_id: int):
     """Get HOD information."""
-    return MOCK_HODS.get(user_id)
+    return get_backend().get_hod_info(user_id)
 
+@cached("department_info", ttl=600)
 def get_department_info(user_id: int):
     """Get department information."""
-    return MOCK_DEPARTMENTS[0]  # Return first department as sample
+    return get_backend().get_department_info(user_id)
 
+@cached("department_teachers", ttl=600)
 def get_department_teachers(user_id: int):
     """Get teachers in HOD's department."""
-    return [MOCK_TEACHERS[2]]  # Return sample teacher
+    return get_backend().get_department_teachers(user_id)
 
+@cached("department_students", ttl=600)
 def get_department_students(user_id: int):
     """Get students in HOD's department."""
-    return [MOCK_STUDENTS[1]]  # Return sample student
+    return get_backend().get_department_students(user_id)
+
+def get_performance_rollup(user_id: int, by=("class",), **filters):
+    """Slice the HOD's department of the marks/attendance rollup by any dimensions."""
+    hod = get_hod_info(user_id)
+    if not hod:
+        return []
+    return performance_cube.get_cube(get_backend()).rollup(by, department=hod['department'], **filters)
+
+@cached("class_trend_chart", ttl=600, copy_result=False)
+def get_class_trend_chart(class_name: str, start: str, end: str):
+    """Get a class's daily attendance and monthly average marks between start and end as a downsampled figure."""
+    store = attendance_store.get_class_store(class_name, get_backend().get_class_attendance)
+    series = {"Attendance %": store.daily(None, start, end)}
+    months = [row for row in performance_cube.get_cube(get_backend()).rollup(("month",), **{"class": class_name})
+              if row['average'] is not None and start[:7] <= row['month'] <= end[:7]]
+    if months:
+        series["Average Marks %"] = ([f"{row['month']}-01" for row in months], [row['average'] for row in months])
+    return charts.line_figure(series, y_title="%")
 
 def get_department_performance(user_id: int):
-    """Get department performance."""
+    """Get department performance: overall averages, top class and subjects below the department average."""
+    overall = get_performance_rollup(user_id, ())
+    if not overall or overall[0]['average'] is None:
+        return None
+    average = overall[0]['average']
+    classes = [row for row in get_performance_rollup(user_id, ("class",)) if row['average'] is not None]
+    subjects = get_performance_rollup(user_id, ("subject",))
     return {
-        "average_percentage": 82.5,
-        "top_performer": "John Doe",
-        "improvement_needed": ["Chemistry", "Biology"]
+        "average_percentage": average,
+        "attendance_percentage": overall[0]['attendance'],
+        "top_class": max(classes, key=lambda row: row['average'])['class'],
+        "improvement_needed": [row['subject'] for row in subjects
+                               if row['average'] is not None and row['average'] < average],
     }
 
+@logged("Approve Leave")
 def approve_leave(user_id: int, teacher_id: int, leave_data: dict):
     """Approve leave (mock function)."""
     st.success("Leave approved successfully!")
     return True
 
-def generate_department_report(user_id: int):
-    """Generate department report (mock function)."""
-    st.success("Department report generated successfully!")
-    return True
+@logged("Generate Department Report")
+def generate_department_report(user_id: int, report_type: str, start: str, end: str, fmt: str = "PDF"):
+    """Queue a report limited to the HOD's department; returns its job."""
+    hod = get_hod_info(user_id)
+    if not hod:
+        return None
+    return request_report(report_type, start, end, (), fmt, hod['department'], actor_id=user_id)
 
 # Mock functions for admin panel
+@cached("admin_info", ttl=600)
 def get_admin_info(user_id: int):
     """Get admin information."""
-    return MOCK_ADMINS.get(user_id)
+    return get_backend().get_admin_info(user_id)
 
 def get_system_stats():
-    """Get system statistics."""
-    return {
-        "total_students": 450,
-        "total_teachers": 35,
-        "total_departments": 5,
-        "total_classes": 15,
-        "active_users": 485
-    }
+    """Get system statistics with today's change of each (read from counters kept up to date by writes)."""
+    return get_backend().get_system_stats()
 
+@cached("all_users", ttl=120)
 def get_all_users():
     """Get all users."""
-    return [
-        {"id": 1, "name": "John Doe", "role": "Student", "department": "Physics", "status": "Active"},
-        {"id": 2, "name": "Dr. Sarah Smith", "role": "Teacher", "department": "Physics", "status": "Active"},
-        {"id": 3, "name": "Prof. Michael Johnson", "role": "HOD", "department": "Physics", "status": "Active"},
-        {"id": 4, "name": "Admin User", "role": "Admin", "department": "-", "status": "Active"}
-    ]
+    return get_backend().get_all_users()
 
+@logged("Create User", actor=None)
 def create_user(user_data: dict):
-    """Create user (mock function)."""
+    """Create user; the password is stored only as a salted hash."""
+    password = user_data.get("password")
+    user_data = {key: value for key, value in user_data.items() if key != "password"}
+    user_data["email"] = user_data["email"].strip().lower()
+    user_data["password_hash"] = credentials.get_store().hash(password) if password else None
+    if not get_backend().create_user(user_data):
+        return False
+    for namespace in ("all_users", "teacher_students", "department_teachers", "department_students"):
+        invalidate(namespace)
     st.success("User created successfully!")
     return True
 
-def get_system_logs():
-    """Get system logs."""
-    return [
-        {"timestamp": "2024-01-15 10:30:00", "user": "John Doe", "action": "Login", "status": "Success"},
-        {"timestamp": "2024-01-15 10:25:00", "user": "Dr. Smith", "action": "Upload Assignment", "status": "Success"},
-        {"timestamp": "2024-01-15 10:20:00", "user": "Admin", "action": "Create User", "status": "Success"}
+@logged("Update User Status", actor=None)
+def set_user_status(user_id: int, active: bool):
+    """Activate or deactivate a user account."""
+    if not get_backend().set_user_status(user_id, active):
+        return False
+    invalidate("all_users")
+    st.success(f"User {'activated' if active else 'deactivated'} successfully!")
+    return True
+
+def record_login(user_id: int):
+    """Count a successful login towards today's logins."""
+    get_backend().record_login(user_id)
+
+def get_system_logs(start=None, end=None, event_type: str = None, cursor: tuple = None,
+                    limit: int = event_log.PAGE_SIZE):
+    """Get one page of logged events in a date range (optionally one type), newest first, and the next cursor."""
+    if start is not None and end is not None:
+        start, end = event_log.day_range(start, end)
+    events, next_cursor = event_log.get_log().query(start, end, event_type, cursor, limit)
+    names = {u['id']: u['name'] for u in get_all_users()}
+    rows = [
+        {"timestamp": e["timestamp"][:19], "type": e["type"], "level": e["level"],
+         "user": names.get(e["user_id"], "-" if e["user_id"] is None else str(e["user_id"])),
+         "action": e["action"], "status": e["status"], "detail": e["detail"] or ""}
+        for e in events
     ]
+    return rows, next_cursor
+
+@logged("Generate Report", actor=None)
+def request_report(report_type: str, start: str, end: str, sections=(), fmt: str = "CSV", department: str = None):
+    """Queue a report in the background, or get the cached/running job for the same parameters."""
+    return reports.get_engine().request(get_backend(), report_type, start, end, sections, fmt, department)
 
 def get_system_reports():
-    """Get system reports."""
+    """Get recently requested reports, newest first, with their status and progress."""
     return [
-        {"name": "Monthly Attendance Report", "generated": "2024-01-15", "status": "Ready"},
-        {"name": "Academic Performance Report", "generated": "2024-01-14", "status": "Ready"},
-        {"name": "Teacher Evaluation Report", "generated": "2024-01-13", "status": "Processing"}
+        {"name": job.title, "generated": (job.finished or job.created).strftime("%Y-%m-%d %H:%M"),
+         "status": job.status.title(), "progress": job.progress, "job": job}
+        for job in reports.get_engine().jobs()
     ]
 
-def backup_system():
-    """Backup system (mock function)."""
+@logged("Backup System", actor=None)
+def backup_system(kind: str = "incremental", target: str = None):
+    """Back up the data store and blob store (full or incremental); returns the backup manifest."""
+    manifest = backup.get_engine(target).backup(get_backend(), blob_store.get_store(), kind)
     st.success("System backup completed successfully!")
+    return manifest
+
+def list_backups(target: str = None):
+    """Get backups in a target directory, newest first."""
+    engine = backup.get_engine(target)
+    summaries = []
+    for backup_id in engine.list_backups():
+        manifest = engine.manifest(backup_id)
+        summaries.append({
+            "id": backup_id, "type": manifest["kind"], "created": manifest["created"],
+            "backend": manifest["backend"],
+            "rows": sum(t["rows"] for t in manifest["tables"].values()), "files": len(manifest["blobs"]),
+            "written_kb": round(manifest["stats"]["written_bytes"] / 1024, 1),
+            "tables": {name: sorted(t["partitions"]) if t["date_column"] else [] for name, t in manifest["tables"].items()},
+        })
+    return summaries
+
+def verify_backup(backup_id: str, target: str = None):
+    """Get the digests of missing or corrupt chunks in a backup (empty when it is intact)."""
+    return backup.get_engine(target).verify(backup_id)
+
+@logged("Restore System", actor=None)
+def restore_system(backup_id: str, table: str = None, term: str = None, target: str = None):
+    """Restore a backup, or only one table or one term of it."""
+    try:
+        backup.get_engine(target).restore(backup_id, get_backend(), blob_store.get_store(), table, term)
+    except backup.BackupError as e:
+        st.error(f"Restore failed: {e}")
+        return False
+    reset_derived()
+    st.success("System restored successfully!")
     return True
 
-def restore_system(backup_file):
-    """Restore system (mock function)."""
-    st.success("System restored successfully!")
-    return True 
\ No newline at end of file
+# Time every public getter and writer (a flag check per call while metrics are off)
+metrics.instrument(globals(), "data")
@@ -0,0 +1,67 @@
+import mimetypes
+
+import streamlit as st
+
+from mock_data import get_material_file, search_content
+
+# Page sections shared by several role panels.
+# Each takes a key prefix, so the widgets of one panel never collide with
+# another's in the same session.
+
+SEARCH_KINDS = {"📢 Announcements": "announcement", "📖 Study Materials": "material", "📚 Assignments": "assignment"}
+
+
+def show_search(user_id: int, key_prefix: str, placeholder: str = "e.g. physics lab report"):
+    """Ranked search over the announcements, materials and assignments the user can see."""
+    st.title("Search")
+
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        query = st.text_input("Search", placeholder=placeholder, key=f"{key_prefix}_query")
+    with col2:
+        kinds = st.multiselect("Include", list(SEARCH_KINDS), default=list(SEARCH_KINDS), key=f"{key_prefix}_kinds")
+
+    if not query.strip():
+        st.info("Type a few words; the last word also matches as a prefix")
+        return
+
+    results = search_content(user_id, query, kinds=[SEARCH_KINDS[k] for k in kinds])
+    if not results:
+        st.info("No matches found")
+        return
+
+    st.caption(f"{len(results)} best matches")
+    for result in results:
+        label = next(k for k, v in SEARCH_KINDS.items() if v == result['kind'])
+        st.markdown(f"**{label.split()[0]} {result['title']}**")
+        details = [d for d in (result.get('subject'), result.get('class'), result.get('date')) if d]
+        if details:
+            st.caption(" | ".join(str(d) for d in details))
+        if result['snippet']:
+            st.write(result['snippet'])
+        st.divider()
+
+
+def show_material_file(material: dict, key_prefix: str, label: str = "📥 Download"):
+    """A material's file, link or "no file" note; files load from the blob store only once asked for."""
+    if material.get('blob_digest'):
+        # The bytes are shared by every session, so only the sessions that ask read them
+        prepared_key = f"{key_prefix}_prepared_{material['id']}"
+        if st.session_state.get(prepared_key):
+            file_name = material.get('file_name') or f"{material['title']}.pdf"
+            st.download_button(
+                label,
+                get_material_file(material['blob_digest']),
+                file_name=file_name,
+                mime=mimetypes.guess_type(file_name)[0],
+                key=f"{key_prefix}_download_{material['id']}"
+            )
+        # Materials from before sizes were recorded have none
+        elif st.button(f"📥 Get File ({(material.get('file_size') or 0) / 1024:.0f} KB)",
+                       key=f"{key_prefix}_get_{material['id']}"):
+            st.session_state[prepared_key] = True
+            st.rerun()
+    elif material.get('link'):
+        st.link_button("🔗 Open Resource", material['link'])
+    else:
+        st.caption("No file attached")
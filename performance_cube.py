@@ -0,0 +1,118 @@
+import threading
+from contextlib import contextmanager
+
+# Rollup of marks and attendance over (department, class, subject, exam, month).
+# Each cell holds [results, sum of percentages, present, sessions]; attendance
+# cells have exam None. The cube is built once from one streaming pass over the
+# store and then kept current by the writers: tracking() reads the rows a write
+# will replace (one class, subject and exam or date) before and after the write
+# and applies the difference, so marks entered twice are not counted twice.
+# Any slice or grouping walks the cells, whose number is set by the dimensions,
+# never by the number of raw rows.
+
+DIMENSIONS = ("department", "class", "subject", "exam", "month")
+ALL_DATES = ("0000-00-00", "9999-12-31")
+
+
+class PerformanceCube:
+    """Additive marks/attendance aggregates per (department, class, subject, exam, month) cell."""
+
+    def __init__(self):
+        self.cells = {}
+        self._lock = threading.Lock()
+
+    def _apply(self, kind: str, rows, sign: int):
+        for row in rows:
+            if kind == "attendance":
+                class_name, department, subject, date, status = row
+                key = (department, class_name, subject, None, date[:7])
+                delta = (0, 0.0, sign * (status == "Present"), sign)
+            else:
+                class_name, department, subject, exam_type, marks, max_marks, date = row
+                key = (department, class_name, subject, exam_type, (date or "")[:7])
+                delta = (sign, sign * (100 * marks / max_marks if max_marks else 0.0), 0, 0)
+            cell = self.cells.get(key)
+            if cell is None:
+                cell = self.cells[key] = [0, 0.0, 0, 0]
+            for i, value in enumerate(delta):
+                cell[i] += value
+            if not cell[0] and not cell[3]:
+                del self.cells[key]
+
+    def add(self, kind: str, rows):
+        """Count report-shaped rows of kind "attendance" or "marks" into the cube."""
+        with self._lock:
+            self._apply(kind, rows, 1)
+
+    def replace(self, kind: str, before, after):
+        """Swap rows that a write replaced for the rows it left."""
+        with self._lock:
+            self._apply(kind, before, -1)
+            self._apply(kind, after, 1)
+
+    def rollup(self, by=("class",), **filters) -> list:
+        """Rows grouped by the given dimensions over the cells matching filters (dimension=value).
+
+        Each row has the dimension values plus results, average %, sessions and attendance %.
+        """
+        positions = [DIMENSIONS.index(d) for d in by]
+        wanted = [(DIMENSIONS.index(d), value) for d, value in filters.items() if value is not None]
+        groups = {}
+        with self._lock:
+            for key, cell in self.cells.items():
+                if any(key[i] != value for i, value in wanted):
+                    continue
+                group_key = tuple(key[i] for i in positions)
+                group = groups.get(group_key)
+                if group is None:
+                    group = groups[group_key] = [0, 0.0, 0, 0]
+                for i, value in enumerate(cell):
+                    group[i] += value
+        rows = []
+        for group_key, (results, total, present, sessions) in sorted(groups.items(), key=lambda g: str(g[0])):
+            row = dict(zip(by, group_key))
+            row.update({
+                "results": results, "average": round(total / results, 1) if results else None,
+                "sessions": sessions, "attendance": round(100 * present / sessions, 1) if sessions else None,
+            })
+            rows.append(row)
+        return rows
+
+
+_cube = None
+_cube_lock = threading.Lock()
+
+
+def get_cube(backend) -> PerformanceCube:
+    """The process-wide cube, built on first use from one pass over backend's attendance and marks."""
+    global _cube
+    if _cube is None:
+        with _cube_lock:
+            if _cube is None:
+                cube = PerformanceCube()
+                for kind in ("attendance", "marks"):
+                    cube.add(kind, backend.iter_report_rows(kind, *ALL_DATES))
+                _cube = cube
+    return _cube
+
+
+@contextmanager
+def tracking(kind: str, loader):
+    """Around a write: loader() returns the rows it may replace; the cube gets the before/after difference.
+
+    Writes are serialized with each other while the cube is built; before it is built they
+    cost nothing (the build picks them up).
+    """
+    if _cube is None:
+        yield
+        return
+    with _cube_lock:
+        before = list(loader())
+        yield
+        _cube.replace(kind, before, list(loader()))
+
+
+def reset():
+    global _cube
+    with _cube_lock:
+        _cube = None
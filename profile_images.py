@@ -0,0 +1,166 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from storage import DATA_DIR
+
+# Profile pictures as small local thumbnails.
+# An upload is decoded, rotated upright and cropped on a worker thread into one
+# fixed-size JPEG per use (sidebar, profile page). Re-encoding from pixels drops
+# EXIF/GPS and any other metadata. Thumbnails are written under
+# AVATAR_DIR/<user>/<version>-<size>.jpg, the version being a hash of the upload,
+# and the profile's profile_image_url becomes "avatar:<version>". Reads come from
+# a process-wide LRU of thumbnail bytes keyed by (user, version, size), then
+# disk; profiles without an uploaded picture get a generated initials tile, so
+# rendering a sidebar never fetches a remote image.
+
+AVATAR_DIR = os.environ.get("SMS_AVATAR_DIR", os.path.join(DATA_DIR, "avatars"))
+THUMBNAIL_SIZES = {"sidebar": 96, "profile": 240}
+JPEG_QUALITY = 82
+MAX_PIXELS = 40_000_000
+CACHE_BYTES = 16 * 1024 * 1024
+REF_PREFIX = "avatar:"
+UPLOAD_WORKERS = 2
+UPLOAD_TIMEOUT = float(os.environ.get("SMS_AVATAR_TIMEOUT", 20))
+
+
+def render_thumbnails(data: bytes) -> dict:
+    """Square JPEG thumbnails (size name -> bytes) of an uploaded image, without metadata.
+
+    Raises ValueError for uploads that are not a readable image or are too large.
+    """
+    try:
+        return _render_thumbnails(data)
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Not a readable image ({type(e).__name__})") from e
+
+
+def _render_thumbnails(data: bytes) -> dict:
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width * image.height > MAX_PIXELS:
+            raise ValueError("Image is too large")
+        largest = max(THUMBNAIL_SIZES.values())
+        image.draft("RGB", (largest * 2, largest * 2))  # JPEGs decode at reduced scale
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        thumbnails = {}
+        for name, size in THUMBNAIL_SIZES.items():
+            buffer = io.BytesIO()
+            ImageOps.fit(image, (size, size), Image.LANCZOS).save(
+                buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            thumbnails[name] = buffer.getvalue()
+    return thumbnails
+
+
+def render_placeholder(name: str, size: int) -> bytes:
+    """Initials on a colour derived from the name."""
+    initials = "".join(part[0] for part in (name or "?").replace(".", " ").split()[-2:]).upper() or "?"
+    shade = hashlib.sha256((name or "").encode()).digest()
+    image = Image.new("RGB", (size, size), tuple(80 + b % 120 for b in shade[:3]))
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=size // 3)
+    except (TypeError, ImportError):
+        font = ImageFont.load_default()
+    draw.text((size / 2, size / 2), initials, fill="white", font=font, anchor="mm")
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+class ProfileImageStore:
+    """Thumbnail files on disk with an LRU of their bytes in memory."""
+
+    def __init__(self, root: str = AVATAR_DIR, cache_bytes: int = CACHE_BYTES, workers: int = UPLOAD_WORKERS):
+        self.root = root
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()  # (user_id, version, size) -> bytes
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="profile-images")
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, user_id: int, version: str, size: str) -> str:
+        return os.path.join(self.root, str(user_id), f"{version}-{size}.jpg")
+
+    def _remember(self, key: tuple, data: bytes):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return
+            self._cache[key] = data
+            self._cached_bytes += len(data)
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+
+    def save(self, user_id: int, data: bytes) -> str:
+        """Render and store thumbnails for an upload; returns the profile reference "avatar:<version>"."""
+        version = hashlib.sha256(data).hexdigest()[:16]
+        thumbnails = render_thumbnails(data)
+        directory = os.path.join(self.root, str(user_id))
+        os.makedirs(directory, exist_ok=True)
+        for size, thumbnail in thumbnails.items():
+            fd, tmp_path = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(thumbnail)
+            os.replace(tmp_path, self.path(user_id, version, size))
+            self._remember((user_id, version, size), thumbnail)
+        return REF_PREFIX + version
+
+    def submit(self, user_id: int, data: bytes, on_saved=None):
+        """save() on a worker thread, then on_saved(reference) there too; returns a Future of the reference."""
+        def run():
+            reference = self.save(user_id, data)
+            if on_saved is not None:
+                on_saved(reference)
+            return reference
+
+        return self._pool.submit(run)
+
+    def thumbnail(self, user_id: int, reference: str, size: str = "sidebar", name: str = "") -> bytes:
+        """JPEG bytes for a profile's picture, or its initials tile when none was uploaded."""
+        if reference and reference.startswith(REF_PREFIX):
+            key = (user_id, reference[len(REF_PREFIX):], size)
+        else:
+            key = ("placeholder", name, size)
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                return data
+        if key[0] == "placeholder":
+            data = render_placeholder(name, THUMBNAIL_SIZES[size])
+        else:
+            try:
+                with open(self.path(*key), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return self.thumbnail(user_id, None, size, name)
+        self._remember(key, data)
+        return data
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ProfileImageStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ProfileImageStore()
+    return _store
+
+
+def set_store(store: ProfileImageStore) -> ProfileImageStore:
+    global _store
+    with _store_lock:
+        _store = store
+    return store
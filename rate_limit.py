@@ -0,0 +1,149 @@
+import ipaddress
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Process-wide login rate limiting, shared by every Streamlit session.
+# Each key (an email or a client address) owns a token bucket that refills at a
+# steady rate; a login attempt spends one token before any password hashing,
+# so floods are rejected with a dictionary lookup. Buckets live in an LRU map
+# capped at max_keys, so memory stays bounded however many keys are seen;
+# an evicted bucket comes back full, which only ever loosens the limit.
+# Successful logins give their tokens back, so only failed attempts count: a
+# school behind one NAT or load balancer address is not throttled by its own
+# users logging in. Behind a proxy listed in SMS_TRUSTED_PROXIES the client
+# address is taken from its X-Forwarded-For header instead of the socket.
+
+MAX_KEYS = 100000
+
+# (capacity, tokens refilled per second): by default 5 failed attempts per email
+# and 30 per client address, each refilling completely over 15 minutes.
+LIMIT_WINDOW_S = float(os.environ.get("SMS_LOGIN_WINDOW_S", 900))
+EMAIL_ATTEMPTS = int(os.environ.get("SMS_LOGIN_EMAIL_ATTEMPTS", 5))
+ADDRESS_ATTEMPTS = int(os.environ.get("SMS_LOGIN_ADDRESS_ATTEMPTS", 30))
+EMAIL_LIMIT = (EMAIL_ATTEMPTS, EMAIL_ATTEMPTS / LIMIT_WINDOW_S)
+ADDRESS_LIMIT = (ADDRESS_ATTEMPTS, ADDRESS_ATTEMPTS / LIMIT_WINDOW_S)
+
+# Proxies (addresses or networks, comma separated) whose forwarded header is believed
+FORWARDED_HEADER = os.environ.get("SMS_FORWARDED_HEADER", "X-Forwarded-For")
+TRUSTED_PROXIES = [ipaddress.ip_network(p.strip(), strict=False)
+                   for p in os.environ.get("SMS_TRUSTED_PROXIES", "").split(",") if p.strip()]
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by string, evicting the least recently used keys."""
+
+    def __init__(self, capacity: float, refill_per_s: float, max_keys: int = MAX_KEYS, clock=time.monotonic):
+        self.capacity = capacity
+        self.refill_per_s = refill_per_s
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.capacity
+        tokens, updated_at = bucket
+        return min(self.capacity, tokens + (now - updated_at) * self.refill_per_s)
+
+    def acquire(self, key, tokens: float = 1) -> bool:
+        """Spend tokens from the key's bucket; False (and nothing spent) if it holds too few."""
+        with self._lock:
+            now = self.clock()
+            available = self._tokens(key, now)
+            allowed = available >= tokens
+            self._buckets[key] = (available - tokens if allowed else available, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def refund(self, key, tokens: float = 1):
+        """Give back tokens spent on an attempt that should not count (capped at capacity)."""
+        with self._lock:
+            if key in self._buckets:
+                now = self.clock()
+                self._buckets[key] = (min(self.capacity, self._tokens(key, now) + tokens), now)
+
+    def remaining(self, key) -> int:
+        with self._lock:
+            return int(self._tokens(key, self.clock()))
+
+    def retry_after(self, key, tokens: float = 1) -> float:
+        """Seconds until the key's bucket holds enough tokens again."""
+        with self._lock:
+            missing = tokens - self._tokens(key, self.clock())
+        return max(missing, 0) / self.refill_per_s
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+email_limiter = TokenBucketLimiter(*EMAIL_LIMIT)
+address_limiter = TokenBucketLimiter(*ADDRESS_LIMIT)
+
+
+def _trusted(address: str, proxies) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in proxies)
+
+
+def resolve_address(remote_ip: str, forwarded: str = None, proxies=None) -> str:
+    """The client address: the socket peer, or if that is a trusted proxy, the last untrusted forwarded hop."""
+    proxies = TRUSTED_PROXIES if proxies is None else proxies
+    if not forwarded or not _trusted(remote_ip, proxies):
+        return remote_ip
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop, proxies):
+            return hop
+    return hops[0] if hops else remote_ip
+
+
+def client_address():
+    """The connecting browser's IP address, or None outside a served session (e.g. AppTest)."""
+    try:
+        from streamlit.runtime import Runtime
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        client = Runtime.instance().get_client(ctx.session_id) if ctx else None
+        if client is None:
+            return None
+        return resolve_address(client.request.remote_ip, client.request.headers.get(FORWARDED_HEADER))
+    except (AttributeError, RuntimeError):
+        return None
+
+
+def check_login(email: str, address: str = None) -> float:
+    """Spend one login attempt; returns 0 if allowed, else the seconds to wait.
+
+    Pass the same email and address to login_succeeded() if the attempt succeeds.
+    """
+    if address and not address_limiter.acquire(address):
+        return address_limiter.retry_after(address)
+    email = email.strip().lower()
+    if not email_limiter.acquire(email):
+        return email_limiter.retry_after(email)
+    return 0
+
+
+def login_succeeded(email: str, address: str = None):
+    """Give a user their full allowance back, and the address its token, after a successful login."""
+    email_limiter.reset(email.strip().lower())
+    if address:
+        address_limiter.refund(address)
+
+
+def attempts_remaining(email: str) -> int:
+    return email_limiter.remaining(email.strip().lower())
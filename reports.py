@@ -0,0 +1,272 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+import storage
+
+# Report engine for the admin and HOD report pages.
+# A report is computed on a background worker in one streaming pass over the
+# store's attendance or marks rows for the date range: each row only updates
+# running totals (present/total, count/sum/min/max, grade bins), so memory does
+# not grow with the range. Jobs report progress as rows processed / rows in
+# range. Finished jobs are kept for REPORT_TTL seconds keyed by (report type,
+# range, sections, format, department); a request matching a running or
+# finished job gets that job, so repeated requests cost nothing.
+
+REPORT_WORKERS = int(os.environ.get("SMS_REPORT_WORKERS", 2))
+REPORT_TTL = 900
+MAX_JOBS = 64
+PROGRESS_EVERY = 5000
+LINES_PER_PAGE = 60
+
+REPORTS = {
+    "Attendance Summary Report": ("attendance", ("By Class", "By Subject", "By Month")),
+    "Academic Performance Report": ("marks", ("By Class", "By Subject", "Grade Distribution")),
+    "Department Statistics Report": ("both", ("Departments",)),
+    "User Activity Report": (None, ("By Role", "By Status")),
+}
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "PDF": ("pdf", "application/pdf"),
+}
+
+
+class _Attendance:
+    """Running present/total counts per class, subject, month and department."""
+
+    def __init__(self):
+        self.groups = {"By Class": {}, "By Subject": {}, "By Month": {}, "Departments": {}}
+
+    def add(self, class_name, department, subject, date, status):
+        present = status == "Present"
+        for section, key in (("By Class", class_name), ("By Subject", subject), ("By Month", date[:7]),
+                             ("Departments", department)):
+            tally = self.groups[section].get(key)
+            if tally is None:
+                tally = self.groups[section][key] = [0, 0]
+            tally[0] += present
+            tally[1] += 1
+
+    def frame(self, section: str, label: str) -> pd.DataFrame:
+        rows = [(key, present, total, round(100 * present / total, 1))
+                for key, (present, total) in sorted(self.groups[section].items(), key=lambda i: str(i[0]))]
+        return pd.DataFrame(rows, columns=[label, "Present", "Total", "Attendance %"])
+
+
+class _Marks:
+    """Running count/sum/min/max of percentages per class, subject and department, plus grade bins."""
+
+    def __init__(self):
+        self.groups = {"By Class": {}, "By Subject": {}, "Departments": {}}
+        self.grades = {}
+
+    def add(self, class_name, department, subject, exam_type, marks, max_marks, date):
+        percentage = 100 * marks / max_marks if max_marks else 0
+        grade = storage.grade_for(percentage)
+        self.grades[grade] = self.grades.get(grade, 0) + 1
+        for section, key in (("By Class", class_name), ("By Subject", subject), ("Departments", department)):
+            tally = self.groups[section].get(key)
+            if tally is None:
+                self.groups[section][key] = [1, percentage, percentage, percentage]
+            else:
+                tally[0] += 1
+                tally[1] += percentage
+                tally[2] = min(tally[2], percentage)
+                tally[3] = max(tally[3], percentage)
+
+    def frame(self, section: str, label: str) -> pd.DataFrame:
+        if section == "Grade Distribution":
+            # Best grade first: A+, A, B+, B, ...
+            rows = sorted(self.grades.items(), key=lambda i: (i[0][0], not i[0].endswith("+")))
+            return pd.DataFrame(rows, columns=["Grade", "Results"])
+        rows = [(key, count, round(total / count, 1), round(low, 1), round(high, 1))
+                for key, (count, total, low, high) in sorted(self.groups[section].items(), key=lambda i: str(i[0]))]
+        return pd.DataFrame(rows, columns=[label, "Results", "Average %", "Lowest %", "Highest %"])
+
+
+def compute(backend, report_type: str, start: str, end: str, sections, department: str = None,
+            progress=lambda fraction: None) -> dict:
+    """Section name -> DataFrame for a report, from one pass over the rows in [start, end]."""
+    source, available = REPORTS[report_type]
+    sections = [s for s in available if s in sections] or list(available)
+    if source is None:
+        users = pd.DataFrame(backend.get_all_users(), columns=["id", "name", "role", "department", "status"])
+        if department is not None:
+            users = users[users["department"] == department]
+        progress(1.0)
+        column = {"By Role": "role", "By Status": "status"}
+        return {s: users.groupby(column[s]).size().reset_index(name="Users") for s in sections}
+
+    kinds = ("attendance", "marks") if source == "both" else (source,)
+    totals = {kind: backend.count_report_rows(kind, start, end, department) for kind in kinds}
+    expected, done = max(sum(totals.values()), 1), 0
+    tallies = {"attendance": _Attendance(), "marks": _Marks()}
+    for kind in kinds:
+        add = tallies[kind].add
+        for row in backend.iter_report_rows(kind, start, end, department):
+            add(*row)
+            done += 1
+            if done % PROGRESS_EVERY == 0:
+                progress(done / expected)
+    progress(1.0)
+
+    if source == "both":
+        attendance = tallies["attendance"].frame("Departments", "Department")
+        marks = tallies["marks"].frame("Departments", "Department")[["Department", "Results", "Average %"]]
+        users = pd.DataFrame(backend.get_all_users(), columns=["id", "name", "role", "department", "status"])
+        headcount = users.pivot_table(index="department", columns="role", values="id", aggfunc="count", fill_value=0)
+        frame = attendance.merge(marks, on="Department", how="outer").merge(
+            headcount, left_on="Department", right_index=True, how="left")
+        return {"Departments": frame.fillna(0)}
+    labels = {"By Class": "Class", "By Subject": "Subject", "By Month": "Month", "Grade Distribution": "Grade"}
+    return {s: tallies[source].frame(s, labels[s]) for s in sections}
+
+
+def _pdf(lines: list) -> bytes:
+    """A plain text PDF (Courier, LINES_PER_PAGE lines per page)."""
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>"]
+    kids = []
+    for page in pages:
+        text = "".join(
+            "({}) Tj T*\n".format(line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)"))
+            for line in page
+        )
+        stream = f"BT /F1 9 Tf 11 TL 36 806 Td\n{text}ET"
+        objects.append(f"<< /Length {len(stream.encode('latin-1', 'replace'))} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1", "replace"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    out.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def render(title: str, frames: dict, fmt: str) -> bytes:
+    """Report bytes in CSV, Excel (one sheet per section) or PDF."""
+    if fmt == "Excel":
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            for section, frame in frames.items():
+                frame.to_excel(writer, sheet_name=section[:31], index=False)
+        return buffer.getvalue()
+    if fmt == "PDF":
+        lines = [title, ""]
+        for section, frame in frames.items():
+            lines += [section, "-" * len(section), *frame.to_string(index=False).splitlines(), ""]
+        return _pdf(lines)
+    return "\n".join(f"# {section}\n{frame.to_csv(index=False)}" for section, frame in frames.items()).encode()
+
+
+class ReportJob:
+    """One report request: status ("queued", "running", "ready", "failed"), progress and result."""
+
+    def __init__(self, key: tuple, title: str, fmt: str):
+        self.key = key
+        self.title = title
+        extension, self.mime = FORMATS[fmt]
+        self.file_name = f"{title.replace(' ', '_')}.{extension}"
+        self.status = "queued"
+        self.progress = 0.0
+        self.data = None
+        self.error = None
+        self.created = datetime.now()
+        self.finished = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the job is ready or failed."""
+        return self._done.wait(timeout)
+
+    def expired(self, now: datetime, ttl: float) -> bool:
+        return self.finished is not None and (now - self.finished).total_seconds() > ttl
+
+
+class ReportEngine:
+    """Runs report jobs on a bounded pool and keeps finished ones for reuse."""
+
+    def __init__(self, workers: int = REPORT_WORKERS, ttl: float = REPORT_TTL, max_jobs: int = MAX_JOBS):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reports")
+        self._jobs = OrderedDict()  # key -> ReportJob, oldest first
+        self._lock = threading.Lock()
+
+    def request(self, backend, report_type: str, start, end, sections=(), fmt: str = "CSV",
+                department: str = None) -> ReportJob:
+        """The job for these parameters: a cached or running one if any, else a newly queued one."""
+        key = (report_type, str(start), str(end), tuple(sorted(sections)), fmt, department)
+        now = datetime.now()
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != "failed" and not job.expired(now, self.ttl):
+                self._jobs.move_to_end(key)
+                return job
+            title = f"{report_type} {start} to {end}" + (f" ({department})" if department else "")
+            job = self._jobs[key] = ReportJob(key, title, fmt)
+            self._jobs.move_to_end(key)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        self._pool.submit(self._run, job, backend)
+        return job
+
+    def _run(self, job: ReportJob, backend):
+        job.status = "running"
+        report_type, start, end, sections, fmt, department = job.key
+
+        def progress(fraction):
+            job.progress = min(fraction, 1.0)
+
+        try:
+            frames = compute(backend, report_type, start, end, sections, department, progress)
+            job.data = render(job.title, frames, fmt)
+            job.status = "ready"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        job.finished = datetime.now()
+        job._done.set()
+
+    def jobs(self) -> list:
+        """Unexpired jobs, newest first."""
+        now = datetime.now()
+        with self._lock:
+            return [job for job in reversed(self._jobs.values()) if not job.expired(now, self.ttl)]
+
+    def clear(self):
+        with self._lock:
+            self._jobs.clear()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> ReportEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ReportEngine()
+    return _engine
+
+
+def reset():
+    """Forget finished reports (after the data they were computed from was replaced)."""
+    if _engine is not None:
+        _engine.clear()
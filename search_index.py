@@ -0,0 +1,222 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+
+# In-process full-text search over announcements, study materials and assignments.
+# Documents are tokenized into an inverted index (term -> {doc: weight}) where the
+# weight is the BM25 term-frequency part, with title terms counted TITLE_BOOST
+# times. A sorted vocabulary gives prefix matches for the last (still being
+# typed) query word. Queries AND their words together and walk the rarest
+# word's postings in descending weight, stopping as soon as no remaining
+# document can beat the current top k, so common words do not mean scoring
+# every document. New rows are picked up incrementally by refresh(), which asks
+# the backend only for ids above the highest one already indexed.
+
+KINDS = ("announcement", "material", "assignment")
+TITLE_BOOST = 3
+K1 = 1.2
+B = 0.75
+MAX_PREFIX_TERMS = 50
+MIN_PREFIX = 2
+STOPWORDS = frozenset("a an and are as at be by for from in is it of on or the to with".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """Inverted index with BM25 ranking, prefix expansion and early-terminating top-k."""
+
+    def __init__(self):
+        self.docs = {}  # (kind, id) -> stored fields
+        self.postings = {}  # term -> {(kind, id): weight}
+        self.vocabulary = []  # sorted terms, for prefix lookups
+        self.last_ids = dict.fromkeys(KINDS, 0)
+        self._impacts = {}  # term -> [(weight, doc)] sorted descending, rebuilt lazily after changes
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    @staticmethod
+    def _parse(doc: dict) -> tuple:
+        title, body = tokenize(doc.get("title")), tokenize(doc.get("body"))
+        counts = dict.fromkeys(title, 0)
+        for term in title:
+            counts[term] += TITLE_BOOST
+        for term in body:
+            counts[term] = counts.get(term, 0) + 1
+        stored = {k: v for k, v in doc.items() if k != "body"}
+        stored["snippet"] = (doc.get("body") or "")[:160]
+        stored["terms"] = tuple(counts)
+        stored["length"] = len(title) * TITLE_BOOST + len(body)
+        return (doc["kind"], doc["id"]), counts, stored
+
+    def add(self, doc: dict):
+        """Index {"kind", "id", "title", "body", ...}; re-adding a document replaces it."""
+        self.add_many([doc])
+
+    def add_many(self, docs):
+        """Index a batch; new terms are merged into the vocabulary once per batch."""
+        parsed = [self._parse(doc) for doc in docs]
+        with self._lock:
+            for key, _, stored in parsed:
+                if key in self.docs:
+                    self.remove(key)
+                self._total_length += stored["length"]
+                self.docs[key] = stored
+                self.last_ids[key[0]] = max(self.last_ids.get(key[0], 0), key[1])
+            if not self.docs:
+                return
+            average = self._total_length / len(self.docs)
+            postings_by_term = self.postings
+            new_terms = []
+            touched = set()
+            k1_plus = K1 + 1
+            for key, counts, stored in parsed:
+                norm = K1 * (1 - B + B * stored["length"] / average)
+                for term, tf in counts.items():
+                    postings = postings_by_term.get(term)
+                    if postings is None:
+                        postings = postings_by_term[term] = {}
+                        new_terms.append(term)
+                    postings[key] = tf * k1_plus / (tf + norm)
+                touched.update(counts)
+            for term in touched:
+                self._impacts.pop(term, None)
+            if len(new_terms) == 1:
+                bisect.insort(self.vocabulary, new_terms[0])
+            elif new_terms:
+                self.vocabulary = sorted(self.vocabulary + new_terms)
+
+    def remove(self, key: tuple):
+        with self._lock:
+            stored = self.docs.pop(key, None)
+            if stored is None:
+                return
+            self._total_length -= stored["length"]
+            for term in stored["terms"]:
+                postings = self.postings.get(term)
+                postings.pop(key, None)
+                self._impacts.pop(term, None)
+                if not postings:
+                    del self.postings[term]
+                    del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+
+    def _idf(self, frequency: int) -> float:
+        return math.log(1 + (len(self.docs) - frequency + 0.5) / (frequency + 0.5))
+
+    def _expand(self, prefix: str) -> list:
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        terms = []
+        for term in self.vocabulary[start:]:
+            if not term.startswith(prefix) or len(terms) >= MAX_PREFIX_TERMS:
+                break
+            terms.append(term)
+        return terms
+
+    def _group(self, terms: list) -> tuple:
+        """Scored postings and impact order for one query word (several terms when prefix-expanded)."""
+        if len(terms) == 1:
+            term = terms[0]
+            postings = self.postings[term]
+            idf = self._idf(len(postings))
+            impacts = self._impacts.get(term)
+            if impacts is None:
+                impacts = self._impacts[term] = sorted(((w, d) for d, w in postings.items()), reverse=True)
+            return (postings, idf), impacts
+        merged = {}
+        for term in terms:
+            postings = self.postings[term]
+            idf = self._idf(len(postings))
+            for doc, weight in postings.items():
+                score = weight * idf
+                if score > merged.get(doc, 0):
+                    merged[doc] = score
+        impacts = sorted(((s, d) for d, s in merged.items()), reverse=True)
+        return (merged, 1.0), impacts
+
+    def search(self, query: str, limit: int = 20, allowed=None) -> list:
+        """Top documents containing every query word (the last may be a prefix), best first.
+
+        allowed(stored_doc) -> bool filters results, e.g. to a student's class.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            groups = []
+            for position, word in enumerate(words):
+                terms = [word] if word in self.postings else []
+                if position == len(words) - 1 and len(word) >= MIN_PREFIX:
+                    terms = self._expand(word)
+                if not terms:
+                    return []
+                groups.append(self._group(terms))
+            groups.sort(key=lambda group: len(group[0][0]))
+            (_, driver_idf), impacts = groups[0]
+            others = [(postings, idf, impacts_[0][0] * idf) for (postings, idf), impacts_ in groups[1:]]
+            others_best = sum(best for _, _, best in others)
+
+            top = []
+            for weight, doc in impacts:
+                bound = weight * driver_idf + others_best
+                if len(top) >= limit and bound <= top[0][0]:
+                    break
+                score = weight * driver_idf
+                for postings, idf, _ in others:
+                    other = postings.get(doc)
+                    if other is None:
+                        break
+                    score += other * idf
+                else:
+                    stored = self.docs[doc]
+                    if allowed is not None and not allowed(stored):
+                        continue
+                    entry = (score, doc)
+                    if len(top) < limit:
+                        heapq.heappush(top, entry)
+                    elif entry > top[0]:
+                        heapq.heapreplace(top, entry)
+            results = []
+            for score, doc in sorted(top, reverse=True):
+                stored = {k: v for k, v in self.docs[doc].items() if k not in ("terms", "length")}
+                stored["score"] = round(score, 3)
+                results.append(stored)
+            return results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(loader) -> SearchIndex:
+    """The process-wide index, built on first use from loader(last_ids) documents."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = SearchIndex()
+                index.add_many(loader(index.last_ids))
+                _index = index
+    return _index
+
+
+def refresh(loader):
+    """Index documents added since the last build/refresh; no-op until the index is first used."""
+    index = _index
+    if index is not None:
+        with index._lock:
+            index.add_many(loader(dict(index.last_ids)))
+
+
+def reset():
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Optional stateless sessions (SMS_SESSION_MODE=token).
+# After login the user's role, id and expiry are signed into an HS256 token kept
+# in the page URL, and every rerun rebuilds the login from it, so any replica
+# sharing SMS_SESSION_SECRET can serve any user without sticky sessions.
+# SMS_SESSION_OLD_SECRETS (comma separated) still verify, which allows key rotation.
+# Keys are resolved once per process and successfully verified tokens are
+# cached until they expire, so a rerun normally costs one dict lookup.
+
+SESSION_MODE = os.environ.get("SMS_SESSION_MODE", "state")
+SESSION_HOURS = 8
+ALGORITHM = "HS256"
+QUERY_PARAM = "session"
+MAX_CACHED = 10000
+
+
+def enabled() -> bool:
+    return SESSION_MODE == "token"
+
+
+class TokenSigner:
+    """Issues and verifies signed session tokens; the first secret signs, all of them verify."""
+
+    def __init__(self, secrets: list, hours: float = SESSION_HOURS):
+        if not secrets or not all(secrets):
+            raise ValueError("At least one non-empty session secret is required")
+        # Key ids are derived from the secret, so they survive reordering during rotation.
+        self.keys = {hashlib.sha256(secret.encode()).hexdigest()[:12]: secret for secret in secrets}
+        self.signing_kid = next(iter(self.keys))
+        self.hours = hours
+        self._verified = OrderedDict()  # token -> claims
+        self._lock = threading.Lock()
+
+    def issue(self, user_id: int, role: str, email: str, now: float = None) -> str:
+        from jose import jwt  # only token mode needs it, so state mode never loads it
+
+        now = int(now if now is not None else time.time())
+        claims = {"sub": str(user_id), "role": role, "email": email, "iat": now,
+                  "exp": now + int(self.hours * 3600)}
+        return jwt.encode(claims, self.keys[self.signing_kid], algorithm=ALGORITHM,
+                          headers={"kid": self.signing_kid})
+
+    def verify(self, token: str, now: float = None):
+        """Claims of a valid, unexpired token, else None."""
+        if not token:
+            return None
+        now = now if now is not None else time.time()
+        with self._lock:
+            claims = self._verified.get(token)
+            if claims is not None:
+                self._verified.move_to_end(token)
+        if claims is None:
+            from jose import JWTError, jwt
+
+            try:
+                key = self.keys.get(jwt.get_unverified_header(token).get("kid"))
+                if key is None:
+                    return None
+                # Expiry is checked below against `now`, for cached and fresh tokens alike.
+                claims = jwt.decode(token, key, algorithms=[ALGORITHM], options={"verify_exp": False})
+            except JWTError:
+                return None
+            with self._lock:
+                self._verified[token] = claims
+                if len(self._verified) > MAX_CACHED:
+                    self._verified.popitem(last=False)
+        if claims.get("exp", 0) <= now:
+            with self._lock:
+                self._verified.pop(token, None)
+            return None
+        return claims
+
+
+_signer = None
+_signer_lock = threading.Lock()
+
+
+def get_signer() -> TokenSigner:
+    """The process-wide signer built from SMS_SESSION_SECRET / SMS_SESSION_OLD_SECRETS."""
+    global _signer
+    if _signer is None:
+        with _signer_lock:
+            if _signer is None:
+                secret = os.environ.get("SMS_SESSION_SECRET")
+                if not secret:
+                    raise RuntimeError("SMS_SESSION_SECRET must be set when SMS_SESSION_MODE=token")
+                old = [s for s in os.environ.get("SMS_SESSION_OLD_SECRETS", "").split(",") if s]
+                _signer = TokenSigner([secret, *old])
+    return _signer
+
+
+def set_signer(signer: TokenSigner) -> TokenSigner:
+    global _signer
+    with _signer_lock:
+        _signer = signer
+    return signer
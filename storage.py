@@ -0,0 +1,1532 @@
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import chain
+from operator import itemgetter
+
+import cache
+
+# Storage backends behind the mock_data accessor API.
+# "memory" serves the MOCK_* dicts (demo mode), "sqlite" is an embedded,
+# indexed store with a pooled set of connections shared by every session.
+
+DATA_DIR = os.environ.get("SMS_DATA_DIR", "data")
+DEFAULT_BACKEND = os.environ.get("SMS_BACKEND", "memory")
+DEFAULT_DB_PATH = os.environ.get("SMS_DB_PATH", os.path.join(DATA_DIR, "school.db"))
+
+# Salted hash of "test123", the password of the demo accounts and of generated schools' accounts
+DEMO_PASSWORD_HASH = "$pbkdf2-sha256$29000$Z8yZU6r13junNKb0fq/VOg$CGhdA4.fSzknUAUaiyirYtCRiMnRZBgD8tirewvXOsE"
+
+PROFILE_TABLES = {
+    "student": "students",
+    "teacher": "teachers",
+    "hod": "hods",
+    "admin": "admins",
+}
+
+STAFF_COLUMNS = [
+    "first_name", "last_name", "department", "designation", "qualification",
+    "contact_number", "joining_date", "profile_image_url", "employee_id",
+]
+
+TIMETABLE_COLUMNS = ["day", "time", "subject", "teacher", "room", "teacher_id"]
+
+PROFILE_COLUMNS = {
+    "students": [
+        "first_name", "last_name", "class_name", "roll_number", "date_of_birth", "gender",
+        "contact_number", "address", "admission_date", "profile_image_url", "department",
+    ],
+    "teachers": STAFF_COLUMNS,
+    "hods": STAFF_COLUMNS,
+    "admins": ["first_name", "last_name", "designation", "contact_number", "profile_image_url"],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    role TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    password_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL UNIQUE REFERENCES users(id),
+    first_name TEXT, last_name TEXT, class_name TEXT, roll_number TEXT,
+    date_of_birth TEXT, gender TEXT, contact_number TEXT, address TEXT,
+    admission_date TEXT, profile_image_url TEXT, department TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_students_class ON students(class_name, roll_number);
+CREATE INDEX IF NOT EXISTS idx_students_department ON students(department);
+
+CREATE TABLE IF NOT EXISTS teachers (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL UNIQUE REFERENCES users(id),
+    first_name TEXT, last_name TEXT, department TEXT, designation TEXT,
+    qualification TEXT, contact_number TEXT, joining_date TEXT,
+    profile_image_url TEXT, employee_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_teachers_department ON teachers(department);
+
+CREATE TABLE IF NOT EXISTS hods (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL UNIQUE REFERENCES users(id),
+    first_name TEXT, last_name TEXT, department TEXT, designation TEXT,
+    qualification TEXT, contact_number TEXT, joining_date TEXT,
+    profile_image_url TEXT, employee_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS admins (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL UNIQUE REFERENCES users(id),
+    first_name TEXT, last_name TEXT, designation TEXT,
+    contact_number TEXT, profile_image_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS departments (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    hod TEXT, teachers INTEGER, students INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    strength INTEGER, class_teacher TEXT
+);
+
+CREATE TABLE IF NOT EXISTS timetable (
+    id INTEGER PRIMARY KEY,
+    class_name TEXT NOT NULL,
+    day TEXT, time TEXT, subject TEXT, teacher TEXT, room TEXT,
+    teacher_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_timetable_class ON timetable(class_name);
+
+CREATE TABLE IF NOT EXISTS attendance (
+    student_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    status TEXT NOT NULL,
+    class_name TEXT,
+    marked_by INTEGER,
+    PRIMARY KEY (student_id, date, subject)
+);
+CREATE INDEX IF NOT EXISTS idx_attendance_class_date ON attendance(class_name, date);
+
+CREATE TABLE IF NOT EXISTS assignments (
+    id INTEGER PRIMARY KEY,
+    title TEXT, description TEXT, subject TEXT, class_name TEXT,
+    due_date TEXT, max_marks INTEGER, teacher TEXT, created_by INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_assignments_class ON assignments(class_name, due_date);
+CREATE INDEX IF NOT EXISTS idx_assignments_created_by ON assignments(created_by);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    assignment_id INTEGER NOT NULL,
+    student_id INTEGER NOT NULL,
+    submitted_date TEXT,
+    submission_text TEXT,
+    file_path TEXT,
+    marks_obtained REAL,
+    file_digest TEXT, file_name TEXT, file_checksum TEXT,
+    processing_status TEXT, file_format TEXT, page_count INTEGER, word_count INTEGER,
+    extracted_text TEXT, processing_error TEXT,
+    PRIMARY KEY (assignment_id, student_id)
+);
+
+CREATE TABLE IF NOT EXISTS marks (
+    student_id INTEGER NOT NULL,
+    class_name TEXT,
+    subject TEXT NOT NULL,
+    exam_type TEXT NOT NULL,
+    marks REAL NOT NULL,
+    max_marks REAL NOT NULL DEFAULT 100,
+    date TEXT,
+    entered_by INTEGER,
+    PRIMARY KEY (student_id, subject, exam_type)
+);
+CREATE INDEX IF NOT EXISTS idx_marks_class ON marks(class_name, subject, exam_type);
+
+CREATE TABLE IF NOT EXISTS announcements (
+    id INTEGER PRIMARY KEY,
+    title TEXT, content TEXT, priority TEXT, date TEXT,
+    author TEXT, author_user_id INTEGER, is_active INTEGER NOT NULL DEFAULT 1,
+    audience TEXT NOT NULL DEFAULT 'school', audience_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_announcements_date ON announcements(date);
+
+CREATE TABLE IF NOT EXISTS study_materials (
+    id INTEGER PRIMARY KEY,
+    title TEXT, subject TEXT, class_name TEXT, type TEXT, upload_date TEXT,
+    teacher TEXT, description TEXT, uploaded_by INTEGER,
+    blob_digest TEXT, file_name TEXT, file_size INTEGER, link TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_study_materials_class ON study_materials(class_name);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    day_start INTEGER NOT NULL
+);
+"""
+
+# Keyset cursor used for the first page: sorts after every stored (date, id).
+MAX_DATE = "9999-12-31"
+MAX_ID = 2 ** 62
+
+# Columns added after the first release, applied to existing databases on open.
+MIGRATIONS = {
+    "users": [
+        # Accounts created before hashes moved into the store have none and must reset their password
+        ("password_hash", "TEXT"),
+    ],
+    "timetable": [
+        # The teaching user, so schedules don't depend on how the name is written
+        ("teacher_id", "INTEGER"),
+    ],
+    "announcements": [
+        ("audience", "TEXT NOT NULL DEFAULT 'school'"),
+        ("audience_key", "TEXT"),
+    ],
+    "study_materials": [
+        ("blob_digest", "TEXT"),
+        ("file_name", "TEXT"),
+        ("file_size", "INTEGER"),
+        ("link", "TEXT"),
+    ],
+    "submissions": [
+        ("file_digest", "TEXT"),
+        ("file_name", "TEXT"),
+        ("file_checksum", "TEXT"),
+        ("processing_status", "TEXT"),
+        ("file_format", "TEXT"),
+        ("page_count", "INTEGER"),
+        ("word_count", "INTEGER"),
+        ("extracted_text", "TEXT"),
+        ("processing_error", "TEXT"),
+    ],
+}
+# Submission columns the background processor may update.
+SUBMISSION_PROCESSING_FIELDS = (
+    "processing_status", "file_checksum", "file_format", "page_count", "word_count", "extracted_text",
+    "processing_error",
+)
+MIGRATION_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_announcements_feed "
+    "ON announcements(is_active, audience, audience_key, date, id)",
+    "CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date)",
+    "CREATE INDEX IF NOT EXISTS idx_marks_date ON marks(date)",
+    "CREATE INDEX IF NOT EXISTS idx_timetable_teacher ON timetable(teacher_id)",
+)
+
+# Queries are module constants so each pooled connection's statement cache
+# reuses the prepared statement instead of re-parsing the SQL on every call.
+Q_STUDENT_BY_USER = (
+    "SELECT id, user_id, first_name, last_name, class_name AS class, roll_number, date_of_birth, "
+    "gender, contact_number, address, admission_date, profile_image_url, department "
+    "FROM students WHERE user_id = ?"
+)
+Q_STUDENTS = (
+    "SELECT id, user_id, first_name, last_name, class_name AS class, roll_number, date_of_birth, "
+    "gender, contact_number, address, admission_date, profile_image_url, department "
+    "FROM students ORDER BY class_name, roll_number"
+)
+Q_STUDENTS_BY_CLASS = (
+    "SELECT id, user_id, first_name, last_name, class_name AS class, roll_number, date_of_birth, "
+    "gender, contact_number, address, admission_date, profile_image_url, department "
+    "FROM students WHERE class_name = ? ORDER BY roll_number"
+)
+Q_STUDENTS_BY_DEPARTMENT = (
+    "SELECT id, user_id, first_name, last_name, class_name AS class, roll_number, date_of_birth, "
+    "gender, contact_number, address, admission_date, profile_image_url, department "
+    "FROM students WHERE department = ? ORDER BY class_name, roll_number"
+)
+Q_TEACHER_BY_USER = "SELECT * FROM teachers WHERE user_id = ?"
+Q_TEACHERS_BY_DEPARTMENT = "SELECT * FROM teachers WHERE department = ? ORDER BY id"
+Q_HOD_BY_USER = "SELECT * FROM hods WHERE user_id = ?"
+Q_ADMIN_BY_USER = "SELECT * FROM admins WHERE user_id = ?"
+Q_USER_ROLE = "SELECT role FROM users WHERE id = ?"
+Q_CREDENTIALS = "SELECT id, role, is_active, password_hash FROM users WHERE email = ?"
+Q_PASSWORD_HASH = "SELECT password_hash FROM users WHERE id = ?"
+Q_SET_PASSWORD_HASH = "UPDATE users SET password_hash = ? WHERE id = ?"
+# Report rows for a date range, optionally limited to one department (params: start, end, dept, dept).
+Q_REPORT_ROWS = {
+    "attendance": (
+        "SELECT a.class_name, s.department, a.subject, a.date, a.status FROM attendance a "
+        "JOIN students s ON s.id = a.student_id WHERE a.date BETWEEN ? AND ? AND (? IS NULL OR s.department = ?)"
+    ),
+    "marks": (
+        "SELECT m.class_name, s.department, m.subject, m.exam_type, m.marks, m.max_marks, m.date FROM marks m "
+        "JOIN students s ON s.id = m.student_id WHERE m.date BETWEEN ? AND ? AND (? IS NULL OR s.department = ?)"
+    ),
+}
+Q_REPORT_COUNTS = {kind: f"SELECT COUNT(*) FROM ({sql})" for kind, sql in Q_REPORT_ROWS.items()}
+# The report rows one attendance or marks write can replace (params: class, subject, date or exam).
+Q_ROLLUP_ROWS = {
+    "attendance": (
+        "SELECT a.class_name, s.department, a.subject, a.date, a.status FROM attendance a "
+        "JOIN students s ON s.id = a.student_id WHERE a.class_name = ? AND a.subject = ? AND a.date = ?"
+    ),
+    "marks": (
+        "SELECT m.class_name, s.department, m.subject, m.exam_type, m.marks, m.max_marks, m.date FROM marks m "
+        "JOIN students s ON s.id = m.student_id WHERE m.class_name = ? AND m.subject = ? AND m.exam_type = ? "
+        "AND m.date IS NOT NULL"
+    ),
+}
+Q_TABLE_NAMES = "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+Q_TIMETABLE = (
+    "SELECT t.day, t.time, t.subject, t.teacher, t.room, t.teacher_id FROM students s "
+    "JOIN timetable t ON t.class_name = s.class_name WHERE s.user_id = ? ORDER BY t.id"
+)
+Q_CLASS_TIMETABLE = (
+    "SELECT day, time, subject, teacher, room, teacher_id FROM timetable WHERE class_name = ? ORDER BY id"
+)
+Q_TEACHER_TIMETABLE = (
+    "SELECT class_name, day, time, subject, teacher, room, teacher_id FROM timetable WHERE teacher_id = ? ORDER BY id"
+)
+Q_DELETE_CLASS_TIMETABLE = "DELETE FROM timetable WHERE class_name = ?"
+Q_INSERT_TIMETABLE = (
+    "INSERT INTO timetable (class_name, day, time, subject, teacher, room, teacher_id) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+Q_ATTENDANCE = (
+    "SELECT a.date, a.subject, a.status FROM students s "
+    "JOIN attendance a ON a.student_id = s.id WHERE s.user_id = ? ORDER BY a.date"
+)
+Q_CLASS_ATTENDANCE = (
+    "SELECT student_id, date, subject, status FROM attendance WHERE class_name = ? ORDER BY date"
+)
+Q_ASSIGNMENTS = (
+    "SELECT a.id, a.title, a.description, a.subject, a.due_date, a.max_marks, "
+    "sub.student_id IS NOT NULL AS is_submitted, sub.submitted_date, sub.marks_obtained, a.teacher, "
+    "sub.file_name, sub.processing_status, sub.processing_error "
+    "FROM students s JOIN assignments a ON a.class_name = s.class_name "
+    "LEFT JOIN submissions sub ON sub.assignment_id = a.id AND sub.student_id = s.id "
+    "WHERE s.user_id = ? ORDER BY a.due_date, a.id"
+)
+Q_TEACHER_ASSIGNMENTS = (
+    "SELECT a.id, a.title, a.description, a.subject, a.due_date, a.max_marks, a.class_name AS class, "
+    "COUNT(sub.student_id) > 0 AS is_submitted, MAX(sub.submitted_date) AS submitted_date, "
+    "AVG(sub.marks_obtained) AS marks_obtained, a.teacher, COUNT(sub.student_id) AS submission_count, "
+    "COALESCE(SUM(sub.processing_status IN ('queued', 'processing')), 0) AS processing_count "
+    "FROM assignments a LEFT JOIN submissions sub ON sub.assignment_id = a.id "
+    "WHERE a.created_by = ? GROUP BY a.id ORDER BY a.due_date, a.id"
+)
+Q_SUBMISSION_STATUSES = (
+    "SELECT s.roll_number, s.first_name || ' ' || s.last_name AS student, sub.submitted_date, sub.file_name, "
+    "sub.processing_status, sub.file_format, sub.page_count, sub.word_count, sub.processing_error "
+    "FROM submissions sub JOIN students s ON s.id = sub.student_id "
+    "WHERE sub.assignment_id = ? ORDER BY s.roll_number"
+)
+Q_MARKS = (
+    "SELECT subject, exam_type, marks, max_marks, date FROM marks "
+    "WHERE student_id = ? ORDER BY date DESC, subject"
+)
+Q_CLASS_MARKS = (
+    "SELECT student_id, marks FROM marks WHERE class_name = ? AND subject = ? AND exam_type = ?"
+)
+# Keyset pages of the announcement feed: school-wide, one department and one class
+# audience plus the reader's own posts, newest first, strictly before the (date, id) cursor.
+Q_ANNOUNCEMENT_FEED = (
+    "SELECT id, title, content, priority, date, author, is_active, audience, audience_key FROM announcements "
+    "WHERE is_active = ? AND (audience = 'school' OR (audience = 'department' AND audience_key = ?) "
+    "OR (audience = 'class' AND audience_key = ?) OR author_user_id = ?) AND (? IS NULL OR priority = ?) "
+    "AND (date, id) < (?, ?) ORDER BY date DESC, id DESC LIMIT ?"
+)
+Q_ANNOUNCEMENTS = (
+    "SELECT id, title, content, priority, date, author, is_active FROM announcements "
+    "ORDER BY date DESC, id DESC"
+)
+Q_MATERIALS_BY_CLASS = (
+    "SELECT id, title, subject, class_name AS class, type, upload_date, teacher, description, blob_digest, "
+    "file_name, file_size, link FROM study_materials WHERE class_name = ? ORDER BY upload_date DESC, id DESC"
+)
+Q_MATERIALS = (
+    "SELECT id, title, subject, class_name AS class, type, upload_date, teacher, description, blob_digest, "
+    "file_name, file_size, link FROM study_materials ORDER BY upload_date DESC, id DESC"
+)
+# Rows for the search index, newer than the highest id already indexed per kind.
+Q_SEARCH_ANNOUNCEMENTS = (
+    "SELECT id, title, content AS body, date, audience, audience_key FROM announcements WHERE id > ? ORDER BY id"
+)
+Q_SEARCH_MATERIALS = (
+    "SELECT id, title, description AS body, upload_date AS date, subject, class_name AS class "
+    "FROM study_materials WHERE id > ? ORDER BY id"
+)
+Q_SEARCH_ASSIGNMENTS = (
+    "SELECT id, title, description AS body, due_date AS date, subject, class_name AS class "
+    "FROM assignments WHERE id > ? ORDER BY id"
+)
+Q_CLASSES = "SELECT id, name, strength, class_teacher FROM classes ORDER BY id"
+Q_DEPARTMENT_BY_NAME = "SELECT id, name, hod, teachers, students FROM departments WHERE name = ?"
+Q_ALL_USERS = (
+    "SELECT u.id, COALESCE(s.first_name, t.first_name, h.first_name, a.first_name) AS first_name, "
+    "COALESCE(s.last_name, t.last_name, h.last_name, a.last_name) AS last_name, u.role, "
+    "COALESCE(s.department, t.department, h.department) AS department, u.is_active "
+    "FROM users u LEFT JOIN students s ON s.user_id = u.id LEFT JOIN teachers t ON t.user_id = u.id "
+    "LEFT JOIN hods h ON h.user_id = u.id LEFT JOIN admins a ON a.user_id = u.id ORDER BY u.id"
+)
+# Materialized dashboard counters: each row holds a value, the day it last changed and its
+# value at the start of that day, so "change today" is value - day_start when day is today.
+Q_COUNTER_TOTALS = (
+    "SELECT 'users', COUNT(*) FROM users "
+    "UNION ALL SELECT 'active_users', COUNT(*) FROM users WHERE is_active = 1 "
+    "UNION ALL SELECT 'role:' || role, COUNT(*) FROM users GROUP BY role "
+    "UNION ALL SELECT 'department:' || department, COUNT(*) FROM (SELECT department FROM students "
+    "UNION ALL SELECT department FROM teachers UNION ALL SELECT department FROM hods) "
+    "WHERE department IS NOT NULL GROUP BY department "
+    "UNION ALL SELECT 'departments', COUNT(*) FROM departments "
+    "UNION ALL SELECT 'classes', COUNT(*) FROM classes"
+)
+Q_TOTAL_COUNTER_NAMES = "SELECT name FROM counters WHERE name NOT LIKE 'logins:%'"
+Q_SET_COUNTER = (
+    "INSERT INTO counters (name, value, day, day_start) VALUES (?1, ?2, ?3, ?2) ON CONFLICT(name) DO UPDATE SET "
+    "day_start = CASE WHEN day = excluded.day THEN day_start ELSE value END, day = excluded.day, "
+    "value = excluded.value"
+)
+Q_BUMP_COUNTER = (
+    "INSERT INTO counters (name, value, day, day_start) VALUES (?1, ?2, ?3, 0) ON CONFLICT(name) DO UPDATE SET "
+    "day_start = CASE WHEN day = excluded.day THEN day_start ELSE value END, day = excluded.day, "
+    "value = value + excluded.value"
+)
+Q_COUNTERS = "SELECT name, value, day, day_start FROM counters WHERE name NOT LIKE 'logins:%' OR name IN (?, ?)"
+Q_SET_USER_STATUS = "UPDATE users SET is_active = ? WHERE id = ? AND is_active != ?"
+
+# Modules holding data derived from the backend, reset by reset_derived().
+DERIVED_MODULES = ("attendance_store", "class_stats", "timetable_grid", "search_index", "reports", "performance_cube")
+
+ROLE_LABELS = {"student": "Student", "teacher": "Teacher", "hod": "HOD", "admin": "Admin"}
+
+
+def grade_for(percentage: float) -> str:
+    """Map a percentage to the letter grade used in performance reports."""
+    if percentage >= 90:
+        return "A+"
+    if percentage >= 85:
+        return "A"
+    if percentage >= 75:
+        return "B+"
+    if percentage >= 65:
+        return "B"
+    if percentage >= 50:
+        return "C"
+    return "D"
+
+
+def split_name(full_name: str) -> tuple[str, str]:
+    """Split a display name into first and last name."""
+    parts = full_name.strip().rsplit(" ", 1)
+    return (parts[0], parts[1]) if len(parts) == 2 else (parts[0], "")
+
+
+def search_document(kind: str, row: dict) -> dict:
+    """Normalise an announcement/material/assignment row for the search index."""
+    audience, key = row.get("audience", "school"), row.get("audience_key")
+    return {
+        "kind": kind, "id": row["id"], "title": row["title"], "body": row.get("body", ""),
+        "date": row.get("date"), "subject": row.get("subject"),
+        "class": row.get("class") if kind != "announcement" else (key if audience == "class" else None),
+        "department": key if audience == "department" else None,
+    }
+
+
+def today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def login_counters() -> tuple[str, str]:
+    """Counter names of today's and yesterday's logins."""
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    return f"logins:{today()}", f"logins:{yesterday}"
+
+
+def system_stats(counters: dict) -> dict:
+    """Admin dashboard figures from counter name -> (value, change since the start of today)."""
+    logins_today, logins_yesterday = login_counters()
+    figures = {
+        "total_students": "role:student", "total_teachers": "role:teacher", "total_departments": "departments",
+        "total_classes": "classes", "total_users": "users", "active_users": "active_users",
+        "logins_today": logins_today,
+    }
+    stats = {key: counters.get(name, (0, 0))[0] for key, name in figures.items()}
+    stats["changes"] = {key: counters.get(name, (0, 0))[1] for key, name in figures.items()}
+    stats["changes"]["logins_today"] = stats["logins_today"] - counters.get(logins_yesterday, (0, 0))[0]
+    stats["by_role"] = {ROLE_LABELS.get(name[5:], name[5:]): value
+                        for name, (value, _) in sorted(counters.items()) if name.startswith("role:")}
+    stats["by_department"] = {name[11:]: value
+                              for name, (value, _) in sorted(counters.items()) if name.startswith("department:")}
+    return stats
+
+
+class MemoryBackend:
+    """Serves the MOCK_* module data; writes update the dicts for the process lifetime."""
+
+    name = "memory"
+
+    def __init__(self, data):
+        self.data = data
+        self._lock = threading.Lock()
+        self._counter_state = None  # name -> [value, day, value at the start of day]
+
+    def _counters(self) -> dict:
+        """The dashboard counters (call with the lock held); counted from the data on first use."""
+        if self._counter_state is None:
+            users = list(self.data.MOCK_USERS.values())
+            totals = {"users": len(users), "active_users": sum(bool(u["is_active"]) for u in users),
+                      "departments": len(self.data.MOCK_DEPARTMENTS), "classes": len(self.data.MOCK_CLASSES)}
+            for user in users:
+                totals[f"role:{user['role']}"] = totals.get(f"role:{user['role']}", 0) + 1
+                profiles = getattr(self.data, f"MOCK_{PROFILE_TABLES[user['role']].upper()}")
+                department = profiles.get(user["id"], {}).get("department")
+                if department is not None:
+                    totals[f"department:{department}"] = totals.get(f"department:{department}", 0) + 1
+            day = today()
+            self._counter_state = {name: [value, day, value] for name, value in totals.items()}
+        return self._counter_state
+
+    def _bump(self, changes: dict):
+        """Apply counter deltas (call with the lock held, alongside the write they describe)."""
+        counters, day = self._counters(), today()
+        for name, delta in changes.items():
+            counter = counters.setdefault(name, [0, day, 0])
+            if counter[1] != day:
+                counter[1], counter[2] = day, counter[0]
+            counter[0] += delta
+
+    def _display_name(self, user_id: int) -> str:
+        for profiles in (self.data.MOCK_TEACHERS, self.data.MOCK_HODS, self.data.MOCK_ADMINS):
+            if user_id in profiles:
+                return f"{profiles[user_id]['first_name']} {profiles[user_id]['last_name']}"
+        return "Staff"
+
+    def _next_id(self, records) -> int:
+        return max((r["id"] for r in records), default=0) + 1
+
+    # Student panel
+    def get_student_info(self, user_id: int):
+        return self.data.MOCK_STUDENTS.get(user_id)
+
+    def get_timetable(self, user_id: int):
+        return self.data.MOCK_TIMETABLE.get(user_id, [])
+
+    def get_class_timetable(self, class_name: str):
+        for student in self.get_teacher_students(None, class_name):
+            if student["user_id"] in self.data.MOCK_TIMETABLE:
+                return self.data.MOCK_TIMETABLE[student["user_id"]]
+        return []
+
+    def get_teacher_timetable(self, teacher_id: int):
+        rows, seen = [], set()
+        for user_id, timetable in self.data.MOCK_TIMETABLE.items():
+            class_name = self.data.MOCK_STUDENTS[user_id]["class"]
+            if class_name not in seen:
+                seen.add(class_name)
+                rows += [{"class_name": class_name, **row} for row in timetable if row.get("teacher_id") == teacher_id]
+        return rows
+
+    def set_class_timetable(self, class_name: str, rows: list):
+        students = self.get_teacher_students(None, class_name)
+        if not students:
+            return False
+        rows = [{c: row.get(c) for c in TIMETABLE_COLUMNS} for row in rows]
+        with self._lock:
+            for student in students:
+                self.data.MOCK_TIMETABLE[student["user_id"]] = rows
+        return True
+
+    def get_attendance(self, user_id: int):
+        return self.data.MOCK_ATTENDANCE.get(user_id, [])
+
+    def get_class_attendance(self, class_name: str):
+        return [
+            {"student_id": student["id"], **record}
+            for student in self.get_teacher_students(None, class_name)
+            for record in self.data.MOCK_ATTENDANCE.get(student["user_id"], [])
+        ]
+
+    def get_assignments(self, user_id: int):
+        return self.data.MOCK_ASSIGNMENTS.get(user_id, [])
+
+    def submit_assignment(self, user_id: int, assignment_id: int, submission_text: str, file_name: str = None,
+                          file_digest: str = None, processing_status: str = "done"):
+        with self._lock:
+            for assignment in self.data.MOCK_ASSIGNMENTS.get(user_id, []):
+                if assignment["id"] == assignment_id:
+                    assignment["is_submitted"] = True
+                    assignment["submitted_date"] = today()
+                    assignment.update({
+                        "submission_text": submission_text, "file_name": file_name, "file_digest": file_digest,
+                        "processing_status": processing_status, "processing_error": None,
+                    })
+        return True
+
+    def update_submission_processing(self, user_id: int, assignment_id: int, fields: dict, file_digest: str = None):
+        fields = {k: v for k, v in fields.items() if k in SUBMISSION_PROCESSING_FIELDS}
+        with self._lock:
+            for assignment in self.data.MOCK_ASSIGNMENTS.get(user_id, []):
+                if assignment["id"] == assignment_id and file_digest in (None, assignment.get("file_digest")):
+                    assignment.update(fields)
+        return True
+
+    def get_submission_statuses(self, assignment_id: int):
+        rows = []
+        for user_id, assignments in self.data.MOCK_ASSIGNMENTS.items():
+            student = self.data.MOCK_STUDENTS.get(user_id)
+            for a in assignments:
+                if a["id"] == assignment_id and a.get("is_submitted") and student:
+                    rows.append({
+                        "roll_number": student["roll_number"],
+                        "student": f"{student['first_name']} {student['last_name']}",
+                        "submitted_date": a.get("submitted_date"), "file_name": a.get("file_name"),
+                        "processing_status": a.get("processing_status", "done"), "file_format": a.get("file_format"),
+                        "page_count": a.get("page_count"), "word_count": a.get("word_count"),
+                        "processing_error": a.get("processing_error"),
+                    })
+        return sorted(rows, key=lambda r: r["roll_number"])
+
+    def get_performance(self, user_id: int):
+        return self.data.MOCK_PERFORMANCE.get(user_id, {})
+
+    def get_test_history(self, user_id: int):
+        tests = self.data.MOCK_PERFORMANCE.get(user_id, {}).get("recent_tests", [])
+        return sorted(({"test": t["test"], "date": t["date"],
+                        "percentage": round(100 * t["marks"] / t["max_marks"], 1) if t["max_marks"] else 0.0}
+                       for t in tests if t.get("date")), key=itemgetter("date"))
+
+    def get_announcements(self, user_id: int):
+        return self.data.MOCK_ANNOUNCEMENTS
+
+    def get_announcement_page(self, user_id: int, department: str = None, class_name: str = None,
+                              archived: bool = False, before: tuple = None, limit: int = 20, priority: str = None):
+        audiences = {("school", None), ("department", department), ("class", class_name)}
+        rows = [
+            a for a in self.data.MOCK_ANNOUNCEMENTS
+            if a.get("is_active", True) != archived
+            and ((a.get("audience", "school"), a.get("audience_key")) in audiences
+                 or a.get("author_user_id") == user_id)
+            and (priority is None or a["priority"] == priority)
+            and (before is None or (a["date"], a["id"]) < tuple(before))
+        ]
+        return sorted(rows, key=lambda a: (a["date"], a["id"]), reverse=True)[:limit]
+
+    def get_study_materials(self, user_id: int):
+        return self.data.MOCK_STUDY_MATERIALS
+
+    def get_class_materials(self, class_name: str):
+        return [m for m in self.data.MOCK_STUDY_MATERIALS if m.get("class") == class_name]
+
+    def get_search_documents(self, after: dict):
+        for row in self.data.MOCK_ANNOUNCEMENTS:
+            if row["id"] > after["announcement"]:
+                yield search_document("announcement", {**row, "body": row["content"]})
+        for row in self.data.MOCK_STUDY_MATERIALS:
+            if row["id"] > after["material"]:
+                yield search_document("material", {**row, "body": row["description"], "date": row["upload_date"]})
+        assignments = {a["id"]: a for rows in self.data.MOCK_ASSIGNMENTS.values() for a in rows}
+        for row in assignments.values():
+            if row["id"] > after["assignment"]:
+                yield search_document("assignment", {**row, "body": row["description"], "date": row["due_date"]})
+
+    # Teacher panel
+    def get_teacher_info(self, user_id: int):
+        return self.data.MOCK_TEACHERS.get(user_id)
+
+    def get_teacher_classes(self, user_id: int):
+        return self.data.MOCK_CLASSES
+
+    def get_teacher_students(self, user_id: int, class_name: str = None):
+        students = list(self.data.MOCK_STUDENTS.values())
+        if class_name is not None:
+            students = [s for s in students if s.get("class") == class_name]
+        return students
+
+    def get_class_marks(self, class_name: str, subject: str, exam_type: str):
+        test = f"{subject} {exam_type}"
+        marks = {}
+        for student in self.get_teacher_students(None, class_name):
+            for row in self.data.MOCK_PERFORMANCE.get(student["user_id"], {}).get("recent_tests", []):
+                if row["test"] == test:
+                    marks[student["id"]] = row["marks"]
+        return marks
+
+    def get_teacher_assignments(self, user_id: int):
+        return self.data.MOCK_ASSIGNMENTS.get(1, [])
+
+    def get_teacher_announcements(self, user_id: int):
+        return self.data.MOCK_ANNOUNCEMENTS
+
+    def create_assignment(self, user_id: int, title: str, description: str, due_date: str, subject: str,
+                          class_name: str, max_marks: int = 100):
+        with self._lock:
+            existing = [a for rows in self.data.MOCK_ASSIGNMENTS.values() for a in rows]
+            assignment_id = self._next_id(existing)
+            for student in self.get_teacher_students(user_id, class_name):
+                self.data.MOCK_ASSIGNMENTS.setdefault(student["user_id"], []).append({
+                    "id": assignment_id,
+                    "title": title,
+                    "description": description,
+                    "subject": subject,
+                    "due_date": due_date,
+                    "max_marks": max_marks,
+                    "is_submitted": False,
+                    "submitted_date": None,
+                    "marks_obtained": None,
+                    "teacher": self._display_name(user_id),
+                })
+        return True
+
+    def mark_attendance(self, user_id: int, class_name: str, date: str, attendance_data: dict, subject: str = None):
+        subject = subject or (self.get_teacher_info(user_id) or {}).get("department", "General")
+        by_id = {s["id"]: s for s in self.data.MOCK_STUDENTS.values()}
+        with self._lock:
+            for student_id, status in attendance_data.items():
+                student = by_id.get(student_id)
+                if student is None:
+                    continue
+                records = self.data.MOCK_ATTENDANCE.setdefault(student["user_id"], [])
+                records[:] = [r for r in records if (r["date"], r["subject"]) != (date, subject)]
+                records.append({"date": date, "subject": subject, "status": status})
+        return True
+
+    def enter_marks(self, user_id: int, class_name: str, subject: str, exam_type: str, marks_data: dict,
+                    max_marks: int = 100):
+        by_id = {s["id"]: s for s in self.data.MOCK_STUDENTS.values()}
+        test = f"{subject} {exam_type}"
+        with self._lock:
+            for student_id, marks in marks_data.items():
+                student = by_id.get(student_id)
+                if student is None:
+                    continue
+                performance = self.data.MOCK_PERFORMANCE.setdefault(
+                    student["user_id"], {"overall_percentage": 0, "subjects": [], "recent_tests": []}
+                )
+                tests = [t for t in performance["recent_tests"] if t["test"] != test]
+                tests.insert(0, {"test": test, "marks": marks, "max_marks": max_marks, "date": today()})
+                performance["recent_tests"] = tests
+        return True
+
+    def create_announcement(self, user_id: int, title: str, content: str, priority: str,
+                            audience: str = "school", audience_key: str = None):
+        with self._lock:
+            self.data.MOCK_ANNOUNCEMENTS.insert(0, {
+                "id": self._next_id(self.data.MOCK_ANNOUNCEMENTS),
+                "title": title,
+                "content": content,
+                "priority": priority,
+                "date": today(),
+                "author": self._display_name(user_id),
+                "author_user_id": user_id,
+                "audience": audience,
+                "audience_key": audience_key,
+            })
+        return True
+
+    def upload_study_material(self, user_id: int, title: str, subject: str, class_name: str, description: str,
+                              material_type: str = "PDF", blob_digest: str = None, file_name: str = None,
+                              file_size: int = None, link: str = None):
+        with self._lock:
+            self.data.MOCK_STUDY_MATERIALS.insert(0, {
+                "id": self._next_id(self.data.MOCK_STUDY_MATERIALS),
+                "title": title,
+                "subject": subject,
+                "class": class_name,
+                "type": material_type,
+                "upload_date": today(),
+                "teacher": self._display_name(user_id),
+                "description": description,
+                "blob_digest": blob_digest,
+                "file_name": file_name,
+                "file_size": file_size,
+                "link": link,
+            })
+        return True
+
+    # HOD panel
+    def get_hod_info(self, user_id: int):
+        return self.data.MOCK_HODS.get(user_id)
+
+    def get_department_info(self, user_id: int):
+        return self.data.MOCK_DEPARTMENTS[0]
+
+    def get_department_teachers(self, user_id: int):
+        return [self.data.MOCK_TEACHERS[2]]
+
+    def get_department_students(self, user_id: int):
+        return [self.data.MOCK_STUDENTS[1]]
+
+    # Admin panel
+    def get_admin_info(self, user_id: int):
+        return self.data.MOCK_ADMINS.get(user_id)
+
+    def get_system_stats(self):
+        day = today()
+        with self._lock:
+            counters = {name: (value, value - start if changed == day else 0)
+                        for name, (value, changed, start) in self._counters().items()}
+        return system_stats(counters)
+
+    def set_user_status(self, user_id: int, active: bool):
+        with self._lock:
+            user = self.data.MOCK_USERS.get(user_id)
+            if user is None:
+                return False
+            if bool(user["is_active"]) != active:
+                user["is_active"] = active
+                self._bump({"active_users": 1 if active else -1})
+        return True
+
+    def record_login(self, user_id: int):
+        with self._lock:
+            self._bump({login_counters()[0]: 1})
+
+    # Credentials
+    def get_credentials(self, email: str):
+        for user in self.data.MOCK_USERS.values():
+            if user["email"] == email:
+                return {key: user.get(key) for key in ("id", "role", "is_active", "password_hash")}
+        return None
+
+    def get_password_hash(self, user_id: int):
+        return self.data.MOCK_USERS.get(user_id, {}).get("password_hash")
+
+    def set_password_hash(self, user_id: int, password_hash: str):
+        with self._lock:
+            user = self.data.MOCK_USERS.get(user_id)
+            if user is None:
+                return False
+            user["password_hash"] = password_hash
+        return True
+
+    def get_all_users(self):
+        users = []
+        for user in self.data.MOCK_USERS.values():
+            profiles = getattr(self.data, f"MOCK_{PROFILE_TABLES[user['role']].upper()}")
+            profile = profiles.get(user["id"], {})
+            users.append({
+                "id": user["id"],
+                "name": f"{profile.get('first_name', '')} {profile.get('last_name', '')}".strip(),
+                "role": ROLE_LABELS[user["role"]],
+                "department": profile.get("department", "-"),
+                "status": "Active" if user["is_active"] else "Inactive",
+            })
+        return users
+
+    # Reports
+    def iter_report_rows(self, kind: str, start: str, end: str, department: str = None):
+        for user_id, student in list(self.data.MOCK_STUDENTS.items()):
+            if department is not None and student.get("department") != department:
+                continue
+            if kind == "attendance":
+                for r in self.data.MOCK_ATTENDANCE.get(user_id, []):
+                    if start <= r["date"] <= end:
+                        yield student["class"], student.get("department"), r["subject"], r["date"], r["status"]
+            else:
+                for r in self.data.MOCK_PERFORMANCE.get(user_id, {}).get("recent_tests", []):
+                    if r.get("date") and start <= r["date"] <= end:
+                        subject, _, exam_type = r["test"].partition(" ")
+                        yield (student["class"], student.get("department"), subject, exam_type, r["marks"],
+                               r["max_marks"], r["date"])
+
+    def count_report_rows(self, kind: str, start: str, end: str, department: str = None) -> int:
+        return sum(1 for _ in self.iter_report_rows(kind, start, end, department))
+
+    def get_rollup_rows(self, kind: str, class_name: str, subject: str, key: str):
+        rows = []
+        for student in self.get_teacher_students(None, class_name):
+            if kind == "attendance":
+                rows += [(student["class"], student.get("department"), r["subject"], r["date"], r["status"])
+                         for r in self.data.MOCK_ATTENDANCE.get(student["user_id"], [])
+                         if (r["subject"], r["date"]) == (subject, key)]
+            else:
+                rows += [(student["class"], student.get("department"), subject, key, r["marks"], r["max_marks"],
+                          r["date"])
+                         for r in self.data.MOCK_PERFORMANCE.get(student["user_id"], {}).get("recent_tests", [])
+                         if r["test"] == f"{subject} {key}" and r.get("date")]
+        return rows
+
+    # Backup and restore: each MOCK_* dict or list is one table of [key, value] rows
+    def backup_tables(self):
+        return sorted(name for name in vars(self.data)
+                      if name.startswith("MOCK_") and isinstance(getattr(self.data, name), (dict, list)))
+
+    def dump_table(self, table: str, order_by: str = None):
+        value = getattr(self.data, table)
+        items = value.items() if isinstance(value, dict) else enumerate(value)
+        return ["key", "value"], ([key, item] for key, item in list(items))
+
+    def restore_tables(self, tables) -> int:
+        """Replace tables from (table, columns, rows, date_column, date_range) entries, all or none."""
+        replaced, count = {}, 0
+        for table, columns, rows, date_column, date_range in tables:
+            if date_column is not None:
+                continue  # demo data is not partitioned by term
+            rows = list(rows)
+            restored = {key: value for key, value in rows}
+            if isinstance(getattr(self.data, table, None), list):
+                restored = [restored[key] for key in sorted(restored)]
+            replaced[table] = restored
+            count += len(rows)
+        with self._lock:
+            for table, restored in replaced.items():
+                setattr(self.data, table, restored)
+            self._counter_state = None
+        return count
+
+    def update_profile(self, user_id: int, fields: dict):
+        user = self.data.MOCK_USERS.get(user_id)
+        if user is None:
+            return False
+        table = PROFILE_TABLES[user["role"]]
+        fields = {("class" if c == "class_name" else c): v for c, v in fields.items() if c in PROFILE_COLUMNS[table]}
+        with self._lock:
+            profile = getattr(self.data, f"MOCK_{table.upper()}").get(user_id)
+            if profile is None:
+                return False
+            profile.update(fields)
+        return True
+
+    def create_user(self, user_data: dict):
+        role = user_data["user_type"].lower()
+        first_name, last_name = split_name(user_data["full_name"])
+        with self._lock:
+            if any(u["email"] == user_data["email"] for u in self.data.MOCK_USERS.values()):
+                return False
+            user_id = max(self.data.MOCK_USERS, default=0) + 1
+            self.data.MOCK_USERS[user_id] = {"id": user_id, "role": role, "email": user_data["email"], "is_active": True,
+                                             "password_hash": user_data.get("password_hash")}
+            profiles = getattr(self.data, f"MOCK_{PROFILE_TABLES[role].upper()}")
+            profile = {("class" if c == "class_name" else c): None for c in PROFILE_COLUMNS[PROFILE_TABLES[role]]}
+            profile.update({"id": user_id, "user_id": user_id, "first_name": first_name, "last_name": last_name})
+            if "department" in profile:
+                profile["department"] = user_data.get("department")
+            profiles[user_id] = profile
+            changes = {"users": 1, "active_users": 1, f"role:{role}": 1}
+            if profile.get("department") is not None:
+                changes[f"department:{profile['department']}"] = 1
+            self._bump(changes)
+        return True
+
+
+class SQLiteBackend:
+    """Embedded SQLite store with indexed lookups and a bounded connection pool."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, pool_size: int = 8):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            # Databases created before the counters existed are counted once here
+            if (conn.execute("SELECT 1 FROM counters LIMIT 1").fetchone() is None
+                    and conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is not None):
+                with conn:
+                    self._rebuild_counters(conn)
+
+    @staticmethod
+    def _rebuild_counters(conn: sqlite3.Connection):
+        """Recount the totals (after bulk loads and restores); today's changes are kept."""
+        totals = dict(conn.execute(Q_COUNTER_TOTALS).fetchall())
+        for (name,) in conn.execute(Q_TOTAL_COUNTER_NAMES).fetchall():
+            totals.setdefault(name, 0)
+        day = today()
+        conn.executemany(Q_SET_COUNTER, [(name, value, day) for name, value in totals.items()])
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, changes: dict):
+        """Apply counter deltas inside the caller's transaction."""
+        day = today()
+        conn.executemany(Q_BUMP_COUNTER, [(name, delta, day) for name, delta in changes.items()])
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        for table, columns in MIGRATIONS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, definition in columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        for sql in MIGRATION_INDEXES:
+            conn.execute(sql)
+        conn.commit()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out of the pool, opening one if the pool is not full yet."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.pool_size
+                if can_open:
+                    self._opened += 1
+            conn = self._open() if can_open else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Run several writes atomically on one pooled connection."""
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    @contextmanager
+    def bulk_load(self):
+        """One transaction for large imports: secondary indexes are rebuilt once at the end."""
+        with self.transaction() as conn:
+            indexes = conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+            ).fetchall()
+            for name, _ in indexes:
+                conn.execute(f"DROP INDEX {name}")
+            conn.execute("PRAGMA cache_size=-262144")
+            try:
+                yield conn
+            finally:
+                for _, sql in indexes:
+                    conn.execute(sql)
+                conn.execute("PRAGMA cache_size=-2000")
+                self._rebuild_counters(conn)
+
+    def close(self):
+        while self._opened:
+            self._pool.get().close()
+            self._opened -= 1
+
+    def _all(self, sql: str, params=()) -> list[dict]:
+        with self.connection() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def _one(self, sql: str, params=()):
+        with self.connection() as conn:
+            row = conn.execute(sql, params).fetchone()
+        return dict(row) if row is not None else None
+
+    def is_empty(self) -> bool:
+        with self.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+
+    def bulk_insert(self, table: str, rows, conn: sqlite3.Connection = None, rename: dict = None) -> int:
+        """Insert an iterable of dicts sharing the same keys with a single executemany.
+
+        rename maps record keys to column names (e.g. {"class": "class_name"}).
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+        keys = list(first)
+        columns = [rename.get(k, k) for k in keys] if rename else keys
+        sql = f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        getter = itemgetter(*keys) if len(keys) > 1 else (lambda row: (row[keys[0]],))
+        values = map(getter, chain([first], rows))
+        if conn is not None:
+            return conn.executemany(sql, values).rowcount
+        with self.transaction() as conn:
+            return conn.executemany(sql, values).rowcount
+
+    def load_from_mock(self, data):
+        """Seed an empty database with the MOCK_* records."""
+        with self.transaction() as conn:
+            self.bulk_insert("users", (dict(u) for u in data.MOCK_USERS.values()), conn)
+            for role, table in PROFILE_TABLES.items():
+                profiles = getattr(data, f"MOCK_{table.upper()}")
+                self.bulk_insert(table, (
+                    {"id": p["id"], "user_id": p["user_id"],
+                     **{c: p.get("class" if c == "class_name" else c) for c in PROFILE_COLUMNS[table]}}
+                    for p in profiles.values()
+                ), conn)
+            self.bulk_insert("departments", (dict(d) for d in data.MOCK_DEPARTMENTS), conn)
+            self.bulk_insert("classes", (dict(c) for c in data.MOCK_CLASSES), conn)
+            for user_id, rows in data.MOCK_TIMETABLE.items():
+                student = data.MOCK_STUDENTS[user_id]
+                self.bulk_insert("timetable", ({"class_name": student["class"], **row} for row in rows), conn)
+            for user_id, rows in data.MOCK_ATTENDANCE.items():
+                student = data.MOCK_STUDENTS[user_id]
+                self.bulk_insert("attendance", (
+                    {"student_id": student["id"], "class_name": student["class"], **row} for row in rows
+                ), conn)
+            teacher_id = next(iter(data.MOCK_TEACHERS), None)
+            for user_id, rows in data.MOCK_ASSIGNMENTS.items():
+                student = data.MOCK_STUDENTS[user_id]
+                for row in rows:
+                    self.bulk_insert("assignments", [{
+                        "id": row["id"], "title": row["title"], "description": row["description"],
+                        "subject": row["subject"], "class_name": student["class"], "due_date": row["due_date"],
+                        "max_marks": row["max_marks"], "teacher": row["teacher"], "created_by": teacher_id,
+                    }], conn)
+                    if row["is_submitted"]:
+                        self.bulk_insert("submissions", [{
+                            "assignment_id": row["id"], "student_id": student["id"],
+                            "submitted_date": row["submitted_date"], "marks_obtained": row["marks_obtained"],
+                        }], conn)
+            for user_id, performance in data.MOCK_PERFORMANCE.items():
+                student = data.MOCK_STUDENTS[user_id]
+                self.bulk_insert("marks", (
+                    {"student_id": student["id"], "class_name": student["class"], "subject": s["subject"],
+                     "exam_type": "Term Average", "marks": s["percentage"], "max_marks": 100, "date": None}
+                    for s in performance.get("subjects", [])
+                ), conn)
+                self.bulk_insert("marks", (
+                    {"student_id": student["id"], "class_name": student["class"],
+                     "subject": t["test"].split(" ", 1)[0], "exam_type": t["test"].split(" ", 1)[-1],
+                     "marks": t["marks"], "max_marks": t["max_marks"], "date": t["date"]}
+                    for t in performance.get("recent_tests", [])
+                ), conn)
+            self.bulk_insert("announcements", (dict(a) for a in data.MOCK_ANNOUNCEMENTS), conn)
+            self.bulk_insert("study_materials", (
+                {("class_name" if k == "class" else k): v for k, v in m.items()} for m in data.MOCK_STUDY_MATERIALS
+            ), conn)
+            self._rebuild_counters(conn)
+
+    def _student(self, user_id: int):
+        return self._one(Q_STUDENT_BY_USER, (user_id,))
+
+    def _display_name(self, user_id: int) -> str:
+        for sql in (Q_TEACHER_BY_USER, Q_HOD_BY_USER, Q_ADMIN_BY_USER):
+            row = self._one(sql, (user_id,))
+            if row:
+                return f"{row['first_name']} {row['last_name']}"
+        return "Staff"
+
+    # Student panel
+    def get_student_info(self, user_id: int):
+        return self._student(user_id)
+
+    def get_timetable(self, user_id: int):
+        return self._all(Q_TIMETABLE, (user_id,))
+
+    def get_class_timetable(self, class_name: str):
+        return self._all(Q_CLASS_TIMETABLE, (class_name,))
+
+    def get_teacher_timetable(self, teacher_id: int):
+        return self._all(Q_TEACHER_TIMETABLE, (teacher_id,))
+
+    def set_class_timetable(self, class_name: str, rows: list):
+        """Replace a class's weekly timetable in one transaction."""
+        with self.transaction() as conn:
+            conn.execute(Q_DELETE_CLASS_TIMETABLE, (class_name,))
+            conn.executemany(Q_INSERT_TIMETABLE, [(class_name, *(row.get(c) for c in TIMETABLE_COLUMNS))
+                                                  for row in rows])
+        return True
+
+    def get_attendance(self, user_id: int):
+        return self._all(Q_ATTENDANCE, (user_id,))
+
+    def get_class_attendance(self, class_name: str):
+        return self._all(Q_CLASS_ATTENDANCE, (class_name,))
+
+    def get_assignments(self, user_id: int):
+        rows = self._all(Q_ASSIGNMENTS, (user_id,))
+        for row in rows:
+            row["is_submitted"] = bool(row["is_submitted"])
+        return rows
+
+    def submit_assignment(self, user_id: int, assignment_id: int, submission_text: str, file_name: str = None,
+                          file_digest: str = None, processing_status: str = "done"):
+        student = self._student(user_id)
+        if student is None:
+            return False
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO submissions (assignment_id, student_id, submitted_date, submission_text, "
+                "file_name, file_digest, processing_status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (assignment_id, student["id"], today(), submission_text, file_name, file_digest, processing_status),
+            )
+        return True
+
+    def update_submission_processing(self, user_id: int, assignment_id: int, fields: dict, file_digest: str = None):
+        """Record processing results; with file_digest, only while the submission still holds that file."""
+        student = self._student(user_id)
+        fields = {k: v for k, v in fields.items() if k in SUBMISSION_PROCESSING_FIELDS}
+        if student is None or not fields:
+            return False
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self.transaction() as conn:
+            conn.execute(
+                f"UPDATE submissions SET {assignments} WHERE assignment_id = ? AND student_id = ? "
+                "AND (? IS NULL OR file_digest = ?)",
+                (*fields.values(), assignment_id, student["id"], file_digest, file_digest),
+            )
+        return True
+
+    def get_submission_statuses(self, assignment_id: int):
+        return self._all(Q_SUBMISSION_STATUSES, (assignment_id,))
+
+    def get_performance(self, user_id: int):
+        student = self._student(user_id)
+        if student is None:
+            return {}
+        rows = self._all(Q_MARKS, (student["id"],))
+        if not rows:
+            return {}
+        totals = {}
+        for row in rows:
+            obtained, possible = totals.get(row["subject"], (0.0, 0.0))
+            totals[row["subject"]] = (obtained + row["marks"], possible + row["max_marks"])
+        subjects = []
+        for subject, (obtained, possible) in totals.items():
+            percentage = round(100 * obtained / possible, 1) if possible else 0.0
+            subjects.append({"subject": subject, "percentage": percentage, "grade": grade_for(percentage)})
+        overall = round(sum(s["percentage"] for s in subjects) / len(subjects), 1)
+        recent_tests = [
+            {"test": f"{r['subject']} {r['exam_type']}", "marks": r["marks"], "max_marks": r["max_marks"],
+             "date": r["date"]}
+            for r in rows if r["date"]
+        ][:3]
+        return {"overall_percentage": overall, "subjects": subjects, "recent_tests": recent_tests}
+
+    def get_test_history(self, user_id: int):
+        """Every dated test of a student, oldest first, as percentages."""
+        student = self._student(user_id)
+        if student is None:
+            return []
+        return [
+            {"test": f"{r['subject']} {r['exam_type']}", "date": r["date"],
+             "percentage": round(100 * r["marks"] / r["max_marks"], 1) if r["max_marks"] else 0.0}
+            for r in reversed(self._all(Q_MARKS, (student["id"],))) if r["date"]
+        ]
+
+    def get_announcements(self, user_id: int):
+        rows = self._all(Q_ANNOUNCEMENTS)
+        for row in rows:
+            row["is_active"] = bool(row["is_active"])
+        return rows
+
+    def get_announcement_page(self, user_id: int, department: str = None, class_name: str = None,
+                              archived: bool = False, before: tuple = None, limit: int = 20, priority: str = None):
+        before_date, before_id = before or (MAX_DATE, MAX_ID)
+        rows = self._all(Q_ANNOUNCEMENT_FEED, (int(not archived), department, class_name, user_id, priority,
+                                               priority, before_date, before_id, limit))
+        for row in rows:
+            row["is_active"] = bool(row["is_active"])
+        return rows
+
+    def get_search_documents(self, after: dict):
+        for kind, sql in (("announcement", Q_SEARCH_ANNOUNCEMENTS), ("material", Q_SEARCH_MATERIALS),
+                          ("assignment", Q_SEARCH_ASSIGNMENTS)):
+            with self.connection() as conn:
+                rows = conn.execute(sql, (after[kind],)).fetchall()
+            for row in rows:
+                yield search_document(kind, dict(row))
+
+    def get_study_materials(self, user_id: int):
+        student = self._student(user_id)
+        if student is None:
+            return self._all(Q_MATERIALS)
+        return self._all(Q_MATERIALS_BY_CLASS, (student["class"],))
+
+    def get_class_materials(self, class_name: str):
+        return self._all(Q_MATERIALS_BY_CLASS, (class_name,))
+
+    # Teacher panel
+    def get_teacher_info(self, user_id: int):
+        return self._one(Q_TEACHER_BY_USER, (user_id,))
+
+    def get_teacher_classes(self, user_id: int):
+        return self._all(Q_CLASSES)
+
+    def get_teacher_students(self, user_id: int, class_name: str = None):
+        if class_name is None:
+            return self._all(Q_STUDENTS)
+        return self._all(Q_STUDENTS_BY_CLASS, (class_name,))
+
+    def get_class_marks(self, class_name: str, subject: str, exam_type: str):
+        with self.connection() as conn:
+            return dict(conn.execute(Q_CLASS_MARKS, (class_name, subject, exam_type)).fetchall())
+
+    def get_teacher_assignments(self, user_id: int):
+        rows = self._all(Q_TEACHER_ASSIGNMENTS, (user_id,))
+        for row in rows:
+            row["is_submitted"] = bool(row["is_submitted"])
+        return rows
+
+    def get_teacher_announcements(self, user_id: int):
+        return self.get_announcements(user_id)
+
+    def create_assignment(self, user_id: int, title: str, description: str, due_date: str, subject: str,
+                          class_name: str, max_marks: int = 100):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO assignments (title, description, subject, class_name, due_date, max_marks, teacher, "
+                "created_by) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (title, description, subject, class_name, due_date, max_marks, self._display_name(user_id), user_id),
+            )
+        return True
+
+    def mark_attendance(self, user_id: int, class_name: str, date: str, attendance_data: dict, subject: str = None):
+        subject = subject or (self.get_teacher_info(user_id) or {}).get("department", "General")
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO attendance (student_id, date, subject, status, class_name, marked_by) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(student_id, date, subject, status, class_name, user_id)
+                 for student_id, status in attendance_data.items()],
+            )
+        return True
+
+    def enter_marks(self, user_id: int, class_name: str, subject: str, exam_type: str, marks_data: dict,
+                    max_marks: int = 100):
+        date = today()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO marks (student_id, class_name, subject, exam_type, marks, max_marks, date, "
+                "entered_by) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(student_id, class_name, subject, exam_type, marks, max_marks, date, user_id)
+                 for student_id, marks in marks_data.items()],
+            )
+        return True
+
+    def create_announcement(self, user_id: int, title: str, content: str, priority: str,
+                            audience: str = "school", audience_key: str = None):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO announcements (title, content, priority, date, author, author_user_id, audience, "
+                "audience_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (title, content, priority, today(), self._display_name(user_id), user_id, audience, audience_key),
+            )
+        return True
+
+    def upload_study_material(self, user_id: int, title: str, subject: str, class_name: str, description: str,
+                              material_type: str = "PDF", blob_digest: str = None, file_name: str = None,
+                              file_size: int = None, link: str = None):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO study_materials (title, subject, class_name, type, upload_date, teacher, description, "
+                "uploaded_by, blob_digest, file_name, file_size, link) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (title, subject, class_name, material_type, today(), self._display_name(user_id), description,
+                 user_id, blob_digest, file_name, file_size, link),
+            )
+        return True
+
+    # HOD panel
+    def get_hod_info(self, user_id: int):
+        return self._one(Q_HOD_BY_USER, (user_id,))
+
+    def get_department_info(self, user_id: int):
+        hod = self.get_hod_info(user_id)
+        return self._one(Q_DEPARTMENT_BY_NAME, (hod["department"],)) if hod else None
+
+    def get_department_teachers(self, user_id: int):
+        hod = self.get_hod_info(user_id)
+        return self._all(Q_TEACHERS_BY_DEPARTMENT, (hod["department"],)) if hod else []
+
+    def get_department_students(self, user_id: int):
+        hod = self.get_hod_info(user_id)
+        return self._all(Q_STUDENTS_BY_DEPARTMENT, (hod["department"],)) if hod else []
+
+    # Admin panel
+    def get_admin_info(self, user_id: int):
+        return self._one(Q_ADMIN_BY_USER, (user_id,))
+
+    def get_system_stats(self):
+        day = today()
+        with self.connection() as conn:
+            rows = conn.execute(Q_COUNTERS, login_counters()).fetchall()
+        return system_stats({name: (value, value - start if changed == day else 0)
+                             for name, value, changed, start in rows})
+
+    def set_user_status(self, user_id: int, active: bool):
+        with self.transaction() as conn:
+            if conn.execute(Q_SET_USER_STATUS, (int(active), user_id, int(active))).rowcount:
+                self._bump(conn, {"active_users": 1 if active else -1})
+                return True
+            return conn.execute(Q_USER_ROLE, (user_id,)).fetchone() is not None
+
+    def record_login(self, user_id: int):
+        with self.transaction() as conn:
+            self._bump(conn, {login_counters()[0]: 1})
+
+    # Credentials
+    def get_credentials(self, email: str):
+        return self._one(Q_CREDENTIALS, (email,))
+
+    def get_password_hash(self, user_id: int):
+        row = self._one(Q_PASSWORD_HASH, (user_id,))
+        return row["password_hash"] if row else None
+
+    def set_password_hash(self, user_id: int, password_hash: str):
+        with self.transaction() as conn:
+            return conn.execute(Q_SET_PASSWORD_HASH, (password_hash, user_id)).rowcount > 0
+
+    def get_all_users(self):
+        return [
+            {
+                "id": row["id"],
+                "name": f"{row['first_name'] or ''} {row['last_name'] or ''}".strip(),
+                "role": ROLE_LABELS.get(row["role"], row["role"]),
+                "department": row["department"] or "-",
+                "status": "Active" if row["is_active"] else "Inactive",
+            }
+            for row in self._all(Q_ALL_USERS)
+        ]
+
+    # Reports
+    def iter_report_rows(self, kind: str, start: str, end: str, department: str = None):
+        """Stream report rows as tuples straight off the cursor."""
+        with self.connection() as conn:
+            yield from conn.execute(Q_REPORT_ROWS[kind], (start, end, department, department))
+
+    def count_report_rows(self, kind: str, start: str, end: str, department: str = None) -> int:
+        with self.connection() as conn:
+            return conn.execute(Q_REPORT_COUNTS[kind], (start, end, department, department)).fetchone()[0]
+
+    def get_rollup_rows(self, kind: str, class_name: str, subject: str, key: str):
+        """Report-shaped rows of one class, subject and date (attendance) or exam (marks)."""
+        with self.connection() as conn:
+            return conn.execute(Q_ROLLUP_ROWS[kind], (class_name, subject, key)).fetchall()
+
+    # Backup and restore
+    def backup_tables(self):
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute(Q_TABLE_NAMES)]
+
+    def dump_table(self, table: str, order_by: str = None):
+        """Column names and a lazy row iterator (ordered by order_by, then rowid)."""
+        with self.connection() as conn:
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        order = f"{order_by}, rowid" if order_by in columns else "rowid"
+
+        def rows():
+            with self.connection() as conn:
+                for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {order}"):
+                    yield list(row)
+
+        return columns, rows()
+
+    def restore_tables(self, tables) -> int:
+        """Replace tables from (table, columns, rows, date_column, date_range) entries in one transaction.
+
+        Each table loses all its rows, or only those in date_range (undated ones when date_range is None).
+        Foreign keys are checked at commit, so parents and children can be replaced in any order; a
+        violation or an error raised by a rows iterator rolls every table back.
+        """
+        restored = 0
+        with self.transaction() as conn:
+            conn.execute("BEGIN")
+            conn.execute("PRAGMA defer_foreign_keys=ON")
+            for table, columns, rows, date_column, date_range in tables:
+                if date_column is None:
+                    where, params = "", ()
+                elif date_range is None:
+                    where, params = f" WHERE {date_column} IS NULL", ()
+                else:
+                    where, params = f" WHERE {date_column} >= ? AND {date_column} < ?", tuple(date_range)
+                conn.execute(f"DELETE FROM {table}{where}", params)
+                restored += conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    rows,
+                ).rowcount
+            self._rebuild_counters(conn)
+        return restored
+
+    def update_profile(self, user_id: int, fields: dict):
+        user = self._one(Q_USER_ROLE, (user_id,))
+        if user is None:
+            return False
+        table = PROFILE_TABLES[user["role"]]
+        fields = {c: v for c, v in fields.items() if c in PROFILE_COLUMNS[table]}
+        if not fields:
+            return False
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self.transaction() as conn:
+            conn.execute(f"UPDATE {table} SET {assignments} WHERE user_id = ?", (*fields.values(), user_id))
+        return True
+
+    def create_user(self, user_data: dict):
+        role = user_data["user_type"].lower()
+        table = PROFILE_TABLES[role]
+        first_name, last_name = split_name(user_data["full_name"])
+        profile = {"first_name": first_name, "last_name": last_name}
+        if "department" in PROFILE_COLUMNS[table]:
+            profile["department"] = user_data.get("department")
+        try:
+            with self.transaction() as conn:
+                user_id = conn.execute(
+                    "INSERT INTO users (role, email, is_active, password_hash) VALUES (?, ?, 1, ?)",
+                    (role, user_data["email"], user_data.get("password_hash")),
+                ).lastrowid
+                columns = ["user_id", *profile]
+                conn.execute(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    (user_id, *profile.values()),
+                )
+                changes = {"users": 1, "active_users": 1, f"role:{role}": 1}
+                if profile.get("department") is not None:
+                    changes[f"department:{profile['department']}"] = 1
+                self._bump(conn, changes)
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str = None, path: str = None):
+    """Build a backend by name; a new SQLite database is seeded from the mock data."""
+    import mock_data
+
+    name = name or DEFAULT_BACKEND
+    if name == "memory":
+        return MemoryBackend(mock_data)
+    if name == "sqlite":
+        backend = SQLiteBackend(path or DEFAULT_DB_PATH)
+        if backend.is_empty():
+            backend.load_from_mock(mock_data)
+        return backend
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+def get_backend():
+    """Return the process-wide backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def reset_derived():
+    """Drop caches and indexes derived from backend data (after a backend swap or restore)."""
+    cache.clear()
+    # Only modules already loaded hold derived state; importing the rest here would pull in numpy/pandas.
+    for name in DERIVED_MODULES:
+        module = sys.modules.get(name)
+        if module is not None:
+            module.reset()
+
+
+def set_backend(backend):
+    """Swap the process-wide backend (used by demos, tests and benchmarks)."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    reset_derived()
+    if previous is not None and hasattr(previous, "close") and previous is not backend:
+        previous.close()
+    return backend
@@ -1,8 +1,11 @@
 import streamlit as st
+import charts
+import metrics
 import pandas as pd
 from datetime import datetime, timedelta
 # Import mock data functions
-from mock_data import get_student_info, get_timetable, get_attendance, get_assignments, submit_assignment, get_performance, get_announcements, get_study_materials, update_password
+from mock_data import get_student_info, get_class_timetable, get_attendance, get_attendance_summary, get_assignments, submit_assignment, get_performance, get_student_trend_chart, get_announcement_feed, get_study_materials, update_password, get_profile_image
+from panel_pages import show_material_file, show_search
 
 def show_dashboard(user_id: int):
     student = get_student_info(user_id)
@@ -12,6 +15,13 @@ def show_dashboard(user_id: int):
     
     st.title(f"Welcome, {student['first_name']} {student['last_name']}!")
     st.write(f"Class: {student['class']} | Roll Number: {student['roll_number']}")
+    
+    # Current and next period from the class timetable grid
+    current, upcoming = get_class_timetable(student['class']).now_and_next()
+    if current or upcoming:
+        now_text = f"Now: {current['subject']} ({current['time']}, Room {current['room']})" if current else "Now: Free"
+        next_text = f"Next: {upcoming['subject']} at {upcoming['time'].split('-')[0]}" if upcoming else "No more classes today"
+        st.caption(f"{now_text} | {next_text}")
 
     
     # Quick summary metrics
@@ -33,39 +43,15 @@ def show_dashboard(user_id: int):
 def show_timetable(user_id: int):
     st.title("Class Timetable")
     
-    # Get student's class timetable from mock data
-    result = get_timetable(user_id)
+    # Compiled once per class and shared by every student in it
+    student = get_student_info(user_id)
+    grid = get_class_timetable(student['class']) if student else None
     
-    if not result:
+    if not grid:
         st.warning("No timetable available")
         return
     
-    # Process timetable data for display
-    timetable_data = {"Time": [], "Monday": [], "Tuesday": [], 
-                     "Wednesday": [], "Thursday": [], "Friday": []}
-    
-    # Group by time slots
-    time_slots = {}
-    for row in result:
-        time_key = row['time']
-        day = row['day']
-        subject = row['subject']
-        
-        if time_key not in time_slots:
-            time_slots[time_key] = {'Monday': '-', 'Tuesday': '-', 'Wednesday': '-', 'Thursday': '-', 'Friday': '-'}
-        
-        time_slots[time_key][day] = subject
-    
-    # Convert to display format
-    for time_slot, subjects in time_slots.items():
-        timetable_data["Time"].append(time_slot)
-        timetable_data["Monday"].append(subjects['Monday'])
-        timetable_data["Tuesday"].append(subjects['Tuesday'])
-        timetable_data["Wednesday"].append(subjects['Wednesday'])
-        timetable_data["Thursday"].append(subjects['Thursday'])
-        timetable_data["Friday"].append(subjects['Friday'])
-    
-    st.dataframe(pd.DataFrame(timetable_data), use_container_width=True)
+    st.dataframe(grid.frame, use_container_width=True, hide_index=True)
 
 def show_attendance(user_id: int):
     st.title("Attendance Records")
@@ -81,11 +67,20 @@ def show_attendance(user_id: int):
     df = pd.DataFrame(result)
     st.dataframe(df, use_container_width=True)
     
-    # Show attendance summary
-    if not df.empty:
-        attendance_summary = df.groupby('subject')['status'].value_counts().unstack(fill_value=0)
+    # Show attendance summary (computed from the class attendance bitmap)
+    summary = get_attendance_summary(user_id)
+    if summary.get('subjects'):
+        st.metric("Overall Attendance", f"{summary['overall_percentage']}%")
+        
         st.subheader("Attendance Summary by Subject")
-        st.dataframe(attendance_summary, use_container_width=True)
+        subject_summary = pd.DataFrame.from_dict(summary['subjects'], orient='index')
+        subject_summary.columns = ["Present", "Total", "Percentage"]
+        st.dataframe(subject_summary, use_container_width=True)
+        
+        st.subheader("Attendance Summary by Month")
+        month_summary = pd.DataFrame.from_dict(summary['months'], orient='index')
+        month_summary.columns = ["Present", "Total", "Percentage"]
+        st.dataframe(month_summary, use_container_width=True)
 
 def manage_assignments(user_id: int):
     st.title("Assignments")
@@ -106,6 +101,15 @@ def manage_assignments(user_id: int):
             if assignment['is_submitted'] and assignment['marks_obtained'] is not None:
                 st.write(f"Marks Obtained: {assignment['marks_obtained']}/{assignment['max_marks']}")
             
+            # File checks run in the background; poll until they finish
+            status = assignment.get('processing_status')
+            if assignment['is_submitted'] and assignment.get('file_name'):
+                st.write(f"File: {assignment['file_name']} ({status or 'done'})")
+                if status == 'failed':
+                    st.error(f"File check failed: {assignment.get('processing_error')}")
+                elif status in ('queued', 'processing'):
+                    st.button("Refresh status", key=f"refresh_{assignment['id']}")
+            
             if not assignment['is_submitted']:
                 uploaded_file = st.file_uploader(
                     "Submit Assignment",
@@ -118,14 +122,8 @@ def manage_assignments(user_id: int):
                 
                 if st.button("Submit", key=f"submit_{assignment['id']}"):
                     if uploaded_file or submission_text:
-                        # Handle file upload and submission using mock data
-                        file_path = None
-                        if uploaded_file:
-                            # Mock file upload handling
-                            file_path = f"/uploads/submissions/{assignment['id']}_{uploaded_file.name}"
-                        
-                        # Use mock function to submit assignment
-                        submit_assignment(user_id, assignment['id'], submission_text, file_path)
+                        # The file is stored now; checks and text extraction are queued
+                        submit_assignment(user_id, assignment['id'], submission_text, uploaded_file)
                         st.success("Assignment submitted successfully!")
                         st.rerun()
                     else:
@@ -153,41 +151,66 @@ def show_performance(user_id: int):
         
         # Create performance chart
         if not subjects_df.empty:
-            chart_data = subjects_df.set_index('subject')['percentage']
-            st.bar_chart(chart_data)
+            st.plotly_chart(charts.bar_figure(subjects_df['subject'], subjects_df['percentage'], y_title="%"),
+                            use_container_width=True)
     
     # Display recent tests
     if 'recent_tests' in result:
         st.subheader("Recent Tests")
         tests_df = pd.DataFrame(result['recent_tests'])
         st.dataframe(tests_df, use_container_width=True)
-
-def show_announcements(user_id: int):
-    st.title("Announcements & Notices")
     
-    # Get announcements from mock data
-    announcements = get_announcements(user_id)
+    # Attendance and test trend (downsampled and cached on the server)
+    st.subheader("Trends")
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("From", value=datetime.now().date() - timedelta(days=365), key="trend_from")
+    with col2:
+        end_date = st.date_input("To", key="trend_to")
+    figure = get_student_trend_chart(user_id, str(start_date), str(end_date))
+    if figure is not None:
+        st.plotly_chart(figure, use_container_width=True)
+
+def announcement_page(user_id: int, archived: bool):
+    """Render one keyset page of the feed with Newer/Older controls; returns the items shown."""
+    key = f"announcement_cursors_{'archive' if archived else 'recent'}"
+    cursors = st.session_state.setdefault(key, [None])
+    announcements, next_cursor = get_announcement_feed(user_id, archived, cursors[-1])
     
     if not announcements:
         st.info("No announcements available")
-        return
-    
-    tab1, tab2 = st.tabs(["Recent", "Archive"])
-    
-    with tab1:
-        recent = [a for a in announcements if a.get('is_active', True)]
-        for announcement in recent:
+    for announcement in announcements:
+        if archived:
+            with st.expander(announcement['title']):
+                st.write(announcement['content'])
+                st.write(f"Posted on: {announcement['date']}")
+        else:
             st.info(f"📌 {announcement['title']}")
             st.write(announcement['content'])
             st.write(f"Posted on: {announcement['date']}")
             st.divider()
     
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("← Newer", key=f"{key}_newer"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor and st.button("Older →", key=f"{key}_older"):
+            cursors.append(next_cursor)
+            st.rerun()
+    return announcements
+
+def show_announcements(user_id: int):
+    st.title("Announcements & Notices")
+    
+    tab1, tab2 = st.tabs(["Recent", "Archive"])
+    
+    with tab1:
+        announcement_page(user_id, archived=False)
+    
     with tab2:
-        archived = [a for a in announcements if not a.get('is_active', True)]
-        for announcement in archived:
-            with st.expander(announcement['title']):
-                st.write(announcement['content'])
-                st.write(f"Posted on: {announcement['date']}")
+        announcement_page(user_id, archived=True)
 
 def show_study_materials(user_id: int):
     st.title("Study Materials")
@@ -216,12 +239,7 @@ def show_study_materials(user_id: int):
                 st.write(f"Uploaded by: {material['teacher']}")
                 st.write(f"Date: {material['upload_date']}")
                 
-                if material['type'] == 'PDF':
-                    st.download_button(
-                        "📚 Download Material",
-                        "dummy_pdf_content",
-                        file_name=f"{material['title']}.pdf"
-                    )
+                show_material_file(material, "student_material", "📚 Download Material")
 
 def show_feedback():
     st.title("Feedback & Queries")
@@ -257,7 +275,7 @@ def show_profile(user_id: int, email: str):
     col1, col2 = st.columns([1, 2])
     with col1:
         st.image(
-            student.get('profile_image_url', "https://via.placeholder.com/150"),
+            get_profile_image(user_id, student, "profile"),
             caption=f"{student['first_name']} {student['last_name']}"
         )
     with col2:
@@ -315,7 +333,7 @@ def show_panel(user_id: int, email: str):
     # Sidebar navigation
     st.sidebar.title("Student Portal")
     st.sidebar.image(
-        student.get('profile_image_url', "https://via.placeholder.com/150"),
+        get_profile_image(user_id, student, "sidebar"),
         caption=f"{student['first_name']} {student['last_name']}"
     )
     menu = st.sidebar.radio("", [
@@ -326,26 +344,30 @@ def show_panel(user_id: int, email: str):
         "🎯 Performance",
         "📢 Announcements",
         "📖 Study Materials",
+        "🔍 Search",
         "💬 Feedback",
         "👤 Profile"
     ])
 
     # Route to appropriate function based on menu selection
-    if menu == "📊 Dashboard":
-        show_dashboard(user_id)
-    elif menu == "📅 Timetable":
-        show_timetable(user_id)
-    elif menu == "📝 Attendance":
-        show_attendance(user_id)
-    elif menu == "📚 Assignments":
-        manage_assignments(user_id)
-    elif menu == "🎯 Performance":
-        show_performance(user_id)
-    elif menu == "📢 Announcements":
-        show_announcements(user_id)
-    elif menu == "📖 Study Materials":
-        show_study_materials(user_id)
-    elif menu == "💬 Feedback":
-        show_feedback()
-    elif menu == "👤 Profile":
-        show_profile(user_id, email)
\ No newline at end of file
+    with metrics.timer(f"page.Student.{menu.split(' ', 1)[-1]}"):
+        if menu == "📊 Dashboard":
+            show_dashboard(user_id)
+        elif menu == "📅 Timetable":
+            show_timetable(user_id)
+        elif menu == "📝 Attendance":
+            show_attendance(user_id)
+        elif menu == "📚 Assignments":
+            manage_assignments(user_id)
+        elif menu == "🎯 Performance":
+            show_performance(user_id)
+        elif menu == "📢 Announcements":
+            show_announcements(user_id)
+        elif menu == "📖 Study Materials":
+            show_study_materials(user_id)
+        elif menu == "🔍 Search":
+            show_search(user_id, "student_search")
+        elif menu == "💬 Feedback":
+            show_feedback()
+        elif menu == "👤 Profile":
+            show_profile(user_id, email)
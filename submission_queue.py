@@ -0,0 +1,195 @@
+import hashlib
+import io
+import os
+import re
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Background post-processing of assignment submissions.
+# submit_assignment stores the file and the submission row, then returns; the
+# checksum check, format detection, page count and text extraction run here on
+# a small bounded pool (SMS_SUBMISSION_WORKERS). Each step's outcome is written
+# back to the submission as processing_status ("queued" -> "processing" ->
+# "done"/"failed") plus its results, which the student and teacher views poll.
+# A resubmission supersedes the job still queued or running for the same
+# student and assignment: the older job keeps running but no longer saves.
+# Compressed parts of uploads are inflated to at most MAX_INFLATED_BYTES, so a
+# decompression or zip bomb costs a bounded amount of memory.
+
+SUBMISSION_WORKERS = int(os.environ.get("SMS_SUBMISSION_WORKERS", 2))
+EXCERPT_CHARS = 2000
+MAX_INFLATED_BYTES = int(os.environ.get("SMS_SUBMISSION_MAX_INFLATE", 8 * 1024 * 1024))
+
+_PDF_PAGE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+_PDF_STREAM = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.S)
+_PDF_TEXT = re.compile(rb"\((?:\\.|[^\\)])*\)\s*Tj|\[(?:[^\]]*)\]\s*TJ")
+_PDF_STRING = re.compile(rb"\(((?:\\.|[^\\)])*)\)")
+_XML_TAG = re.compile(r"<[^>]+>")
+
+
+def detect_format(data: bytes, file_name: str = None) -> str:
+    """File format from its leading bytes, falling back to the extension."""
+    head = bytes(data[:8])
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            return "invalid"
+        return "zip"
+    if head.startswith(b"\x89PNG"):
+        return "png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        return "doc"
+    try:
+        bytes(data[:4096]).decode("utf-8")
+        return "text"
+    except UnicodeDecodeError:
+        extension = os.path.splitext(file_name or "")[1].lstrip(".").lower()
+        return extension or "binary"
+
+
+def _pdf_text(data: bytes) -> str:
+    """Text shown by Tj/TJ operators in (Flate-compressed or plain) content streams."""
+    parts = []
+    for match in _PDF_STREAM.finditer(data):
+        stream = match.group(1)
+        try:
+            stream = zlib.decompressobj().decompress(stream, MAX_INFLATED_BYTES)
+        except zlib.error:
+            pass
+        for operator in _PDF_TEXT.finditer(stream):
+            parts.extend(s.decode("latin-1") for s in _PDF_STRING.findall(operator.group(0)))
+        if sum(map(len, parts)) > EXCERPT_CHARS * 4:
+            break
+    return " ".join(parts)
+
+
+def analyze(data: bytes, file_name: str = None, expected_checksum: str = None) -> dict:
+    """Checksum, format, page count, word count and a text excerpt for a submitted file."""
+    checksum = hashlib.sha256(data).hexdigest()
+    if expected_checksum is not None and checksum != expected_checksum:
+        raise ValueError("Stored file does not match its checksum")
+    file_format = detect_format(data, file_name)
+    pages, text = None, ""
+    if file_format == "pdf":
+        pages = len(_PDF_PAGE.findall(data))
+        text = _pdf_text(data)
+    elif file_format == "docx":
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            info = archive.getinfo("word/document.xml")
+            if info.file_size > MAX_INFLATED_BYTES:
+                raise ValueError(f"Document text is larger than {MAX_INFLATED_BYTES // (1024 * 1024)} MB")
+            with archive.open(info) as document:  # the declared size may lie, so read at most the limit
+                xml = document.read(MAX_INFLATED_BYTES).decode("utf-8", "replace")
+        text = _XML_TAG.sub(" ", xml.replace("</w:p>", "\n"))
+    elif file_format == "text":
+        text = bytes(data).decode("utf-8", "replace")
+    text = " ".join(text.split())
+    return {
+        "file_checksum": checksum,
+        "file_format": file_format,
+        "page_count": pages,
+        "word_count": len(text.split()) if text else 0,
+        "extracted_text": text[:EXCERPT_CHARS],
+    }
+
+
+class SubmissionQueue:
+    """Bounded worker pool running analyze() on stored submission files."""
+
+    def __init__(self, workers: int = SUBMISSION_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="submissions")
+        self._pending = {}  # (user_id, assignment_id) -> (generation, Future) of the latest job
+        self._running = set()  # every unfinished Future, superseded ones included
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _is_current(self, key, generation: int) -> bool:
+        with self._lock:
+            return self._pending.get(key, (None,))[0] == generation
+
+    def enqueue(self, user_id: int, assignment_id: int, read_file, file_name: str, save, on_done=None,
+                checksum: str = None):
+        """Process a submission in the background.
+
+        read_file() returns the stored bytes, save(user_id, assignment_id, fields) records status and
+        results, and on_done(user_id, assignment_id) runs after the final save (e.g. cache invalidation).
+        A stored file whose SHA-256 differs from checksum is marked failed. Once the same student
+        resubmits, this job skips its remaining saves and on_done; save should also only update the
+        row if it still holds this job's file, since a save may already be under way.
+        """
+        key = (user_id, assignment_id)
+
+        def run(generation):
+            try:
+                if self._is_current(key, generation):
+                    save(user_id, assignment_id, {"processing_status": "processing"})
+                try:
+                    fields = analyze(read_file(), file_name, checksum)
+                    fields["processing_status"] = "done"
+                    fields["processing_error"] = None
+                except Exception as e:
+                    fields = {"processing_status": "failed", "processing_error": str(e)}
+                current = self._is_current(key, generation)
+                if current:
+                    save(user_id, assignment_id, fields)
+            finally:
+                with self._lock:
+                    if self._pending.get(key, (None,))[0] == generation:
+                        del self._pending[key]
+            if current and on_done is not None:
+                on_done(user_id, assignment_id)
+
+        with self._lock:
+            self._generation += 1
+            future = self._pool.submit(run, self._generation)
+            self._pending[key] = (self._generation, future)
+            self._running.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self._lock:
+            self._running.discard(future)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def wait(self, timeout: float = None):
+        """Block until every queued submission has been processed (used by tests and shutdown)."""
+        with self._lock:
+            futures = list(self._running)
+        for future in futures:
+            future.result(timeout=timeout)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> SubmissionQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = SubmissionQueue()
+    return _queue
+
+
+def set_queue(queue: SubmissionQueue) -> SubmissionQueue:
+    global _queue
+    with _queue_lock:
+        _queue = queue
+    return queue
@@ -1,8 +1,11 @@
 import streamlit as st
+import metrics
 import pandas as pd
 from datetime import datetime, timedelta
 # Import mock data functions
-from mock_data import get_teacher_info, get_teacher_classes, get_teacher_students, create_assignment, mark_attendance, enter_marks, get_teacher_assignments, get_teacher_announcements, create_announcement, upload_study_material, get_teacher_feedback
+from mock_data import get_teacher_info, get_teacher_classes, get_teacher_schedule, get_teacher_students, get_class_marks, get_class_stats, get_class_day_attendance, create_assignment, mark_attendance, enter_marks, get_teacher_assignments, get_submission_statuses, get_announcement_feed, create_announcement, upload_study_material, get_class_materials, get_teacher_feedback, get_profile_image, update_profile, update_profile_image, update_password
+from panel_pages import show_material_file, show_search
+from marks_import import read_chunks, validate_marks, diff_preview, to_marks_data
 
 def show_dashboard(user_id: int):
     # Get teacher information from mock data
@@ -18,28 +21,22 @@ def show_dashboard(user_id: int):
     col1, col2, col3 = st.columns(3)
     
     # Get mock data for metrics
-    classes = get_teacher_classes(user_id)
     students = get_teacher_students(user_id)
     assignments = get_teacher_assignments(user_id)
+    schedule = get_teacher_schedule(user_id)
     
     with col1:
         st.metric("Total Students", str(len(students)), None)
     with col2:
-        st.metric("Classes Today", str(len(classes)), None)
+        st.metric("Classes Today", str(len(schedule)), None)
     with col3:
         st.metric("Active Assignments", str(len(assignments)), None)
     
-    # Today's Schedule
+    # Today's Schedule, from the shared class timetable grids
     st.subheader("Today's Schedule")
-    schedule_data = [
-        {"Time": "08:00 AM", "Class": "10A", "Subject": "Physics", "Topic": "Mechanics"},
-        {"Time": "10:00 AM", "Class": "11B", "Subject": "Physics", "Topic": "Thermodynamics"},
-        {"Time": "02:00 PM", "Class": "12A", "Subject": "Physics", "Topic": "Electromagnetism"}
-    ]
-    
-    if schedule_data:
-        schedule_df = pd.DataFrame(schedule_data)
-        st.dataframe(schedule_df, use_container_width=True)
+    if schedule:
+        schedule_df = pd.DataFrame(schedule).rename(columns=str.title)
+        st.dataframe(schedule_df, use_container_width=True, hide_index=True)
     else:
         st.info("No classes scheduled for today")
 
@@ -63,36 +60,67 @@ def manage_attendance(user_id: int):
     with col2:
         selected_date = st.date_input("Date", datetime.now())
     
-    # Get students in selected class (mock data)
-    students = get_teacher_students(user_id)
+    # Get students in selected class
+    students = get_teacher_students(user_id, selected_class)
     
     if not students:
         st.info("No students found in this class")
         return
     
-    # Create attendance form
+    # Start from what was already saved for this class and date; unmarked students default to present
+    saved = get_class_day_attendance(user_id, selected_class, str(selected_date))
+    if saved:
+        st.info("Attendance was already saved for this date; saving again replaces it.")
+    
+    # Entry mode: one editable grid, or only list the absentees
+    mode = st.radio("Entry Mode", ["Grid", "Exceptions Only"], horizontal=True, key="attendance_mode")
+    grid_key = f"attendance_grid_{selected_class}_{selected_date}"
+    version = st.session_state.get(f"{grid_key}_version", 0)
+    
+    if mode == "Grid":
+        # Resetting the grid's widget key discards edits; only the grid version it created starts all present
+        if st.button("Mark All Present"):
+            version = st.session_state[f"{grid_key}_version"] = version + 1
+            st.session_state[f"{grid_key}_all_present"] = version
+        all_present = st.session_state.get(f"{grid_key}_all_present") == version
+        grid = pd.DataFrame({
+            "Roll No": [s['roll_number'] for s in students],
+            "Name": [f"{s['first_name']} {s['last_name']}" for s in students],
+            "Present": [all_present or saved.get(s['id'], "Present") == "Present" for s in students]
+        })
+    
     with st.form("attendance_form"):
-        for student in students:
-            col1, col2, col3 = st.columns([2, 2, 1])
-            with col1:
-                st.write(f"Roll No: {student['roll_number']}")
-            with col2:
-                st.write(f"{student['first_name']} {student['last_name']}")
-            with col3:
-                status = st.selectbox(
-                    "",
-                    ["Present", "Absent"],
-                    index=0,
-                    key=f"attendance_{student['id']}"
-                )
+        if mode == "Grid":
+            edited = st.data_editor(
+                grid,
+                column_config={"Present": st.column_config.CheckboxColumn("Present")},
+                disabled=["Roll No", "Name"],
+                hide_index=True,
+                use_container_width=True,
+                key=f"{grid_key}_{version}"
+            )
+        else:
+            labels = {f"{s['roll_number']} - {s['first_name']} {s['last_name']}": s['id'] for s in students}
+            absentees = st.multiselect("Absent Students (everyone else is marked present)", list(labels),
+                                       default=[label for label, student_id in labels.items()
+                                                if saved.get(student_id) == "Absent"])
         
         if st.form_submit_button("Save Attendance"):
-            # Use mock function to mark attendance
-            attendance_data = {}
-            for student in students:
-                attendance_data[student['id']] = st.session_state[f"attendance_{student['id']}"]
+            if mode == "Grid":
+                present = edited["Present"].tolist()
+            else:
+                absent_ids = {labels[label] for label in absentees}
+                present = [s['id'] not in absent_ids for s in students]
+            attendance_data = {
+                s['id']: "Present" if is_present else "Absent"
+                for s, is_present in zip(students, present)
+            }
             
+            # One batched write for the whole class and date
             if mark_attendance(user_id, selected_class, str(selected_date), attendance_data):
+                # The next render starts a fresh grid from the statuses just saved
+                st.session_state.pop(f"{grid_key}_all_present", None)
+                st.session_state[f"{grid_key}_version"] = version + 1
                 st.success("Attendance marked successfully!")
             else:
                 st.error("Error saving attendance")
@@ -142,6 +170,14 @@ def manage_assignments(user_id: int):
                 st.write("✅ Submitted")
                 if assignment['marks_obtained'] is not None:
                     st.write(f"Marks: {assignment['marks_obtained']}/{assignment['max_marks']}")
+                if assignment.get('processing_count'):
+                    st.caption(f"{assignment['processing_count']} file(s) still being processed")
+                # Loaded on demand so the list does not query every assignment's submissions
+                if st.toggle("Show submissions", key=f"submissions_{assignment['id']}"):
+                    statuses = get_submission_statuses(assignment['id'])
+                    st.dataframe(pd.DataFrame(statuses), use_container_width=True, hide_index=True)
+                    if any(s['processing_status'] in ('queued', 'processing') for s in statuses):
+                        st.button("Refresh status", key=f"refresh_{assignment['id']}")
             else:
                 st.write("⏳ Pending")
 
@@ -170,13 +206,39 @@ def manage_marks(user_id: int):
         exam_types = ["Unit Test 1", "Mid Term", "Unit Test 2", "Final Term"]
         selected_exam = st.selectbox("Select Exam", exam_types)
     
-    # Get students in selected class (mock data)
-    students = get_teacher_students(user_id)
+    # Get students in selected class
+    students = get_teacher_students(user_id, selected_class)
     
     if not students:
         st.info("No students found in this class")
         return
     
+    mode = st.radio("Entry Mode", ["Manual Entry", "Import File"], horizontal=True, key="marks_mode")
+    if mode == "Import File":
+        import_marks(user_id, selected_class, selected_subject, selected_exam, students)
+    else:
+        enter_marks_manually(user_id, selected_class, selected_subject, selected_exam, students)
+    
+    # Show class statistics (running aggregates, updated by every save)
+    st.subheader("Class Statistics")
+    stats = get_class_stats(selected_class, selected_subject, selected_exam)
+    if not stats["count"]:
+        st.info("No marks entered for this exam yet")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Class Average", f"{stats['mean']:.2f}")
+    with col2:
+        st.metric("Std Deviation", f"{stats['std']:.2f}")
+    with col3:
+        st.metric("Highest Mark", f"{stats['max']:g}")
+    with col4:
+        st.metric("Lowest Mark", f"{stats['min']:g}")
+    st.write(f"Median: {stats['median']:g} | Middle 50%: {stats['p25']:g} - {stats['p75']:g} | "
+             f"10th-90th percentile: {stats['p10']:g} - {stats['p90']:g} | Students: {stats['count']}")
+
+def enter_marks_manually(user_id: int, selected_class: str, selected_subject: str, selected_exam: str, students: list):
     # Create marks entry form
     with st.form("marks_entry_form"):
         st.subheader("Enter Marks")
@@ -203,18 +265,48 @@ def manage_marks(user_id: int):
                 st.success("Marks saved successfully!")
             else:
                 st.error("Error saving marks")
+
+def import_marks(user_id: int, selected_class: str, selected_subject: str, selected_exam: str, students: list):
+    st.subheader("Import Marks")
+    st.caption("CSV or XLSX with a roll number column (roll_number / roll no) and a marks column (marks / score).")
     
-    # Show class statistics
-    st.subheader("Class Statistics")
-    marks_list = [85, 92, 78, 88, 90]  # Mock marks data
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        uploaded_file = st.file_uploader("Marks File", type=["csv", "xlsx"], key="marks_import_file")
+    with col2:
+        max_marks = st.number_input("Maximum Marks", min_value=1, value=100, key="marks_import_max")
     
-    col1, col2, col3 = st.columns(3)
+    if uploaded_file is None:
+        return
+    
+    try:
+        valid, errors = validate_marks(read_chunks(uploaded_file, uploaded_file.name), students, max_marks)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    
+    preview = diff_preview(valid, get_class_marks(selected_class, selected_subject, selected_exam))
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Class Average", f"{sum(marks_list)/len(marks_list):.2f}")
+        st.metric("Valid Rows", len(valid))
     with col2:
-        st.metric("Highest Mark", str(max(marks_list)))
+        st.metric("New", int((preview["Change"] == "New").sum()))
     with col3:
-        st.metric("Lowest Mark", str(min(marks_list)))
+        st.metric("Updated", int((preview["Change"] == "Updated").sum()))
+    with col4:
+        st.metric("Rejected Rows", len(errors))
+    
+    if len(errors):
+        with st.expander(f"Rejected Rows ({len(errors)})", expanded=not len(valid)):
+            st.dataframe(errors, hide_index=True, use_container_width=True)
+    
+    st.dataframe(preview, hide_index=True, use_container_width=True)
+    
+    if len(valid) and st.button("Commit Import", type="primary"):
+        if enter_marks(user_id, selected_class, selected_subject, selected_exam, to_marks_data(valid), max_marks):
+            st.success(f"Imported marks for {len(valid)} students")
+        else:
+            st.error("Error saving marks")
 
 def manage_announcements(user_id: int):
     st.title("Manage Announcements")
@@ -243,7 +335,8 @@ def manage_announcements(user_id: int):
                     st.error("Please fill in all required fields")
                 else:
                     # Use mock function to create announcement
-                    if create_announcement(user_id, title, content, priority):
+                    target = None if selected_class == "All Classes" else selected_class
+                    if create_announcement(user_id, title, content, priority, target):
                         st.success("Announcement posted successfully!")
                     else:
                         st.error("Error posting announcement")
@@ -251,7 +344,8 @@ def manage_announcements(user_id: int):
     # View existing announcements
     st.subheader("Your Announcements")
     
-    announcements = get_teacher_announcements(user_id)
+    cursors = st.session_state.setdefault("teacher_announcement_cursors", [None])
+    announcements, next_cursor = get_announcement_feed(user_id, False, cursors[-1])
     
     if not announcements:
         st.info("No announcements found")
@@ -262,8 +356,20 @@ def manage_announcements(user_id: int):
             f"📢 {announcement['title']} - {announcement['date']}"
         ):
             st.write(f"**Priority:** {announcement['priority'].title()}")
+            if announcement.get('audience') == "class":
+                st.write(f"**Class:** {announcement['audience_key']}")
             st.write("**Content:**")
             st.write(announcement['content'])
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("← Newer"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor and st.button("Older →"):
+            cursors.append(next_cursor)
+            st.rerun()
 
 def manage_resources(user_id: int):
     st.title("Study Materials Management")
@@ -305,47 +411,29 @@ def manage_resources(user_id: int):
                     st.error("Please provide a resource link")
                 else:
                     # Use mock function to upload study material
-                    if upload_study_material(user_id, title, selected_subject, selected_class, description, file):
+                    if upload_study_material(user_id, title, selected_subject, selected_class, description, file,
+                                             resource_type, external_link):
                         st.success("Material uploaded successfully!")
                     else:
                         st.error("Error uploading material")
     
     # Manage Existing Materials
     st.subheader("Uploaded Materials")
+    materials_class = st.selectbox("Class", [c['name'] for c in classes], key="materials_class")
+    materials = get_class_materials(materials_class)
     
-    # Mock materials data
-    materials = [
-        {
-            "title": "Physics Formula Sheet",
-            "subject": "Physics",
-            "class": "10A",
-            "type": "PDF",
-            "upload_date": "2024-01-10",
-            "status": "Active"
-        },
-        {
-            "title": "Mathematics Practice Problems",
-            "subject": "Mathematics",
-            "class": "10A",
-            "type": "PDF",
-            "upload_date": "2024-01-08",
-            "status": "Active"
-        }
-    ]
+    if not materials:
+        st.info("No materials uploaded for this class yet")
     
     for material in materials:
         with st.expander(
             f"{material['title']} ({material['class']} - {material['subject']}) - {material['upload_date']}"
         ):
             st.write(f"**Type:** {material['type']}")
-            st.write(f"**Status:** {material['status']}")
+            st.write(f"**Uploaded by:** {material['teacher']}")
+            st.write(material['description'])
             
-            if material['type'] == 'PDF':
-                st.download_button(
-                    "📥 Download",
-                    "dummy_pdf_content",
-                    file_name=f"{material['title']}.pdf"
-                )
+            show_material_file(material, "teacher_material")
 
 def view_feedback(user_id: int):
     st.title("Student Feedback")
@@ -390,7 +478,7 @@ def show_profile(user_id: int):
     col1, col2 = st.columns([1, 2])
     with col1:
         st.image(
-            teacher.get('profile_image_url', "https://via.placeholder.com/150"),
+            get_profile_image(user_id, teacher, "profile"),
             caption=f"{teacher['first_name']} {teacher['last_name']}"
         )
     with col2:
@@ -415,6 +503,11 @@ def show_profile(user_id: int):
             )
             
             if st.form_submit_button("Save Changes"):
+                if phone != teacher.get('contact_number'):
+                    update_profile(user_id, {"contact_number": phone})
+                if profile_image is not None:
+                    # Reports its own success or failure once the thumbnails are rendered
+                    update_profile_image(user_id, profile_image)
                 st.success("Profile updated successfully!")
     
     # Change Password Form
@@ -429,8 +522,8 @@ def show_profile(user_id: int):
                     st.error("Please fill in all password fields")
                 elif new_password != confirm_password:
                     st.error("New passwords do not match")
-                else:
-                    st.success("Password updated successfully!")
+                elif not update_password(user_id, current_password, new_password):
+                    st.error("Current password is incorrect")
 
 def show_panel(user_id: int, email: str):
     # Custom CSS
@@ -457,7 +550,7 @@ def show_panel(user_id: int, email: str):
     # Sidebar navigation
     st.sidebar.title("Teacher Portal")
     st.sidebar.image(
-        teacher.get('profile_image_url', "https://via.placeholder.com/150"),
+        get_profile_image(user_id, teacher, "sidebar"),
         caption=f"{teacher['first_name']} {teacher['last_name']}"
     )
     menu = st.sidebar.radio("", [
@@ -467,24 +560,28 @@ def show_panel(user_id: int, email: str):
         "🎯 Marks Entry",
         "📢 Announcements",
         "📖 Resources",
+        "🔍 Search",
         "💬 Feedback",
         "👤 Profile"
     ])
 
     # Route to appropriate function based on menu selection
-    if menu == "📊 Dashboard":
-        show_dashboard(user_id)
-    elif menu == "📝 Attendance":
-        manage_attendance(user_id)
-    elif menu == "📚 Assignments":
-        manage_assignments(user_id)
-    elif menu == "🎯 Marks Entry":
-        manage_marks(user_id)
-    elif menu == "📢 Announcements":
-        manage_announcements(user_id)
-    elif menu == "📖 Resources":
-        manage_resources(user_id)
-    elif menu == "💬 Feedback":
-        view_feedback(user_id)
-    elif menu == "👤 Profile":
-        show_profile(user_id)
\ No newline at end of file
+    with metrics.timer(f"page.Teacher.{menu.split(' ', 1)[-1]}"):
+        if menu == "📊 Dashboard":
+            show_dashboard(user_id)
+        elif menu == "📝 Attendance":
+            manage_attendance(user_id)
+        elif menu == "📚 Assignments":
+            manage_assignments(user_id)
+        elif menu == "🎯 Marks Entry":
+            manage_marks(user_id)
+        elif menu == "📢 Announcements":
+            manage_announcements(user_id)
+        elif menu == "📖 Resources":
+            manage_resources(user_id)
+        elif menu == "🔍 Search":
+            show_search(user_id, "teacher_search", "e.g. sports day")
+        elif menu == "💬 Feedback":
+            view_feedback(user_id)
+        elif menu == "👤 Profile":
+            show_profile(user_id)
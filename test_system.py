@@ -1,133 +1,668 @@
-import streamlit as st
-import time
+import io
+import ipaddress
+import json
+import os
+import sys
+import threading
+import zipfile
+import zlib
 from datetime import datetime, timedelta
-from main import hash_password
 
-def create_test_users():
-    """Create test users for each role."""
-    # Implement mock user creation logic or leave as a placeholder
-    pass
+import numpy as np
+import pytest
+from PIL import Image
+from streamlit.testing.v1 import AppTest
 
-def test_login(conn, email: str, password: str, role: str) -> bool:
+import attendance_store
+import backup
+import benchmark_panels
+import benchmark_startup
+import blob_store
+import cache
+import charts
+import class_stats
+import credentials
+import event_log
+import marks_import
+import metrics
+import performance_cube
+import mock_data
+import profile_images
+import rate_limit
+import reports
+import session_tokens
+import storage
+import submission_queue
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+test_users = [
+    ("student@test.com", "test123", "Student"),
+    ("teacher@test.com", "test123", "Teacher"),
+    ("hod@test.com", "test123", "HOD"),
+    ("admin@test.com", "test123", "Admin"),
+]
+
+
+@pytest.fixture(autouse=True)
+def isolated_files(tmp_path, monkeypatch):
+    """Event log, blob store, profile pictures and backups under tmp_path instead of ./data."""
+    log = event_log.EventLog(str(tmp_path / "logs"))
+    monkeypatch.setattr(event_log, "_log", log)
+    monkeypatch.setattr(blob_store, "_store", blob_store.BlobStore(str(tmp_path / "blobs")))
+    monkeypatch.setattr(profile_images, "_store", profile_images.ProfileImageStore(str(tmp_path / "avatars")))
+    monkeypatch.setattr(backup, "BACKUP_DIR", str(tmp_path / "backups"))
+    yield
+    log.close()
+
+
+@pytest.fixture
+def backend(tmp_path):
+    """Fresh SQLite store seeded from the mock data for each test."""
+    previous = storage.get_backend()
+    backend = storage.set_backend(storage.create_backend("sqlite", str(tmp_path / "school.db")))
+    yield backend
+    storage.set_backend(previous)
+
+
+def login(email: str, password: str, role: str) -> AppTest:
+    """Submit the login form of main.py headlessly."""
+    at = AppTest.from_file(os.path.join(APP_DIR, "main.py"), default_timeout=30).run()
+    at.radio(key="role_selector").set_value(role)
+    at.text_input[0].input(email)
+    at.text_input[1].input(password)
+    at.button[0].click()
+    return at.run()
+
+
+@pytest.mark.parametrize("email,password,role", test_users)
+def test_login(email: str, password: str, role: str):
     """Test login functionality."""
+    at = login(email, password, role)
+    assert not at.exception
+    assert at.session_state.logged_in
+    assert at.session_state.current_role == role
+
+
+def test_login_rejects_wrong_password_and_role():
+    at = login("student@test.com", "wrong", "Student")
+    assert not at.session_state.logged_in
+    at = login("student@test.com", "test123", "Admin")
+    assert not at.session_state.logged_in
+
+
+def test_login_rejects_inactive_account():
+    at = login("inactive@test.com", "test123", "Student")
+    assert not at.session_state.logged_in
+
+
+def test_login_rate_limit_is_shared_across_sessions():
+    for _ in range(rate_limit.EMAIL_LIMIT[0]):
+        login("flood@test.com", "guess", "Student")
+    at = login("flood@test.com", "guess", "Student")
+    assert "Too many failed attempts" in at.error[0].value
+
+
+def test_login_page_renders_before_panels_and_pandas_load():
+    login = benchmark_startup.measure_login(runs=1)
+    assert login["error"] is None and login["loaded"] == []
+    panel = benchmark_startup.measure_panel("student", runs=1)
+    assert panel["error"] is None and "mock_data" in panel["loaded"]
+    session = benchmark_startup.measure_session(runs=1)
+    assert session["error"] is None and not set(benchmark_startup.DEFERRED_MODULES) & set(session["loaded"])
+
+
+def test_token_bucket_refills_and_evicts():
+    now = [0.0]
+    limiter = rate_limit.TokenBucketLimiter(2, 1.0, max_keys=1000, clock=lambda: now[0])
+    assert limiter.acquire("a") and limiter.acquire("a") and not limiter.acquire("a")
+    assert limiter.retry_after("a") == pytest.approx(1.0)
+    now[0] = 1.0
+    assert limiter.acquire("a")
+    for i in range(20000):
+        limiter.acquire(f"user{i}@test.com")
+    assert len(limiter) == 1000
+
+
+def test_address_limit_counts_only_failed_logins_and_trusts_forwarding_proxies(monkeypatch):
+    monkeypatch.setattr(rate_limit, "address_limiter", rate_limit.TokenBucketLimiter(2, 1 / 900))
+    for i in range(10):
+        assert rate_limit.check_login(f"user{i}@test.com", "10.0.0.1") == 0
+        rate_limit.login_succeeded(f"user{i}@test.com", "10.0.0.1")
+    assert rate_limit.check_login("a@test.com", "10.0.0.1") == 0 and rate_limit.check_login("b@test.com", "10.0.0.1") == 0
+    assert rate_limit.check_login("c@test.com", "10.0.0.1") > 0
+    proxies = [ipaddress.ip_network("10.0.0.0/8")]
+    assert rate_limit.resolve_address("10.0.0.1", "203.0.113.7, 10.0.0.9", proxies) == "203.0.113.7"
+    assert rate_limit.resolve_address("198.51.100.2", "203.0.113.7", proxies) == "198.51.100.2"
+
+
+def test_credential_store_salts_and_updates_passwords(backend):
+    store = credentials.CredentialStore(backend, rounds=1000, workers=2)
+    assert store.hash("test123") != store.hash("test123")
+    assert store.verify("Student@test.com ", "test123")["id"] == 1
+    assert store.verify("nobody@test.com", "test123") is None
+    assert not store.set_password(1, "wrong", "new-pass")
+    assert store.set_password(1, "test123", "new-pass")
+    restarted = credentials.CredentialStore(storage.SQLiteBackend(backend.path), rounds=1000, workers=1)
+    assert restarted.verify("student@test.com", "new-pass") and not restarted.verify("student@test.com", "test123")
+    assert mock_data.create_user({"full_name": "New Teacher", "email": "New@test.com", "password": "pw-1",
+                                  "user_type": "Teacher", "department": "Physics"})
+    assert restarted.verify("new@test.com", "pw-1")["role"] == "teacher"
+    restarted.backend.close()
+    # A database from before the column: accounts get no hash (not the demo one) and must reset
+    with backend.transaction() as conn:
+        conn.execute("ALTER TABLE users DROP COLUMN password_hash")
+    migrated = storage.SQLiteBackend(backend.path)
+    legacy = credentials.CredentialStore(migrated, rounds=1000, workers=1)
+    assert legacy.needs_reset(legacy.lookup("student@test.com"))
+    assert legacy.verify("student@test.com", "test123") is None
+    with migrated.transaction() as conn:
+        conn.execute("INSERT INTO users (role, email, is_active) VALUES ('student', 'bare@test.com', 1)")
+    assert legacy.lookup("bare@test.com")["password_hash"] is None
+    migrated.close()
+    legacy.close()
+    restarted.close()
+    store.close()
+
+
+def test_session_tokens_verify_rotate_and_expire():
+    old = session_tokens.TokenSigner(["old-secret"])
+    token = old.issue(2, "Teacher", "teacher@test.com", now=1000)
+    claims = old.verify(token, now=1001)
+    assert (claims["sub"], claims["role"]) == ("2", "Teacher")
+    rotated = session_tokens.TokenSigner(["new-secret", "old-secret"])
+    assert rotated.verify(token, now=1001)["email"] == "teacher@test.com"
+    assert rotated.verify(token, now=1000 + 8 * 3600) is None
+    assert session_tokens.TokenSigner(["other"]).verify(token, now=1001) is None
+    assert old.verify(token[:-2] + ("A" if token[-2] != "A" else "B") + token[-1], now=1001) is None
+
+
+def test_crud_operations_student(backend, tmp_path):
+    """Student submits an assignment; the file is checked on the background queue."""
+    previous = blob_store.get_store()
+    blob_store.set_store(blob_store.BlobStore(str(tmp_path / "blobs")))
     try:
-        with conn.cursor() as cur:
-            query = """
-                SELECT id, role, password_hash 
-                FROM users 
-                WHERE email = %s AND is_active = true
-            """
-            cur.execute(query, (email,))
-            result = cur.fetchone()
-            
-            if not result:
-                print(f"Login failed for {email}: User not found")
-                return False
-            
-            if result['password_hash'] == hash_password(password) and result['role'] == role:
-                print(f"Login successful for {email}")
-                return True
-            
-            print(f"Login failed for {email}: Invalid credentials")
-            return False
-            
-    except Exception as e:
-        print(f"Login error for {email}: {str(e)}")
-        return False
-
-def test_crud_operations(conn, user_id: int, role: str):
-    """Test CRUD operations for each role."""
+        content = zlib.compress(b"BT (Newton laws of motion) Tj [(second) -250 (page)] TJ ET")
+        pdf = io.BytesIO(b"%PDF-1.4\n1 0 obj << /Type /Pages /Count 2 >> endobj\n"
+                         b"2 0 obj << /Type /Page >> endobj\n3 0 obj << /Type /Page >> endobj\n"
+                         b"4 0 obj << /Filter /FlateDecode >>\nstream\n" + content + b"\nendstream\nendobj\n%%EOF")
+        pdf.name = "test_submission.pdf"
+        assert mock_data.submit_assignment(1, 1, "Test submission", pdf)
+        submitted = {a["id"]: a for a in mock_data.get_assignments(1)}[1]
+        assert submitted["is_submitted"] and submitted["file_name"] == "test_submission.pdf"
+        submission_queue.get_queue().wait(timeout=10)
+        assert {a["id"]: a for a in mock_data.get_assignments(1)}[1]["processing_status"] == "done"
+        status = {s["roll_number"]: s for s in mock_data.get_submission_statuses(1)}["S001"]
+        assert (status["file_format"], status["page_count"], status["word_count"]) == ("pdf", 2, 6)
+        with pytest.raises(ValueError):
+            submission_queue.analyze(b"hello", expected_checksum="0" * 64)
+    finally:
+        blob_store.set_store(previous)
+
+
+def test_resubmission_supersedes_queued_job_and_inflation_is_bounded(monkeypatch):
+    queue = submission_queue.SubmissionQueue(workers=2)
+    gate, saves = threading.Event(), []
+
+    def slow_read():
+        gate.wait(5)
+        return b"first draft"
+
+    queue.enqueue(1, 1, slow_read, "a.txt", lambda u, a, fields: saves.append(("old", fields)))
+    queue.enqueue(1, 1, lambda: b"second draft", "b.txt", lambda u, a, fields: saves.append(("new", fields)))
+    gate.set()
+    queue.wait(timeout=10)
+    queue.close()
+    assert saves[-1][0] == "new" and saves[-1][1]["extracted_text"] == "second draft"
+    assert not [fields for job, fields in saves if job == "old" and fields["processing_status"] != "processing"]
+    assert queue.pending() == 0
+
+    monkeypatch.setattr(submission_queue, "MAX_INFLATED_BYTES", 1 << 20)
+    bomb = io.BytesIO()
+    with zipfile.ZipFile(bomb, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("word/document.xml", b"<w:t>a</w:t>" * (1 << 18))
+    with pytest.raises(ValueError):
+        submission_queue.analyze(bomb.getvalue(), "bomb.docx")
+    stream = zlib.compress(b"(x) Tj " * (1 << 20))
+    pdf = b"%PDF-1.4\nstream\n" + stream + b"\nendstream\n"
+    assert len(submission_queue.analyze(pdf, "bomb.pdf")["extracted_text"]) <= submission_queue.EXCERPT_CHARS
+
+
+def test_crud_operations_teacher(backend):
+    """Teacher creates an assignment, marks attendance and enters marks."""
+    before = len(mock_data.get_assignments(1))
+    assert mock_data.create_assignment(2, "Test Assignment", "Test Description", "2024-02-01", "Physics", "10A")
+    assert len(mock_data.get_assignments(1)) == before + 1
+
+    assert mock_data.mark_attendance(2, "10A", "2024-02-01", {1: "Absent"})
+    assert {"date": "2024-02-01", "subject": "Physics", "status": "Absent"} in mock_data.get_attendance(1)
+
+    assert mock_data.enter_marks(2, "10A", "Physics", "Final Term", {1: 70})
+    assert mock_data.get_performance(1)["recent_tests"][0]["test"] == "Physics Final Term"
+
+
+def test_crud_operations_teacher_announcement(backend):
+    assert mock_data.create_announcement(2, "Test Announcement", "Test Content", "Urgent")
+    assert mock_data.get_announcements(1)[0]["title"] == "Test Announcement"
+
+
+def test_crud_operations_admin(backend, tmp_path):
+    """Admin creates a user and sees it in the directory and stats."""
+    students = mock_data.get_system_stats()["total_students"]
+    previous = event_log.get_log()
+    event_log.set_log(event_log.EventLog(str(tmp_path / "logs")))
     try:
-        with conn.cursor() as cur:
-            if role == 'student':
-                # Test submitting assignment
-                assignment_query = """
-                    INSERT INTO assignment_submissions (assignment_id, student_id, file_path)
-                    VALUES (1, (SELECT id FROM students WHERE user_id = %s), 'test_submission.pdf')
-                    RETURNING id
-                """
-                cur.execute(assignment_query, (user_id,))
-                conn.commit()
-                print("Student assignment submission test: Success")
-                
-            elif role == 'teacher':
-                # Test creating assignment
-                assignment_query = """
-                    INSERT INTO assignments (teacher_id, title, description, class_id, subject_id, due_date)
-                    VALUES (
-                        (SELECT id FROM teachers WHERE user_id = %s),
-                        'Test Assignment',
-                        'Test Description',
-                        1,
-                        1,
-                        CURRENT_DATE + INTERVAL '7 days'
-                    )
-                    RETURNING id
-                """
-                cur.execute(assignment_query, (user_id,))
-                conn.commit()
-                print("Teacher assignment creation test: Success")
-                
-            elif role == 'hod':
-                # Test department announcement
-                announcement_query = """
-                    INSERT INTO announcements (user_id, title, content, target_audience)
-                    VALUES (%s, 'Test Announcement', 'Test Content', 'department')
-                    RETURNING id
-                """
-                cur.execute(announcement_query, (user_id,))
-                conn.commit()
-                print("HOD announcement creation test: Success")
-                
-            elif role == 'admin':
-                # Test user management
-                user_query = """
-                    UPDATE users
-                    SET is_active = true
-                    WHERE role = 'student'
-                    RETURNING id
-                """
-                cur.execute(user_query)
-                conn.commit()
-                print("Admin user management test: Success")
-                
-    except Exception as e:
-        conn.rollback()
-        print(f"CRUD test error for {role}: {str(e)}")
+        assert mock_data.create_user({
+            "full_name": "Jane Roe", "email": "jane@test.com", "username": "jane",
+            "password": "test123", "user_type": "Student", "department": "Physics",
+        }, actor_id=4)
+        jane = mock_data.get_all_users()[-1]
+        assert mock_data.set_user_status(jane["id"], True, actor_id=4)
+        assert mock_data.create_assignment(2, "Logged", "Desc", "2024-02-01", "Physics", "10A")
+        rows, _ = mock_data.get_system_logs(datetime.now().date(), datetime.now().date(), "write")
+        # The admin is recorded as the actor, not the account they changed
+        assert [(r["action"], r["user"]) for r in rows] == [
+            ("Create Assignment", "Dr. Sarah Smith"), ("Update User Status", "Admin User"), ("Create User", "Admin User")]
+    finally:
+        event_log.set_log(previous)
+    jane = mock_data.get_all_users()[-1]
+    assert jane["name"] == "Jane Roe"
+    stats = mock_data.get_system_stats()
+    assert stats["total_students"] == students + 1
+    assert stats["changes"]["total_students"] == 1 and stats["by_department"]["Physics"] >= 1
 
-def run_system_tests():
-    """Run comprehensive system tests."""
-    print("Starting system tests...\n")
-    
+    mock_data.record_login(jane["id"])
+    assert mock_data.set_user_status(jane["id"], False)
+    stats = mock_data.get_system_stats()
+    assert (stats["changes"]["active_users"], stats["logins_today"]) == (0, 1)
+    assert stats["active_users"] == sum(u["status"] == "Active" for u in mock_data.get_all_users())
+    # Counters survive a rebuild from the tables unchanged
+    with backend.transaction() as conn:
+        backend._rebuild_counters(conn)
+    assert mock_data.get_system_stats() == stats
+
+
+def test_announcement_feed_pages_by_audience(backend):
+    for i in range(25):
+        audience = ("class", "10A") if i % 2 else ("school", None)
+        backend.create_announcement(2, f"Notice {i}", "Body", "Normal", *audience)
+    backend.create_announcement(2, "Other class", "Body", "Normal", "class", "12A")
+    cache.clear()
+    seen, cursor = [], None
+    while True:
+        page, cursor = mock_data.get_announcement_feed(1, cursor=cursor, limit=10)
+        assert len(page) <= 10
+        seen += [a["id"] for a in page]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen))
+    titles = {a["title"] for a in backend.get_announcement_page(1, None, "10A", limit=100)}
+    assert "Notice 24" in titles and "Notice 23" in titles and "Other class" not in titles
+    assert len(seen) == len(titles)
+
+
+def test_search_ranks_prefixes_and_picks_up_new_content(backend):
+    assert mock_data.search_content(1, "sports")[0]["title"] == "Annual Sports Day"
+    mock_data.create_announcement(2, "Robotics club trials", "Trials for the robotics club on Friday", "Normal")
+    mock_data.upload_study_material(2, "Optics notes", "Physics", "10A", "Refraction and lenses", None)
+    assert [r["title"] for r in mock_data.search_content(1, "robo")] == ["Robotics club trials"]
+    assert mock_data.search_content(1, "lenses refr")[0]["kind"] == "material"
+    mock_data.upload_study_material(2, "Optics answers", "Physics", "12A", "Lenses worked answers", None)
+    assert [r["title"] for r in mock_data.search_content(1, "lenses")] == ["Optics notes"]
+    assert len(mock_data.search_content(2, "lenses")) == 2
+    assert mock_data.search_content(1, "robotics", kinds=["material"]) == []
+
+
+def test_blob_store_dedupes_uploads_across_classes(backend, tmp_path):
+    previous = blob_store.get_store()
+    store = blob_store.set_store(blob_store.BlobStore(str(tmp_path / "blobs")))
     try:
-        # Create test users
-        print("Creating test users...")
-        create_test_users()
-        print("\nTest users created.\n")
-        
-        # Test login for each user
-        print("Testing login functionality...")
-        for email, password, role in test_users:
-            test_login(conn, email, password, role)
-        print("\nLogin tests completed.\n")
-        
-        # Test CRUD operations
-        print("Testing CRUD operations...")
-        with conn.cursor() as cur:
-            for email, _, role in test_users:
-                cur.execute("SELECT id FROM users WHERE email = %s", (email,))
-                result = cur.fetchone()
-                if result:
-                    test_crud_operations(conn, result['id'], role)
-        print("\nCRUD tests completed.\n")
-        
-        print("All system tests completed.")
-        
-    except Exception as e:
-        print(f"Test suite error: {str(e)}")
+        handout = io.BytesIO(b"%PDF-1.4 " + bytes(range(256)) * 5000)
+        handout.name = "optics.pdf"
+        for class_name in ("10A", "12A"):
+            assert mock_data.upload_study_material(2, "Optics", "Physics", class_name, "Notes", handout)
+        digests = {m["blob_digest"] for m in mock_data.get_study_materials(2) if m["title"] == "Optics"}
+        assert len(digests) == 1
+        digest = digests.pop()
+        assert len(os.listdir(os.path.join(store.root, digest[:2]))) == 1
+        assert store.put(io.BytesIO(handout.getvalue()), chunk_size=4096) == (digest, len(handout.getvalue()))
+        assert mock_data.get_material_file(digest) is mock_data.get_material_file(digest)
+        material, = [m for m in mock_data.get_class_materials("12A") if m["title"] == "Optics"]
+        assert mock_data.get_material_file(material["blob_digest"]) == handout.getvalue()
+        assert b"".join(store.iter_chunks(digest, 1000)) == handout.getvalue()
     finally:
-        if conn:
-            conn.close()
+        blob_store.set_store(previous)
+
+    def legacy_material():
+        from panel_pages import show_material_file
+        show_material_file({"id": 1, "title": "Old notes", "blob_digest": "ab" * 32, "file_size": None}, "legacy")
+
+    at = AppTest.from_function(legacy_material).run()  # materials from before sizes were recorded
+    assert not at.exception and at.button[0].label == "📥 Get File (0 KB)"
+
+
+def test_profile_image_thumbnails_are_local_and_stripped(backend, tmp_path):
+    # A job still queued at the timeout logs its failure when it finishes
+    busy = profile_images.set_store(profile_images.ProfileImageStore(str(tmp_path / "busy"), workers=1))
+    release = threading.Event()
+    busy._pool.submit(release.wait)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(profile_images, "UPLOAD_TIMEOUT", 0.01)
+        assert mock_data.update_profile_image(2, io.BytesIO(b"not an image")) is None
+    release.set()
+    busy._pool.shutdown(wait=True)
+    errors, _ = event_log.get_log().query(event_type="error", limit=1)
+    assert errors[0]["action"] == "Update Profile Picture" and "ValueError" in errors[0]["detail"]
+    store = profile_images.set_store(profile_images.ProfileImageStore(str(tmp_path / "avatars")))
+    exif = Image.Exif()
+    exif[0x010f] = "Camera"
+    upload = io.BytesIO()
+    Image.new("RGB", (1200, 800), "navy").save(upload, "JPEG", exif=exif)
+    placeholder = mock_data.get_profile_image(2, mock_data.get_teacher_info(2))
+    assert not mock_data.update_profile_image(2, io.BytesIO(b"not an image"))
+    assert mock_data.update_profile_image(2, upload).startswith("avatar:")
+    teacher = mock_data.get_teacher_info(2)
+    thumbnail = mock_data.get_profile_image(2, teacher, "sidebar")
+    assert thumbnail != placeholder and thumbnail is mock_data.get_profile_image(2, teacher, "sidebar")
+    image = Image.open(io.BytesIO(thumbnail))
+    assert image.size == (96, 96) and not image.getexif()
+    assert Image.open(io.BytesIO(mock_data.get_profile_image(2, teacher, "profile"))).size == (240, 240)
+    version = teacher["profile_image_url"].split(":", 1)[1]
+    assert os.path.exists(store.path(2, version, "profile"))
+
+
+def test_incremental_backup_and_term_restore(backend, tmp_path):
+    engine = backup.BackupEngine(str(tmp_path / "backups"), workers=2)
+    files = blob_store.BlobStore(str(tmp_path / "blobs"))
+    files.put(io.BytesIO(bytes(range(256)) * 1000))
+    full = engine.backup(backend, files, "full")
+    assert full["stats"]["reused"] == 0 and full["tables"]["attendance"]["date_column"] == "date"
+    mock_data.mark_attendance(2, "10A", "2024-02-02", {1: "Absent"})
+    incremental = engine.backup(backend, files)
+    assert incremental["stats"]["chunks"] - incremental["stats"]["reused"] == 1
+    records = len(mock_data.get_attendance(1))
+    assert engine.restore(full["id"], backend, table="attendance", term="2024-T1") == records - 1
+    storage.reset_derived()
+    assert len(mock_data.get_attendance(1)) == records - 1
+    damaged = incremental["tables"]["attendance"]["partitions"]["2024-T1"][0]
+    with open(engine.chunks.path(damaged), "wb") as f:
+        f.write(zlib.compress(b"tampered"))
+    assert engine.verify(incremental["id"]) == [damaged]
+    with pytest.raises(backup.BackupError):
+        engine.restore(incremental["id"], backend, table="attendance")
+    assert len(mock_data.get_attendance(1)) == records - 1
+    assert engine.restore(full["id"], backend) > 0 and engine.restore(full["id"], backend, table="users") > 0
+    storage.reset_derived()
+    assert len(mock_data.get_attendance(1)) == records - 1 and mock_data.get_student_info(1)["first_name"] == "John"
+    assert mock_data.create_user({"full_name": "Late Hire", "email": "late@test.com", "password": "pw",
+                                  "user_type": "Teacher", "department": "Physics"})
+    users = len(mock_data.get_all_users())
+    with pytest.raises(backup.BackupError):
+        engine.restore(full["id"], backend, table="users")  # would orphan the new teacher profile
+    storage.reset_derived()
+    assert len(mock_data.get_all_users()) == users
+
+
+def test_reports_stream_aggregates_and_reuse_jobs(backend):
+    job = mock_data.request_report("Attendance Summary Report", "2024-01-01", "2024-12-31", ["By Subject"], "CSV")
+    assert job.wait(timeout=30) and job.status == "ready" and job.progress == 1.0
+    records = mock_data.get_attendance(1)
+    physics = [r for r in records if r["subject"] == "Physics"]
+    present = sum(r["status"] == "Present" for r in physics)
+    assert f"Physics,{present},{len(physics)}," in job.data.decode()
+    assert mock_data.request_report("Attendance Summary Report", "2024-01-01", "2024-12-31", ["By Subject"], "CSV") is job
+    pdf = mock_data.request_report("Academic Performance Report", "2024-01-01", "2024-12-31", (), "PDF")
+    excel = mock_data.request_report("Department Statistics Report", "2024-01-01", "2024-12-31", (), "Excel")
+    assert pdf.wait(timeout=30) and excel.wait(timeout=30)
+    assert pdf.data.startswith(b"%PDF-") and excel.data.startswith(b"PK")
+    assert {r["status"] for r in mock_data.get_system_reports()} == {"Ready"}
+    grades = reports.compute(storage.get_backend(), "Academic Performance Report", "2024-01-01", "2024-12-31",
+                             ["Grade Distribution"])["Grade Distribution"]
+    expected = {}
+    for *_, marks, max_marks, _ in storage.get_backend().iter_report_rows("marks", "2024-01-01", "2024-12-31", None):
+        grade = storage.grade_for(100 * marks / max_marks)  # the scale students see on their own reports
+        expected[grade] = expected.get(grade, 0) + 1
+    assert dict(zip(grades["Grade"], grades["Results"])) == expected
+
+
+def test_event_log_range_type_queries_and_paging(backend, tmp_path):
+    previous = event_log.get_log()
+    log = event_log.set_log(event_log.EventLog(str(tmp_path / "logs")))
+    try:
+        start = datetime(2024, 3, 1, 8)
+        for i in range(3000):
+            log.append(("login", "write", "error")[i % 3], f"action {i}", now=start + timedelta(minutes=i))
+        window = (datetime(2024, 3, 2, 10), datetime(2024, 3, 3, 9, 30))
+        expected = [f"action {i}" for i in reversed(range(3000)) if i % 3 == 1
+                    and window[0] <= start + timedelta(minutes=i) <= window[1]]
+        seen, cursor = [], None
+        while True:
+            page, cursor = log.query(*window, "write", cursor, limit=100)
+            seen += [e["action"] for e in page]
+            if cursor is None:
+                break
+        assert seen == expected
+        everything, _ = event_log.EventLog(log.root).query(*window, limit=5000)
+        in_window = [i for i in range(3000) if window[0] <= start + timedelta(minutes=i) <= window[1]]
+        assert [e["action"] for e in everything] == [f"action {i}" for i in reversed(in_window)]
+
+        mock_data.create_assignment(2, "Logged", "Desc", "2024-02-01", "Physics", "10A")
+        rows, _ = mock_data.get_system_logs(datetime.now().date(), datetime.now().date(), "write")
+        assert (rows[0]["action"], rows[0]["status"], rows[0]["user"]) == ("Create Assignment", "Success", "Dr. Sarah Smith")
+    finally:
+        event_log.set_log(previous)
+
+
+def test_metrics_record_latency_and_payload_only_when_enabled(backend):
+    metrics.reset()
+    mock_data.get_attendance(1)
+    assert metrics.snapshot() == []
+    metrics.set_enabled(True)
+    try:
+        for _ in range(20):
+            mock_data.get_attendance(1)
+        with metrics.timer("page.Student.Attendance"):
+            mock_data.get_attendance(1)
+        with pytest.raises(ValueError), metrics.timer("page.Student.Broken"):
+            raise ValueError("boom")
+    finally:
+        metrics.set_enabled(False)
+    rows = {row["name"]: row for row in metrics.snapshot()}
+    attendance = rows["data.get_attendance"]
+    assert attendance["calls"] == 21 and attendance["avg_payload_kb"] > 0
+    assert attendance["p50_ms"] <= attendance["p95_ms"] <= attendance["p99_ms"] <= attendance["max_ms"]
+    assert rows["page.Student.Attendance"]["calls"] == 1
+    assert rows["page.Student.Attendance"]["max_payload_kb"] == attendance["max_payload_kb"]
+    assert rows["page.Student.Broken"]["errors"] == 1
+    metrics.reset()
+
+
+def test_cache_invalidation_is_scoped(backend):
+    mock_data.get_attendance(1)
+    mock_data.get_announcements(1)
+    mock_data.mark_attendance(2, "10A", "2024-02-02", {1: "Present"})
+    hits = cache.stats()["hits"]
+    mock_data.get_announcements(1)
+    assert cache.stats()["hits"] == hits + 1
+
+    @cache.cached("racing_read")
+    def racing_read():
+        cache.invalidate("racing_read")  # a writer lands while the read is in flight
+        return "stale"
+    racing_read()
+    assert cache.invalidate("racing_read") == 0
+
+
+def test_cached_reads_are_copies():
+    previous = storage.get_backend()
+    storage.set_backend(storage.create_backend("memory"))
+    try:
+        cache.clear()
+        info = mock_data.get_student_info(1)
+        info["first_name"] = "Changed"
+        mock_data.get_assignments(1).clear()
+        assert mock_data.get_student_info(1)["first_name"] == "John"
+        assert mock_data.MOCK_STUDENTS[1]["first_name"] == "John"
+        assert len(mock_data.get_assignments(1)) == len(mock_data.MOCK_ASSIGNMENTS[1])
+    finally:
+        cache.clear()
+        storage.set_backend(previous)
+
+
+def test_attendance_summary_matches_records(backend):
+    records = mock_data.get_attendance(1)
+    summary = mock_data.get_attendance_summary(1)
+    assert sum(s["total"] for s in summary["subjects"].values()) == len(records)
+    assert sum(s["present"] for s in summary["subjects"].values()) == sum(r["status"] == "Present" for r in records)
+    mock_data.mark_attendance(2, "10A", "2024-02-06", {1: "Absent"})
+    assert mock_data.get_class_day_attendance(2, "10A", "2024-02-06") == {1: "Absent"}
+    assert mock_data.get_class_day_attendance(2, "10A", "2024-02-07") == {}
+
+
+def test_mark_all_present_only_overrides_until_saved(backend):
+    at = login("teacher@test.com", "test123", "Teacher")
+    at.sidebar.radio[0].set_value(next(o for o in at.sidebar.radio[0].options if "Attendance" in o)).run()
+    next(b for b in at.button if b.label == "Mark All Present").click().run()
+    next(b for b in at.button if b.label == "Save Attendance").click().run()
+    today = str(datetime.now().date())
+    assert mock_data.get_class_day_attendance(2, "10A", today) == {1: "Present"}
+    # A later save elsewhere is what the page reloads, not the earlier all-present override
+    mock_data.mark_attendance(2, "10A", today, {1: "Absent"})
+    next(b for b in at.run().button if b.label == "Save Attendance").click().run()
+    assert mock_data.get_class_day_attendance(2, "10A", today) == {1: "Absent"}
+
+
+def test_attendance_store_rejects_a_ninth_subject_before_writing():
+    store = attendance_store.ClassAttendance([1])
+    for period in range(attendance_store.PERIODS_PER_DAY):
+        store.mark("2024-01-15", f"Subject {period}", {1: "Present"})
+    store.check("2024-01-15", "Subject 3")
+    with pytest.raises(ValueError):
+        store.check("2024-01-15", "Art")
+    assert "Art" not in store.subject_summary()
+
+
+def test_marks_import_validates_and_commits(backend):
+    students = mock_data.get_teacher_students(2, "10A")
+    upload = io.BytesIO(
+        f"Roll No,Marks\n{students[0]['roll_number']},55\nS999,40\n{students[0]['roll_number']},61\n"
+        f"{students[0]['roll_number']},120\n".encode()
+    )
+    valid, errors = marks_import.validate_marks(marks_import.read_chunks(upload, "marks.csv", 2), students)
+    assert valid["marks"].tolist() == [61]
+    assert sorted(errors["row"]) == [2, 3, 5]
+    assert mock_data.enter_marks(2, "10A", "Physics", "Mid Term", marks_import.to_marks_data(valid))
+    preview = marks_import.diff_preview(valid, mock_data.get_class_marks("10A", "Physics", "Mid Term"))
+    assert preview["Change"].tolist() == ["Unchanged"]
+
+
+def test_class_timetable_grid_is_shared_and_answers_now_next(backend):
+    grid = mock_data.get_class_timetable("10A")
+    assert grid is mock_data.get_class_timetable("10A")
+    assert grid.frame.loc[grid.frame["Time"] == "09:00-10:00", "Tuesday"].item() == "Physics"
+    monday = datetime(2024, 1, 15)
+    assert grid.now_and_next(monday.replace(hour=9, minute=30))[0]["subject"] == "Mathematics"
+    assert grid.now_and_next(monday.replace(hour=9, minute=30))[1]["subject"] == "Chemistry"
+    assert grid.now_and_next(monday.replace(hour=7)) == (None, grid.day(0)[0])
+    assert grid.now_and_next(monday.replace(hour=14)) == (None, None)
+    schedule = mock_data.get_teacher_schedule(2, monday.replace(hour=7))
+    assert [(p["time"], p["subject"], p["status"]) for p in schedule] == [("08:00-09:00", "Physics", "Next")]
+    rows = grid.rows()
+    rows[0]["room"] = "201"
+    assert mock_data.update_class_timetable(4, "10A", rows)
+    assert mock_data.get_class_timetable("10A").day(0)[0]["room"] == "201"
+    # Another Smith's period goes to their schedule, not Dr. Smith's
+    rows[1].update(teacher="Mr. Smith", teacher_id=99)
+    assert mock_data.update_class_timetable(4, "10A", rows)
+    assert [p["subject"] for p in mock_data.get_teacher_schedule(2, monday.replace(hour=7))] == ["Physics"]
+    assert [p["subject"] for p in mock_data.get_teacher_schedule(99, monday.replace(hour=7))] == ["Mathematics"]
+
+
+def test_performance_cube_tracks_replaced_marks_and_attendance(backend):
+    cube = performance_cube.get_cube(backend)
+    mock_data.enter_marks(2, "10A", "Physics", "Mid Term", {1: 80})
+    mock_data.enter_marks(2, "10A", "Physics", "Mid Term", {1: 60})
+    mock_data.mark_attendance(2, "10A", "2024-02-05", {1: "Present"})
+    mock_data.mark_attendance(2, "10A", "2024-02-05", {1: "Absent"})
+    row, = cube.rollup(("subject", "exam"), department="Science", subject="Physics", exam="Mid Term")
+    assert (row["results"], row["average"]) == (1, 60.0)
+    month, = cube.rollup(("month",), department="Science", subject="Physics", month="2024-02")
+    assert month["sessions"] >= 1
+    performance_cube.reset()
+    rebuilt = performance_cube.get_cube(backend)
+    assert rebuilt is not cube and rebuilt.cells == cube.cells
+
+
+def test_trend_charts_are_downsampled_and_cached(backend):
+    days = np.arange("2015-01-01", "2025-01-01", dtype="M8[D]")
+    values = np.sin(np.arange(len(days)) / 30) * 40 + 50
+    values[1234], values[2345] = 150, -60
+    x, y = charts.downsample(days, values, width=400)
+    assert len(x) <= 400 and (y.max(), y.min()) == (150, -60) and (x[0], x[-1]) == (days[0], days[-1])
+
+    figure = mock_data.get_student_trend_chart(1, "2024-01-01", "2024-12-31")
+    assert mock_data.get_student_trend_chart(1, "2024-01-01", "2024-12-31") is figure
+    mock_data.mark_attendance(2, "10A", "2024-03-04", {1: "Absent"})
+    refreshed = mock_data.get_student_trend_chart(1, "2024-01-01", "2024-12-31")
+    assert refreshed is not figure and "2024-03-04" in refreshed.to_json()
+    assert mock_data.get_class_trend_chart("10A", "2024-01-01", "2024-12-31").data
+
+
+def test_class_stats_track_replaced_marks():
+    marks = np.random.default_rng(0).integers(0, 101, 500)
+    stats = class_stats.MarkStats(dict(enumerate(marks)))
+    stats.update({0: 100, 1: 0})
+    marks[:2] = [100, 0]
+    summary = stats.summary()
+    assert summary["count"] == 500 and summary["max"] == 100 and summary["min"] == 0
+    assert summary["mean"] == pytest.approx(marks.mean(), abs=0.01)
+    assert summary["std"] == pytest.approx(marks.std(), abs=0.01)
+    assert summary["median"] == pytest.approx(np.median(marks), abs=1)
+    merged = stats.merge(class_stats.MarkStats({1000: 50}))
+    assert merged.count == 501 and merged.histogram.sum() == 501
+    with pytest.raises(ValueError):
+        stats.merge(class_stats.MarkStats({0: 50}))
+    # Retracting the extremes moves min/max to the next occupied bins
+    stats.update({0: 50, 1: 50})
+    marks[:2] = 50
+    assert (stats.min, stats.max) == (marks.min(), marks.max())
+
+
+def test_enter_marks_updates_class_stats(backend):
+    assert mock_data.get_class_stats("10A", "Physics", "Mid Term")["count"] == 0
+    mock_data.enter_marks(2, "10A", "Physics", "Mid Term", {1: 80})
+    mock_data.enter_marks(2, "10A", "Physics", "Mid Term", {1: 64})
+    summary = mock_data.get_class_stats("10A", "Physics", "Mid Term")
+    assert (summary["count"], summary["mean"], summary["max"]) == (1, 64, 64)
+
+
+def test_benchmark_reports_pages_missing_from_the_baseline():
+    measured = {"cold_s": 0.01, "warm_s": 0.01, "peak_kb": 10.0, "error": None}
+    baseline = {"small/admin/📊 Dashboard": measured}
+    failures = benchmark_panels.regressions({"small/admin/📊 Dashboard": measured, "small/admin/💾 Backup": measured},
+                                            baseline)
+    assert failures == ["small/admin/💾 Backup: no baseline entry (rerun with --update-baseline)"]
+
+
+@pytest.mark.parametrize("role", list(benchmark_panels.PANELS))
+def test_every_panel_page_renders(tmp_path, role):
+    previous = storage.get_backend()
+    try:
+        school = benchmark_panels.prepare_dataset("small", str(tmp_path))
+        results = benchmark_panels.bench_role(role, benchmark_panels.role_users(school)[role])
+    finally:
+        storage.set_backend(previous)
+    assert results
+    assert not [page for page, measured in results.items() if measured["error"]]
+    with open(benchmark_panels.BASELINE_PATH) as f:
+        baseline = json.load(f)
+    assert not [page for page in results if f"small/{role}/{page}" not in baseline]
+
+
+def run_system_tests():
+    """Run comprehensive system tests."""
+    return pytest.main([__file__, "-q"])
+
 
 if __name__ == '__main__':
-    run_system_tests()
\ No newline at end of file
+    sys.exit(run_system_tests())
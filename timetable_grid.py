@@ -0,0 +1,116 @@
+import bisect
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+# Weekly timetables compiled once per class and shared by every view of it.
+# A class's rows become a slot x weekday grid of entries plus, per weekday, the
+# periods sorted by start time, so "today" is a list lookup and "now/next" is a
+# bisect over a day's handful of periods. The display DataFrame is built once
+# too. A teacher's week is compiled the same way from the rows naming their user
+# id (across classes) and kept per teacher id. Grids are rebuilt only when
+# invalidate() is called for a changed schedule.
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+SCHOOL_DAYS = WEEKDAYS[:5]
+
+
+def _minutes(clock: str) -> int:
+    hours, minutes = clock.strip().split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+class ClassTimetable:
+    """One class's (or teacher's) week as a grid: slots[i] x WEEKDAYS[j] -> entry or None."""
+
+    def __init__(self, rows):
+        rows = [r for r in rows if r["day"] in WEEKDAYS]
+        self.slots = sorted({r["time"] for r in rows}, key=lambda t: _minutes(t.split("-")[0]))
+        slot_index = {slot: i for i, slot in enumerate(self.slots)}
+        self.grid = [[None] * len(WEEKDAYS) for _ in self.slots]
+        for row in rows:
+            entry = {"time": row["time"], "subject": row["subject"], "teacher": row.get("teacher"),
+                     "room": row.get("room"), "teacher_id": row.get("teacher_id"), "class": row.get("class_name")}
+            self.grid[slot_index[row["time"]]][WEEKDAYS.index(row["day"])] = entry
+        self.days = [[row[d] for row in self.grid if row[d] is not None] for d in range(len(WEEKDAYS))]
+        self._bounds = [
+            [tuple(_minutes(part) for part in entry["time"].split("-")) for entry in day] for day in self.days
+        ]
+        self._starts = [[start for start, _ in day] for day in self._bounds]
+        columns = [d for i, d in enumerate(WEEKDAYS) if d in SCHOOL_DAYS or self.days[i]]
+        self.frame = pd.DataFrame({
+            "Time": self.slots,
+            **{day: [row[WEEKDAYS.index(day)]["subject"] if row[WEEKDAYS.index(day)] else "-" for row in self.grid]
+               for day in columns},
+        })
+
+    def __bool__(self):
+        return bool(self.slots)
+
+    def rows(self) -> list:
+        """The timetable back as {"day", "time", "subject", "teacher", "room", "teacher_id", "class"} rows, day by day."""
+        return [{"day": WEEKDAYS[d], **entry} for d, day in enumerate(self.days) for entry in day]
+
+    def day(self, weekday: int) -> list:
+        """Periods on a weekday (0 = Monday) in start-time order."""
+        return self.days[weekday]
+
+    def today(self, now: datetime = None) -> list:
+        return self.days[(now or datetime.now()).weekday()]
+
+    def now_and_next(self, now: datetime = None) -> tuple:
+        """(period in progress or None, next period today or None)."""
+        now = now or datetime.now()
+        weekday, minute = now.weekday(), now.hour * 60 + now.minute
+        starts = self._starts[weekday]
+        position = bisect.bisect_right(starts, minute)
+        current = None
+        if position and minute < self._bounds[weekday][position - 1][1]:
+            current = self.days[weekday][position - 1]
+        upcoming = self.days[weekday][position] if position < len(starts) else None
+        return current, upcoming
+
+
+_grids = {}
+_teacher_grids = {}
+_grids_lock = threading.Lock()
+
+
+def get_grid(class_name: str, loader) -> ClassTimetable:
+    """Return the class grid, compiling it once from loader(class_name) rows."""
+    grid = _grids.get(class_name)
+    if grid is None:
+        with _grids_lock:
+            grid = _grids.get(class_name)
+            if grid is None:
+                grid = _grids[class_name] = ClassTimetable(loader(class_name))
+    return grid
+
+
+def get_teacher_grid(teacher_id: int, loader) -> ClassTimetable:
+    """Return a teacher's grid across classes, compiling it once from loader(teacher_id) rows."""
+    grid = _teacher_grids.get(teacher_id)
+    if grid is None:
+        with _grids_lock:
+            grid = _teacher_grids.get(teacher_id)
+            if grid is None:
+                grid = _teacher_grids[teacher_id] = ClassTimetable(loader(teacher_id))
+    return grid
+
+
+def invalidate(class_name: str = None):
+    """Drop a class grid after its schedule changed (or every grid).
+
+    Teacher grids are all dropped: a changed class may have gained or lost any teacher.
+    """
+    with _grids_lock:
+        if class_name is None:
+            _grids.clear()
+        else:
+            _grids.pop(class_name, None)
+        _teacher_grids.clear()
+
+
+def reset():
+    invalidate()